@@ -1,7 +1,11 @@
 # Code for custom code recipe id-dku-rdf-files-extractor
+import logging
+
 import dataiku
-from rdflib import Graph
 
+from dkurdftools.ingestion.partitioning import filter_partition_files
+from dkurdftools.ingestion.pipeline import FileExtractor, extract_files
+from dkurdftools.ingestion.state import ExtractionState, compute_stream_hash, get_fingerprint, get_state_path
 from dkurdftools.storage.dss_store import DataikuDatasetStore
 
 # Import the helpers for custom recipes
@@ -9,13 +13,20 @@ from dataiku.customrecipe import get_input_names_for_role
 from dataiku.customrecipe import get_output_names_for_role
 from dataiku.customrecipe import get_recipe_config
 
+logger = logging.getLogger(__name__)
 
 # Inputs and outputs are defined by roles. In the recipe's I/O tab, the user can associate one
 input_managed_folders_names = get_input_names_for_role("input_managed_folders")
 input_managed_folders = [dataiku.Folder(name) for name in input_managed_folders_names]
-# There's only one unary output in this recipe
+# The triples are written in the unary output dataset
 output_dataset_names = get_output_names_for_role("output_dataset")
 output_dataset = dataiku.Dataset(output_dataset_names[0])
+# The optional terms dataset enables the dictionary-encoded layout
+terms_dataset_names = get_output_names_for_role("terms_dataset")
+terms_dataset = dataiku.Dataset(terms_dataset_names[0]) if terms_dataset_names else None
+# The optional state folder records the extracted files, for incremental extractions
+state_folder_names = get_output_names_for_role("state_folder")
+state_folder = dataiku.Folder(state_folder_names[0]) if state_folder_names else None
 
 # Read parameters (see recipe.json for details)
 subject_output_column = get_recipe_config().get("subject_output_column", "subject")
@@ -23,6 +34,79 @@ predicate_output_column = get_recipe_config().get(
     "predicate_output_column", "predicate"
 )
 object_output_column = get_recipe_config().get("object_output_column", "object")
+# the optional source column holds the path of the file each triple was extracted from
+source_output_column = get_recipe_config().get("source_output_column") or None
+# the optional graph column holds the named graph of each triple, which makes the output a dataset of quads
+graph_output_column = get_recipe_config().get("graph_output_column") or None
+workers = get_recipe_config().get("workers") or 1
+# the format of each file is detected, unless it is forced
+file_format = get_recipe_config().get("file_format", "auto")
+format_overrides = get_recipe_config().get("format_overrides") or {}
+deduplicate = get_recipe_config().get("deduplicate", False)
+incremental = get_recipe_config().get("incremental", False)
+hash_files = get_recipe_config().get("hash_files", False)
+if incremental and state_folder is None:
+    raise ValueError("Incremental extraction requires a state folder")
+# with one partition per file, each run extracts the files of the output partition being built
+partition_per_file = get_recipe_config().get("partition_per_file", False)
+partition_id = None
+if partition_per_file:
+    # term ids are assigned per build, so the terms of separately built partitions would share the same ids
+    if terms_dataset is not None:
+        raise ValueError("A terms dataset cannot be used with one partition per file")
+    partition_dimension = get_recipe_config().get("partition_dimension") or "source"
+    partition_id = dataiku.dku_flow_variables.get(f"DKU_DST_{partition_dimension}")
+    if partition_id is None:
+        raise ValueError(f"The output dataset must be partitioned by the '{partition_dimension}' dimension")
+
+# list the input files, identified by (folder name, path)
+input_managed_folders_by_name = dict(zip(input_managed_folders_names, input_managed_folders))
+files = [
+    (folder_name, file_path)
+    for folder_name, input_managed_folder in input_managed_folders_by_name.items()
+    for file_path in input_managed_folder.list_paths_in_partition()
+]
+
+
+def open_file(file):
+    folder_name, file_path = file
+    return input_managed_folders_by_name[folder_name].get_download_stream(file_path)
+
+
+def get_path(file):
+    return file[1]
+
+
+def get_source(file):
+    # files of several folders are told apart by their folder name
+    folder_name, file_path = file
+    return file_path if len(input_managed_folders_by_name) == 1 else f"{folder_name}:{file_path}"
+
+
+if partition_id is not None:
+    files = filter_partition_files(files, partition_id, get_path=get_path)
+
+
+def compute_file_hash(file):
+    with open_file(file) as stream:
+        return compute_stream_hash(stream)
+
+
+append = False
+if state_folder is not None:
+    fingerprints = {
+        file: get_fingerprint(input_managed_folders_by_name[file[0]].get_path_details(file[1])) for file in files
+    }
+if incremental:
+    changes = ExtractionState.load(state_folder, get_state_path(partition_id)).compare(
+        fingerprints, compute_hash=compute_file_hash if hash_files else None
+    )
+    # the triples of changed or removed files cannot be removed from the output dataset,
+    # so only new files are extracted incrementally, anything else rebuilds the dataset
+    # (or only the output partition, with one partition per file)
+    if not changes.changed and not changes.removed:
+        files = changes.new
+        append = True
 
 # use the dedicated dataiku dataset store for the graph
 # which will take care of writing the output into the dataset
@@ -31,16 +115,35 @@ store = DataikuDatasetStore(
     subject_column_name=subject_output_column,
     predicate_column_name=predicate_output_column,
     object_column_name=object_output_column,
+    terms_dataset=terms_dataset,
+    append=append,
+    source_column_name=source_output_column,
+    graph_column_name=graph_output_column,
+    deduplicate=deduplicate,
 )
 # init the dataset schema
 store.write_schema()
-graph = Graph(store=store)
 
-# load each file into the graph
-for input_managed_folder in input_managed_folders:
-    for file_path in input_managed_folder.list_paths_in_partition():
-        with input_managed_folder.get_download_stream(file_path) as stream:
-            graph.parse(data=stream.read())
+extractor = FileExtractor(
+    open_file,
+    get_path=get_path,
+    file_format=None if file_format == "auto" else file_format,
+    format_overrides=format_overrides,
+    batch_size=store.autocommit_add_threshold,
+    with_graphs=graph_output_column is not None,
+)
+# parse the files, possibly in worker processes, and write their triples into the store
+for file, batch in extract_files(files, extractor, workers=workers):
+    if graph_output_column is not None:
+        store.add_n3_quads(batch, source=get_source(file))
+    else:
+        store.add_n3_triples(batch, source=get_source(file))
+
+# commit any remaining data and close the dataset writer
+store.close(commit_pending_transaction=True)
+if deduplicate:
+    logger.info("Dropped %d duplicate triples", store.duplicates)
 
-# commit any remaining data
-graph.commit()
+# record the extracted files, once the output is committed
+if state_folder is not None:
+    ExtractionState(fingerprints).save(state_folder, get_state_path(partition_id))
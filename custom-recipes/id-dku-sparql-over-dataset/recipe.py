@@ -0,0 +1,63 @@
+# Code for custom code recipe id-dku-sparql-over-dataset
+import dataiku
+import pandas as pd
+from rdflib import Dataset, Graph
+
+from dkurdftools.sparql.connector import get_query_read_schema
+from dkurdftools.storage.bgp import enable_native_bgp_evaluation
+from dkurdftools.storage.dss_store import DataikuDatasetStore
+
+# Import the helpers for custom recipes
+from dataiku.customrecipe import get_input_names_for_role
+from dataiku.customrecipe import get_output_names_for_role
+from dataiku.customrecipe import get_recipe_config
+
+# Number of result rows per dataframe written to the output dataset
+WRITE_BATCH_SIZE = 10_000
+
+# The triples are read from the unary input dataset, and the optional terms dataset of its dictionary-encoded layout
+input_dataset = dataiku.Dataset(get_input_names_for_role("input_dataset")[0])
+terms_dataset_names = get_input_names_for_role("terms_dataset")
+terms_dataset = dataiku.Dataset(terms_dataset_names[0]) if terms_dataset_names else None
+# The query results are written in the unary output dataset
+output_dataset = dataiku.Dataset(get_output_names_for_role("output_dataset")[0])
+
+# Read parameters (see recipe.json for details)
+query = get_recipe_config()["query"]
+subject_input_column = get_recipe_config().get("subject_input_column", "subject")
+predicate_input_column = get_recipe_config().get("predicate_input_column", "predicate")
+object_input_column = get_recipe_config().get("object_input_column", "object")
+# the optional graph column makes the input a dataset of quads
+graph_input_column = get_recipe_config().get("graph_input_column") or None
+if get_recipe_config().get("native_evaluation", True):
+    enable_native_bgp_evaluation()
+
+# the output columns are the projected variables, or the triple columns of a CONSTRUCT query
+# (this also rejects the unsupported query types before reading the dataset)
+columns = [column["name"] for column in get_query_read_schema(query)["columns"]]
+output_dataset.write_schema([{"name": name, "type": "string"} for name in columns])
+
+store = DataikuDatasetStore(
+    input_dataset,
+    subject_column_name=subject_input_column,
+    predicate_column_name=predicate_input_column,
+    object_column_name=object_input_column,
+    terms_dataset=terms_dataset,
+    graph_column_name=graph_input_column,
+)
+if graph_input_column is not None:
+    # triple patterns outside of GRAPH patterns match the triples of all the graphs
+    results = Dataset(store=store, default_union=True).query(query)
+else:
+    results = Graph(store=store).query(query)
+
+# results are written as N3 terms, as the SPARQL dataset connector does
+with output_dataset.get_writer() as writer:
+    batch = []
+    for row in results:
+        batch.append([None if value is None else value.n3() for value in row])
+        if len(batch) >= WRITE_BATCH_SIZE:
+            writer.write_dataframe(pd.DataFrame(batch, columns=columns))
+            batch = []
+    if batch:
+        writer.write_dataframe(pd.DataFrame(batch, columns=columns))
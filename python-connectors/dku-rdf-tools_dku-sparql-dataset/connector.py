@@ -1,7 +1,15 @@
 from dataiku.connector import Connector
 
+from dkurdftools.sparql.cache import (
+    DEFAULT_CACHE_DIRECTORY,
+    DEFAULT_CACHE_MAX_SIZE,
+    DEFAULT_CACHE_TTL,
+    ResultCache,
+)
 from dkurdftools.sparql.parsing import parse_query
-from dkurdftools.sparql.connector import get_read_schema, generate_rows
+from dkurdftools.sparql.connector import get_query_read_schema, get_read_schema, generate_rows
+from dkurdftools.sparql.partitioning import get_partitioning, list_hash_partitions
+from dkurdftools.sparql.session import DEFAULT_MAX_RETRIES, DEFAULT_TIMEOUT
 
 
 class MyConnector(Connector):
@@ -17,7 +25,33 @@ class MyConnector(Connector):
 
         self.url = self.config.get("url")
         self.sparql_query = self.config.get("sparql_query")
+        self._parsed_query = None
         self.select_results_type = self.config.get("select_results_type", "json")
+        self.select_response_format = self.config.get("select_response_format", "json")
+        self.page_size = self.config.get("page_size") or 0
+        self.order_pages = self.config.get("order_pages", False)
+        self.prefetch_pages = self.config.get("prefetch_pages") or 0
+        self.partition_variable = self.config.get("partition_variable") or None
+        self.partition_hash_length = int(self.config.get("partition_hash_length") or 1)
+        self.max_concurrent_requests = self.config.get("max_concurrent_requests") or 0
+        connect_timeout, read_timeout = DEFAULT_TIMEOUT
+        self.timeout = (connect_timeout, self.config.get("read_timeout") or read_timeout)
+        self.max_retries = self.config.get("max_retries", DEFAULT_MAX_RETRIES)
+        self.cache = None
+        if self.config.get("use_cache", False):
+            max_size = self.config.get("cache_max_size")
+            self.cache = ResultCache(
+                self.config.get("cache_directory") or DEFAULT_CACHE_DIRECTORY,
+                ttl=self.config.get("cache_ttl", DEFAULT_CACHE_TTL),
+                max_size=max_size * 1024 * 1024 if max_size else DEFAULT_CACHE_MAX_SIZE,
+            )
+
+    @property
+    def parsed_query(self):
+        """The logical plan of the SPARQL query, parsed once per connector"""
+        if self._parsed_query is None:
+            self._parsed_query = parse_query(self.sparql_query)
+        return self._parsed_query
 
     def get_read_schema(self):
         """
@@ -38,7 +72,10 @@ class MyConnector(Connector):
 
         Supported types are: string, int, bigint, float, double, date, boolean
         """
-        return get_read_schema(parse_query(self.sparql_query))
+        if self._parsed_query is not None:
+            return get_read_schema(self._parsed_query)
+        # the schema can usually be known without a full parsing of the query
+        return get_query_read_schema(self.sparql_query)
 
     def generate_rows(
         self,
@@ -57,9 +94,20 @@ class MyConnector(Connector):
         """
         return generate_rows(
             self.url,
-            parse_query(self.sparql_query),
+            self.parsed_query,
             records_limit=records_limit,
             select_results_type=self.select_results_type,
+            select_response_format=self.select_response_format,
+            page_size=self.page_size,
+            order_pages=self.order_pages,
+            prefetch_pages=self.prefetch_pages,
+            partition_variable=self.partition_variable,
+            partition_id=partition_id,
+            partition_hash_length=self.partition_hash_length,
+            max_concurrent_requests=self.max_concurrent_requests,
+            timeout=self.timeout,
+            max_retries=self.max_retries,
+            cache=self.cache,
         )
 
     def get_writer(
@@ -86,12 +134,16 @@ class MyConnector(Connector):
         """
         Return the partitioning schema that the connector defines.
         """
-        raise NotImplementedError
+        if self.partition_variable is None:
+            return None
+        return get_partitioning()
 
     def list_partitions(self, partitioning):
         """Return the list of partitions for the partitioning scheme
         passed as parameter"""
-        return []
+        if self.partition_variable is None:
+            return []
+        return list_hash_partitions(self.partition_hash_length)
 
     def partition_exists(self, partitioning, partition_id):
         """Return whether the partition passed as parameter exists
@@ -99,7 +151,7 @@ class MyConnector(Connector):
         Implementation is only required if the corresponding flag is set to True
         in the connector definition
         """
-        raise NotImplementedError
+        return partition_id in self.list_partitions(partitioning)
 
     def get_records_count(self, partitioning=None, partition_id=None):
         """
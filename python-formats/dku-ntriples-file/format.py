@@ -23,7 +23,7 @@ class MyFormatter(Formatter):
         :param stream: the stream to write the formatted data to
         :param schema: the schema of the rows that will be formatted (never None)
         """
-        return RDFOutputFormatter(stream, schema, "json-ld", **self.config)
+        return RDFOutputFormatter(stream, schema, "nt", **self.config)
 
     def get_format_extractor(self, stream, schema=None):
         """
@@ -31,4 +31,6 @@ class MyFormatter(Formatter):
         :param stream: the stream to read the formatted data from
         :param schema: the schema of the rows that will be extracted. None when the extractor is used to detect the format.
         """
-        return RDFFormatExtractor("nt", stream, schema)
+        return RDFFormatExtractor(
+            "nt", stream, schema, buffer_size=self.config.get("buffer_size", 65536)
+        )
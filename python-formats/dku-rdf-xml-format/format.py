@@ -31,4 +31,6 @@ class MyFormatter(Formatter):
         :param stream: the stream to read the formatted data from
         :param schema: the schema of the rows that will be extracted. None when the extractor is used to detect the format.
         """
-        return RDFFormatExtractor("xml", stream, schema)
+        return RDFFormatExtractor(
+            "xml", stream, schema, buffer_size=self.config.get("buffer_size", 65536)
+        )
@@ -0,0 +1,109 @@
+import bz2
+import gzip
+import lzma
+import shutil
+import tempfile
+import zipfile
+from typing import IO, Iterator, Optional
+
+from .utils import peek_stream
+
+# Compression formats, per file extension
+COMPRESSION_EXTENSIONS = {
+    ".gz": "gzip",
+    ".gzip": "gzip",
+    ".bz2": "bz2",
+    ".xz": "xz",
+    ".lzma": "xz",
+    ".zip": "zip",
+}
+
+# Compression formats, per magic bytes
+COMPRESSION_MAGIC_BYTES = {
+    b"\x1f\x8b": "gzip",
+    b"BZh": "bz2",
+    b"\xfd7zXZ\x00": "xz",
+    b"PK\x03\x04": "zip",
+}
+
+_MAGIC_BYTES_SIZE = max(len(magic) for magic in COMPRESSION_MAGIC_BYTES)
+
+# Archives are spooled to disk when they cannot be read randomly, above this size (in bytes)
+ARCHIVE_SPOOL_MEMORY_SIZE = 16 * 1024 * 1024
+
+
+def split_compression_extension(path: str) -> tuple[str, Optional[str]]:
+    """Split the compression extension from a file path, e.g., "data.nt.gz" -> ("data.nt", "gzip")
+
+    :param path: File path
+    :return: The path without its compression extension, and the compression format (None if not compressed)
+    """
+    lower_path = path.lower()
+    for extension, compression in COMPRESSION_EXTENSIONS.items():
+        if lower_path.endswith(extension):
+            return path[: -len(extension)], compression
+    return path, None
+
+
+def sniff_compression(header: bytes) -> Optional[str]:
+    """Detect the compression format of a file from its first bytes"""
+    for magic, compression in COMPRESSION_MAGIC_BYTES.items():
+        if header.startswith(magic):
+            return compression
+    return None
+
+
+def open_decompressed_stream(stream: IO[bytes], compression: str) -> IO[bytes]:
+    """Decompress a stream on the fly (except zip archives, see iter_zip_members)"""
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    if compression == "bz2":
+        return bz2.BZ2File(stream, mode="rb")
+    if compression == "xz":
+        return lzma.LZMAFile(stream, mode="rb")
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+def iter_zip_members(stream: IO[bytes]) -> Iterator[tuple[str, IO[bytes]]]:
+    """Iterate over the files of a zip archive.
+    The index of a zip archive is at its end, so archives that cannot be read randomly
+    (e.g., remote streams) are first spooled to a temporary file.
+
+    :param stream: Archive content
+    :yield: Path and decompressed content of each file of the archive
+    """
+    seekable = getattr(stream, "seekable", lambda: False)()
+    with tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_MEMORY_SIZE) as spool:
+        if not seekable:
+            shutil.copyfileobj(stream, spool)
+            spool.seek(0)
+            stream = spool
+        with zipfile.ZipFile(stream) as archive:
+            for member in archive.infolist():
+                if member.is_dir():
+                    continue
+                with archive.open(member) as member_stream:
+                    yield member.filename, member_stream
+
+
+def iter_decompressed_streams(stream: IO[bytes], path: str = "") -> Iterator[tuple[str, IO[bytes]]]:
+    """Iterate over the files of a possibly compressed stream, decompressing them on the fly.
+    The compression is detected from the file extension, or from the first bytes of the stream.
+    A zip archive produces one item per file it contains, other streams produce a single item.
+
+    :param stream: File content
+    :param path: File path
+    :yield: Path (without the compression extension) and decompressed content of each file
+    """
+    path, compression = split_compression_extension(path)
+    if compression is None:
+        header, stream = peek_stream(stream, _MAGIC_BYTES_SIZE)
+        compression = sniff_compression(header)
+    if compression is None:
+        yield path, stream
+    elif compression == "zip":
+        for member_path, member_stream in iter_zip_members(stream):
+            yield f"{path}/{member_path}", member_stream
+    else:
+        with open_decompressed_stream(stream, compression) as decompressed_stream:
+            yield path, decompressed_stream
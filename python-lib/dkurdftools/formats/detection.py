@@ -0,0 +1,114 @@
+import re
+from typing import IO, Optional
+
+from rdflib.plugins.parsers.ntriples import ParseError
+
+from .utils import _LineParser, peek_stream
+
+# RDF formats (rdflib names), per file extension
+EXTENSION_FORMATS = {
+    ".nt": "nt",
+    ".ntriples": "nt",
+    ".nq": "nquads",
+    ".nquads": "nquads",
+    ".ttl": "turtle",
+    ".turtle": "turtle",
+    ".rdf": "xml",
+    ".owl": "xml",
+    ".xml": "xml",
+    ".jsonld": "json-ld",
+    ".json-ld": "json-ld",
+    ".n3": "n3",
+    ".trig": "trig",
+    ".trix": "trix",
+    ".hext": "hext",
+}
+
+# Number of bytes read at the beginning of a file to detect its format
+SNIFF_SIZE = 4096
+
+_TURTLE_DIRECTIVE = re.compile(r"^\s*(@prefix|@base|prefix|base)\s", re.MULTILINE | re.IGNORECASE)
+
+# A JSON-LD document is an object, or an array of objects
+_JSON_LD_START = re.compile(r"^(\{|\[\s*[{\]])")
+
+
+def normalize_extension(extension: str) -> str:
+    extension = extension.strip().lower()
+    return extension if extension.startswith(".") else f".{extension}"
+
+
+def get_format_from_path(path: str, overrides: Optional[dict[str, str]] = None) -> Optional[str]:
+    """Get the RDF format of a file from its extension
+
+    :param path: File path
+    :param overrides: Formats per extension (e.g., {".data": "turtle"}), which take precedence over
+        the default extensions, see EXTENSION_FORMATS
+    :return: The format, or None if the extension is unknown
+    """
+    formats = {**EXTENSION_FORMATS, **{normalize_extension(ext): fmt for ext, fmt in (overrides or {}).items()}}
+    name = path.rsplit("/", 1)[-1].lower()
+    # the longest matching extension wins, e.g., ".nt.txt" over ".txt"
+    matches = [extension for extension in formats if name.endswith(extension)]
+    return formats[max(matches, key=len)] if matches else None
+
+
+def sniff_format(header: bytes, complete: bool = False) -> Optional[str]:
+    """Guess the RDF format of a file from its first bytes
+
+    :param header: First bytes of the file
+    :param complete: True if the header is the whole file, False if its last line may be truncated
+    :return: The format, or None if it cannot be guessed
+    """
+    text = header.decode("utf-8", errors="ignore").lstrip("\ufeff").lstrip()
+    if not text:
+        return None
+    if text.startswith("<?xml") or "<rdf:RDF" in text:
+        return "trix" if "<TriX" in text else "xml"
+    if _JSON_LD_START.match(text):
+        return "json-ld"
+    if text.startswith("["):
+        # a Turtle document can start with a blank node, e.g., [ <p> <o> ] <q> <r> .
+        return "turtle"
+
+    lines = text.splitlines()
+    if not complete and len(lines) > 1:
+        lines.pop()
+    # Turtle is a superset of N-Triples, so the header is first parsed as N-Triples/N-Quads
+    parser = _LineParser()
+    try:
+        statements = [parser.parse_statement(line, with_context=True) for line in lines]
+    except (ParseError, ValueError):
+        statements = None
+    if statements and any(statement is not None for statement in statements):
+        with_context = any(statement[3] is not None for statement in statements if statement is not None)
+        if with_context:
+            return "nquads"
+        # the rest of the file may be Turtle, which is a superset of N-Triples, so it is only
+        # parsed as N-Triples if it is whole
+        return "nt" if complete else "turtle"
+    if _TURTLE_DIRECTIVE.search(text):
+        return "turtle"
+    return None
+
+
+def detect_rdf_format(
+    stream: IO[bytes],
+    path: str,
+    overrides: Optional[dict[str, str]] = None,
+    sniff_size: int = SNIFF_SIZE,
+) -> tuple[Optional[str], IO[bytes]]:
+    """Detect the RDF format of a file from its extension, or from its first bytes if the extension is unknown.
+    The file is not buffered: only the first bytes are read, and they are replayed by the returned stream.
+
+    :param stream: File content
+    :param path: File path
+    :param overrides: Formats per extension, see get_format_from_path()
+    :param sniff_size: Number of bytes read to guess the format
+    :return: The format (None if unknown, so rdflib guesses it) and the stream to read the file from
+    """
+    file_format = get_format_from_path(path, overrides)
+    if file_format is not None:
+        return file_format, stream
+    header, stream = peek_stream(stream, sniff_size)
+    return sniff_format(header, complete=len(header) < sniff_size), stream
@@ -1,24 +1,31 @@
+from itertools import chain
+
 from dataiku.customformat import FormatExtractor
 
-from .utils import parse_rdf_stream_as_graph
+from .compression import iter_decompressed_streams
+from .utils import DEFAULT_BUFFER_SIZE, iter_rdf_stream
 
 class RDFFormatExtractor(FormatExtractor):
     """
     Extract an RDF file into a stream of rows
     """
-    def __init__(self, file_format, stream, schema):
+    def __init__(self, file_format, stream, schema, buffer_size=DEFAULT_BUFFER_SIZE):
         """
         Initialize the extractor
         :param rdf_format: RDF file format ("text/turtle", "n3", "xml", etc)
         :param stream: the stream to read the formatted data from
+        :param buffer_size: size (in bytes) of the chunks read from the stream by streaming parsers
         """
         FormatExtractor.__init__(self, stream)
         self.columns = ["subject", "predicate", "object"]
-        # load file content
-        self.graph = parse_rdf_stream_as_graph(stream, file_format=file_format)        
-        # create an iterator over the graph content
-        self.iterator = iter(self.graph)
-        
+        # create an iterator over the file content, which is decompressed on the fly if needed
+        # (each file of a zip archive being parsed in turn), and parsed incrementally
+        # when the format allows it (see iter_rdf_stream)
+        self.iterator = chain.from_iterable(
+            iter_rdf_stream(decompressed_stream, file_format, buffer_size=buffer_size)
+            for _, decompressed_stream in iter_decompressed_streams(stream)
+        )
+
     def read_schema(self):
         """
         Get the schema of the data in the stream, if the schema can be known upfront.
@@ -28,7 +35,7 @@ class RDFFormatExtractor(FormatExtractor):
             {"name": "predicate", "type": "STRING"},
             {"name": "object", "type": "STRING"}
         ]
-    
+
     def read_row(self):
         """
         Read one row from the formatted stream
@@ -40,4 +47,3 @@ class RDFFormatExtractor(FormatExtractor):
         except StopIteration:
             pass
         return None
-        
\ No newline at end of file
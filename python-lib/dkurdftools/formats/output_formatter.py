@@ -1,8 +1,20 @@
+import logging
+from typing import Optional
+
 from dataiku.customformat import OutputFormatter
 
 from rdflib import Graph
 from rdflib.util import from_n3
 
+from ..storage.deduplication import TripleDeduplicator
+from .turtle_writer import StreamingTurtleWriter
+from .utils import DEFAULT_BUFFER_SIZE, TURTLE_FORMATS, is_line_based_format, to_ntriples_line
+
+logger = logging.getLogger(__name__)
+
+# Number of rows checked at once for duplicates, when deduplicating a streaming format
+DEDUPLICATION_BATCH_SIZE = 10_000
+
 
 class RDFOutputFormatter(OutputFormatter):
     """
@@ -14,6 +26,13 @@ class RDFOutputFormatter(OutputFormatter):
     * write_row(row_N)
     * write_footer()
 
+    Line-based formats (N-Triples, N-Quads) are streamed: each row is written as soon as it is received,
+    through a write buffer. Turtle is streamed too, using a StreamingTurtleWriter.
+    Other formats need the whole dataset to be serialized, so rows are
+    accumulated in an in-memory graph, serialized in write_footer().
+
+    Streaming formats can drop duplicate rows: rows are then checked by batches, with a TripleDeduplicator,
+    before being written in their original order. The in-memory graph drops duplicates anyway.
     """
 
     def __init__(
@@ -24,11 +43,19 @@ class RDFOutputFormatter(OutputFormatter):
         subject_column_name: str = "subject",
         predicate_column_name: str = "predicate",
         object_column_name: str = "object",
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        prefixes: Optional[dict] = None,
+        prefix_sample_size: int = 1000,
+        deduplicate: bool = False,
         **kwargs,
     ):
         """
         Initialize the formatter
         :param stream: the stream to write the formatted data to
+        :param buffer_size: size (in characters) of the write buffer used by streaming formats
+        :param prefixes: prefixes declared by the Turtle writer, as a (prefix, namespace) map
+        :param prefix_sample_size: number of rows used by the Turtle writer to detect additional prefixes
+        :param deduplicate: if True, each triple is only written once
         """
         OutputFormatter.__init__(self, stream)
         self.schema = schema
@@ -36,7 +63,19 @@ class RDFOutputFormatter(OutputFormatter):
         self.subject_column_name = subject_column_name
         self.predicate_column_name = predicate_column_name
         self.object_column_name = object_column_name
-        self.graph = Graph()
+        self.buffer_size = buffer_size
+        self.write_buffer: list[str] = []
+        self.write_buffer_length = 0
+        self.turtle_writer = None
+        if format in TURTLE_FORMATS:
+            self.turtle_writer = StreamingTurtleWriter(
+                self.write, prefixes=prefixes, sample_size=prefix_sample_size
+            )
+        self.streaming = is_line_based_format(format) or self.turtle_writer is not None
+        self.graph = None if self.streaming else Graph()
+        self.deduplicator = TripleDeduplicator() if deduplicate and self.streaming else None
+        # rows waiting to be checked for duplicates, as (subject, predicate, object) N3 terms
+        self.pending_rows: list[tuple[str, str, str]] = []
 
     def write_header(self):
         pass
@@ -44,19 +83,65 @@ class RDFOutputFormatter(OutputFormatter):
     def write_row(self, row):
         """
         Write a row in the format.
-        It will store the triple in the buffer graph instead of writing it to stream,
+        For streaming formats, the triple is written to the write buffer, flushed to the stream once full
+        (when deduplicating, it is first buffered until a batch of rows is checked for duplicates).
+        Otherwise, it will store the triple in the buffer graph instead of writing it to stream,
         as some RDF format needs to have the whole dataset to be serialized.
 
         :param row: array of strings, with one value per column in the schema
         """
-        subj = from_n3(row[self.subject_column_name])
-        pred = from_n3(row[self.predicate_column_name])
-        obj = from_n3(row[self.object_column_name])
-        self.graph.add((subj, pred, obj))
+        triple = (row[self.subject_column_name], row[self.predicate_column_name], row[self.object_column_name])
+        if self.deduplicator is None:
+            self.write_triple(triple)
+            return
+        self.pending_rows.append(triple)
+        if len(self.pending_rows) >= DEDUPLICATION_BATCH_SIZE:
+            self.write_pending_rows()
+
+    def write_pending_rows(self):
+        """Write the pending rows which are not duplicates"""
+        if self.pending_rows:
+            subjects, predicates, objects = zip(*self.pending_rows)
+            for i in self.deduplicator.filter(subjects, predicates, objects):
+                self.write_triple(self.pending_rows[i])
+            self.pending_rows = []
+
+    def write_triple(self, triple: tuple[str, str, str]):
+        """Write a triple, given as N3 terms"""
+        subj, pred, obj = (from_n3(term) for term in triple)
+        if self.turtle_writer is not None:
+            self.turtle_writer.add((subj, pred, obj))
+        elif self.streaming:
+            self.write(to_ntriples_line((subj, pred, obj)))
+        else:
+            self.graph.add((subj, pred, obj))
+
+    def write(self, data: str):
+        """Write data to the write buffer, and flush it to the stream if it is full"""
+        self.write_buffer.append(data)
+        self.write_buffer_length += len(data)
+        if self.write_buffer_length >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Flush the content of the write buffer to the stream"""
+        if self.write_buffer:
+            self.stream.write("".join(self.write_buffer).encode("utf-8"))
+            self.write_buffer = []
+            self.write_buffer_length = 0
 
     def write_footer(self):
         """
         Write the footer of the format (if any).
-        it will flush all the graph data into the output stream.
+        it will flush all the remaining data into the output stream.
         """
-        self.graph.serialize(self.stream, format=self.format)
+        if self.deduplicator is not None:
+            self.write_pending_rows()
+            logger.info("Dropped %d duplicate triples", self.deduplicator.duplicates)
+            self.deduplicator.close()
+        if self.turtle_writer is not None:
+            self.turtle_writer.close()
+        if self.streaming:
+            self.flush()
+        else:
+            self.graph.serialize(self.stream, format=self.format)
@@ -0,0 +1,103 @@
+from typing import Callable, Optional
+
+from rdflib import Graph, Literal, URIRef
+from rdflib.graph import _TripleType
+from rdflib.namespace import RDF
+from rdflib.term import Node
+
+
+class StreamingTurtleWriter:
+    """Serialize a stream of triples as Turtle, in a single pass and with bounded memory.
+
+    Prefix declarations are written up front: they come from the configured prefixes, the core
+    namespaces (rdf, rdfs, xsd, owl) and the namespaces found in an initial sample of triples.
+    Then, consecutive triples sharing the same subject are grouped in a ";"-separated block
+    (and consecutive triples sharing the same predicate in a ","-separated list),
+    so sorted triples produce compact Turtle. A block is terminated when the subject changes.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[str], None],
+        prefixes: Optional[dict[str, str]] = None,
+        sample_size: int = 1000,
+    ):
+        """
+        Args:
+          - write: The function called to write the serialized data.
+          - prefixes: Prefixes to declare, as a (prefix, namespace) map.
+          - sample_size: Number of triples used to detect additional namespaces before writing the prefixes.
+        """
+        self.write = write
+        self.namespace_manager = Graph(bind_namespaces="core").namespace_manager
+        for prefix, namespace in (prefixes or {}).items():
+            self.namespace_manager.bind(prefix, namespace, override=True, replace=True)
+        self.sample_size = sample_size
+        self.sample: list[_TripleType] = []
+        self.header_written = False
+        self.subject: Optional[Node] = None
+        self.predicate: Optional[Node] = None
+
+    def add(self, triple: _TripleType):
+        """Serialize a triple"""
+        if not self.header_written:
+            self.sample.append(triple)
+            if len(self.sample) >= self.sample_size:
+                self.write_header()
+            return
+        self.write_triple(triple)
+
+    def close(self):
+        """Terminate the last block of triples"""
+        if not self.header_written:
+            self.write_header()
+        if self.subject is not None:
+            self.write(" .\n")
+            self.subject = self.predicate = None
+
+    def write_header(self):
+        """Write the prefix declarations, then the sampled triples"""
+        for triple in self.sample:
+            for term in triple:
+                self.learn_namespace(term)
+        for prefix, namespace in self.namespace_manager.namespaces():
+            self.write(f"@prefix {prefix}: <{namespace}> .\n")
+        self.write("\n")
+        self.header_written = True
+        sample, self.sample = self.sample, []
+        for triple in sample:
+            self.write_triple(triple)
+
+    def learn_namespace(self, term: Node):
+        """Bind a prefix to the namespace of a term, if needed"""
+        if isinstance(term, Literal):
+            term = term.datatype
+        if isinstance(term, URIRef):
+            try:
+                self.namespace_manager.compute_qname(term, generate=True)
+            except ValueError:
+                pass  # the IRI cannot be split into a namespace and a local name
+
+    def render(self, term: Node) -> str:
+        """Render a term as Turtle, using prefixed names when possible"""
+        if isinstance(term, URIRef):
+            rendered = term.n3(self.namespace_manager)
+            # prefixed names cannot end with a dot in Turtle
+            return term.n3() if rendered.endswith(".") else rendered
+        return term.n3(self.namespace_manager)
+
+    def write_triple(self, triple: _TripleType):
+        subject, predicate, obj = triple
+        rendered_object = self.render(obj)
+        if subject == self.subject and predicate == self.predicate:
+            self.write(f" ,\n        {rendered_object}")
+            return
+        rendered_predicate = "a" if predicate == RDF.type else self.render(predicate)
+        if subject == self.subject:
+            self.write(f" ;\n    {rendered_predicate} {rendered_object}")
+        else:
+            if self.subject is not None:
+                self.write(" .\n\n")
+            self.write(f"{self.render(subject)} {rendered_predicate} {rendered_object}")
+            self.subject = subject
+        self.predicate = predicate
@@ -1,6 +1,45 @@
-from typing import IO, Literal, Optional
+import codecs
+import io
+import re
+from collections import deque
+from typing import IO, Iterable, Iterator, Literal, Optional, Union
+from xml.sax.xmlreader import InputSource
 
-from rdflib import Graph
+from rdflib import Dataset, Graph, Literal as RDFLiteral
+from rdflib.graph import DATASET_DEFAULT_GRAPH_ID, _TripleType
+from rdflib.plugins.parsers.notation3 import RDFSink, SinkParser
+from rdflib.plugins.parsers.ntriples import (
+    ParseError,
+    W3CNTriplesParser,
+    r_tail,
+    r_wspace,
+)
+from rdflib.plugins.parsers.rdfxml import create_parser
+from rdflib.term import Node
+
+# Formats that store exactly one triple (or quad) per line, and can therefore be parsed line by line
+LINE_BASED_FORMATS = {
+    "nt": False,
+    "nt11": False,
+    "ntriples": False,
+    "application/n-triples": False,
+    "nquads": True,
+    "nq": True,
+    "application/n-quads": True,
+}
+
+# Formats that can be parsed incrementally, statement by statement
+TURTLE_FORMATS = {"turtle", "ttl", "text/turtle"}
+RDF_XML_FORMATS = {"xml", "application/rdf+xml"}
+
+# Default size (in bytes) of the chunks read from input streams
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+# Line terminators of line-based formats (N-Triples EOL), other Unicode line breaks can appear in literals
+_LINE_TERMINATOR = re.compile(r"(\r\n|\r|\n)")
+
+# Escapes of the characters that cannot appear as such in a N-Triples string
+_NTRIPLES_STRING_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"})
 
 
 def parse_rdf_stream_as_graph(
@@ -12,7 +51,388 @@ def parse_rdf_stream_as_graph(
     :param file_format: File format. If set to None, rdflib will try to guess the format
     :return: Graph loaded with the file content
     """
-    graph = Graph()    
-    file_content = "\n".join([line.decode("utf-8") if isinstance(line, bytes) else line for line in stream.readlines()])
+    graph = Graph()
+    file_content = stream.read()
+    if isinstance(file_content, bytes):
+        file_content = file_content.decode("utf-8")
     graph.parse(data=file_content, format=file_format)
     return graph
+
+
+def parse_rdf_stream_as_dataset(stream: IO, file_format: Optional[str]) -> Dataset:
+    """Parse a stream of RDF data as an rdflib Dataset, which keeps the named graphs of the data
+
+    :param stream: Stream of RDF data
+    :param file_format: File format. If set to None, rdflib will try to guess the format
+    :return: Dataset loaded with the file content
+    """
+    dataset = Dataset()
+    file_content = stream.read()
+    if isinstance(file_content, bytes):
+        file_content = file_content.decode("utf-8")
+    dataset.parse(data=file_content, format=file_format)
+    return dataset
+
+
+def iter_rdf_stream(
+    stream: IO,
+    file_format: Optional[str],
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+) -> Iterator[_TripleType]:
+    """Iterate over the triples of a stream of RDF data, using the most efficient parser for the format.
+
+    N-Triples/N-Quads, Turtle and RDF/XML data are parsed incrementally, so memory usage is bounded
+    by the buffer size (plus the size of the largest statement) rather than by the size of the stream.
+    Other formats (JSON-LD, N3, TriX, etc) need the whole document to be resolved, e.g., JSON-LD contexts,
+    hence they are loaded in memory using parse_rdf_stream_as_graph.
+
+    :param stream: Stream of RDF data
+    :param file_format: File format. If set to None, rdflib will try to guess the format
+    :param buffer_size: Size of the chunks read from the stream
+    :yield: RDF triples
+    """
+    if is_line_based_format(file_format):
+        for statement in iter_ntriples_stream(
+            stream,
+            with_context=LINE_BASED_FORMATS[file_format],
+            buffer_size=buffer_size,
+        ):
+            yield statement[:3]
+    elif file_format in TURTLE_FORMATS:
+        yield from iter_turtle_stream(stream, buffer_size=buffer_size)
+    elif file_format in RDF_XML_FORMATS:
+        yield from iter_rdfxml_stream(stream, buffer_size=buffer_size)
+    else:
+        yield from parse_rdf_stream_as_graph(stream, file_format=file_format)
+
+
+def iter_rdf_quads(
+    stream: IO,
+    file_format: Optional[str],
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+) -> Iterator[tuple[Node, Node, Node, Optional[Node]]]:
+    """Iterate over the quads of a stream of RDF data, i.e., its triples along with their named graph.
+    Formats without named graphs are parsed as in iter_rdf_stream, and their triples are in the default graph.
+    Other formats (TriG, TriX, JSON-LD, etc) are loaded in memory using parse_rdf_stream_as_dataset.
+
+    :param stream: Stream of RDF data
+    :param file_format: File format. If set to None, rdflib will try to guess the format
+    :param buffer_size: Size of the chunks read from the stream
+    :yield: RDF quads, with None as the graph of the triples of the default graph
+    """
+    if is_line_based_format(file_format):
+        with_context = LINE_BASED_FORMATS[file_format]
+        for statement in iter_ntriples_stream(stream, with_context=with_context, buffer_size=buffer_size):
+            yield statement if with_context else (*statement, None)
+    elif file_format in TURTLE_FORMATS or file_format in RDF_XML_FORMATS:
+        for triple in iter_rdf_stream(stream, file_format, buffer_size=buffer_size):
+            yield (*triple, None)
+    else:
+        for s, p, o, g in parse_rdf_stream_as_dataset(stream, file_format=file_format).quads():
+            yield s, p, o, None if g == DATASET_DEFAULT_GRAPH_ID else g
+
+
+class _ReplayStream(io.RawIOBase):
+    """A binary stream that replays bytes already read from a stream, then reads the rest of the stream"""
+
+    def __init__(self, prefix: bytes, stream: IO[bytes]):
+        self.prefix = prefix
+        self.stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self.prefix:
+            size = min(len(buffer), len(self.prefix))
+            buffer[:size] = self.prefix[:size]
+            self.prefix = self.prefix[size:]
+            return size
+        data = self.stream.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def peek_stream(stream: IO[bytes], size: int) -> tuple[bytes, IO[bytes]]:
+    """Read the first bytes of a binary stream, without consuming them
+
+    :param stream: Stream to read from
+    :param size: Number of bytes to read
+    :return: The first bytes (fewer if the stream is shorter), and a stream that replays them before the rest of the data
+    """
+    header = b""
+    while len(header) < size:
+        chunk = stream.read(size - len(header))
+        if not chunk:
+            break
+        header += chunk
+    return header, io.BufferedReader(_ReplayStream(header, stream))
+
+
+def is_line_based_format(file_format: Optional[str]) -> bool:
+    """Test if an RDF format stores one statement per line (N-Triples, N-Quads)
+
+    :param file_format: RDF file format
+    :return: True if the format can be parsed line by line, False otherwise
+    """
+    return file_format in LINE_BASED_FORMATS
+
+
+def to_ntriples_term(term: Node) -> str:
+    """Serialize a term in N-Triples.
+    IRIs and blank nodes use their N3 serialization, but literals are escaped, as the N3 serialization
+    of multi-line literals is a long string, which spans several lines.
+
+    :param term: RDF term
+    :return: N-Triples term
+    """
+    if not isinstance(term, RDFLiteral):
+        return term.n3()
+    value = f'"{str(term).translate(_NTRIPLES_STRING_ESCAPES)}"'
+    if term.language is not None:
+        return f"{value}@{term.language}"
+    if term.datatype is not None:
+        return f"{value}^^{term.datatype.n3()}"
+    return value
+
+
+def to_ntriples_line(triple: _TripleType) -> str:
+    """Serialize a triple as a N-Triples line
+
+    :param triple: RDF triple
+    :return: N-Triples statement, with its line terminator
+    """
+    return " ".join(to_ntriples_term(term) for term in triple) + " .\n"
+
+
+def _split_lines(text: str, keepends: bool) -> list[str]:
+    parts = _LINE_TERMINATOR.split(text)
+    if not keepends:
+        return parts[::2]
+    return [line + end for line, end in zip(parts[::2], parts[1::2])] + [parts[-1]]
+
+
+def iter_chunk_lines(chunks: Iterable[Union[str, bytes]], keepends: bool = False) -> Iterator[str]:
+    """Iterate over the lines of a sequence of text or binary chunks.
+    Bytes are decoded as UTF-8, and lines are split on the line terminators (CRLF, CR or LF) only.
+    Other Unicode line breaks (e.g., U+2028) are not line terminators, as they can appear in literals.
+
+    :param chunks: Chunks of text or bytes, lines may span several chunks
+    :param keepends: If True, the line terminators are kept, otherwise they are stripped
+    :yield: Lines of the chunks
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    for chunk in chunks:
+        pending += decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        # a CR at the end of the chunk may be followed by a LF in the next one
+        end = len(pending) - 1 if pending.endswith("\r") else len(pending)
+        lines = _split_lines(pending[:end], keepends)
+        # the last line may be incomplete
+        pending = lines.pop() + pending[end:]
+        yield from lines
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        lines = _split_lines(pending, keepends)
+        if not lines[-1]:
+            lines.pop()
+        yield from lines
+
+
+def iter_stream_lines(
+    stream: IO, buffer_size: int = DEFAULT_BUFFER_SIZE
+) -> Iterator[str]:
+    """Iterate over the lines of a text or binary stream, reading it by fixed-size chunks (see iter_chunk_lines).
+
+    :param stream: Stream to read from
+    :param buffer_size: Size of the chunks read from the stream
+    :yield: Lines of the stream
+    """
+    yield from iter_chunk_lines(iter(lambda: stream.read(buffer_size), stream.read(0)))
+
+
+class _LineParser(W3CNTriplesParser):
+    """N-Triples/N-Quads parser that parses a single line at a time,
+    instead of pushing statements into an rdflib sink"""
+
+    def parse_statement(
+        self, line: str, with_context: bool = False
+    ) -> Optional[tuple[Node, ...]]:
+        self.line = line
+        self.eat(r_wspace)
+        if (not self.line) or self.line.startswith("#"):
+            return None  # The line is empty or a comment
+
+        subject = self.subject()
+        self.eat(r_wspace)
+        predicate = self.predicate()
+        self.eat(r_wspace)
+        obj = self.object()
+        self.eat(r_wspace)
+        context = (self.uriref() or self.nodeid() or None) if with_context else None
+        self.eat(r_tail)
+
+        if self.line:
+            raise ParseError(f"Trailing garbage: {self.line}")
+        if with_context:
+            return subject, predicate, obj, context
+        return subject, predicate, obj
+
+
+def iter_ntriples_stream(
+    stream: IO,
+    with_context: bool = False,
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+) -> Iterator[Union[_TripleType, tuple[Node, Node, Node, Optional[Node]]]]:
+    """Incrementally parse a stream of N-Triples (or N-Quads) data.
+    Only one line is held in memory at a time, so the stream is never fully loaded.
+
+    :param stream: Stream of RDF data
+    :param with_context: If True, parse the data as N-Quads and yield (s, p, o, g) quads,
+        where g is None for triples in the default graph
+    :param buffer_size: Size of the chunks read from the stream
+    :raises ParseError: Raised if a line isn't a valid N-Triples/N-Quads statement
+    :yield: RDF triples (or quads)
+    """
+    # the same parser is reused for all lines, so blank nodes labels are consistent in the whole file
+    parser = _LineParser()
+    for line in iter_stream_lines(stream, buffer_size=buffer_size):
+        try:
+            statement = parser.parse_statement(line, with_context=with_context)
+        except ParseError:
+            raise ParseError(f"Invalid line: {line}")
+        if statement is not None:
+            yield statement
+
+
+class _BufferGraph(Graph):
+    """Graph used as a sink by rdflib parsers, that only buffers the parsed triples
+    until they are consumed, instead of storing them"""
+
+    def __init__(self):
+        super().__init__()
+        self.pending: deque[_TripleType] = deque()
+
+    def add(self, triple):
+        self.pending.append(triple)
+        return self
+
+    def drain(self) -> Iterator[_TripleType]:
+        while self.pending:
+            yield self.pending.popleft()
+
+
+def iter_rdfxml_stream(
+    stream: IO, buffer_size: int = DEFAULT_BUFFER_SIZE
+) -> Iterator[_TripleType]:
+    """Incrementally parse a stream of RDF/XML data, using rdflib's SAX handler fed chunk by chunk.
+
+    :param stream: Stream of RDF data
+    :param buffer_size: Size of the chunks read from the stream
+    :yield: RDF triples
+    """
+    sink = _BufferGraph()
+    parser = create_parser(InputSource(), sink)
+    while True:
+        chunk = stream.read(buffer_size)
+        if not chunk:
+            break
+        parser.feed(chunk)
+        yield from sink.drain()
+    parser.close()
+    yield from sink.drain()
+
+
+class _TurtleStatementScanner:
+    """Find the boundaries of complete Turtle statements in a text buffer.
+    The scanner keeps track of strings, IRIs, comments and nested blank nodes/collections,
+    so that a "." is only considered as a statement terminator when it is at the top level.
+    The scanning state is kept between calls, so each character is only scanned once.
+    """
+
+    def __init__(self):
+        self.position = 0
+        self.depth = 0
+        self.delimiter: Optional[str] = None  # closing delimiter of the current string/IRI/comment
+
+    def find_statements_end(self, text: str) -> int:
+        """Scan the text from the last scanned position
+
+        :param text: Text buffer, which may end in the middle of a statement
+        :return: Position right after the last complete statement in the buffer, or 0 if there is none
+        """
+        end = 0
+        i = self.position
+        length = len(text)
+        while i < length:
+            char = text[i]
+            if self.delimiter is not None:
+                if char == "\\" and self.delimiter not in (">", "\n"):
+                    if i + 1 >= length:
+                        break  # wait for the escaped character
+                    i += 2
+                    continue
+                if text.startswith(self.delimiter, i):
+                    i += len(self.delimiter)
+                    self.delimiter = None
+                    continue
+                if len(self.delimiter) > 1 and text.startswith(self.delimiter[0], i) and i + 3 > length:
+                    break  # a long string delimiter may be split between two chunks
+                i += 1
+                continue
+            if char in "\"'":
+                if i + 3 > length:
+                    break  # wait to know if it is a long string delimiter
+                self.delimiter = char * 3 if text.startswith(char * 3, i) else char
+                i += len(self.delimiter)
+                continue
+            if char == "<":
+                self.delimiter = ">"
+            elif char == "#":
+                self.delimiter = "\n"
+            elif char in "[(":
+                self.depth += 1
+            elif char in "])":
+                self.depth -= 1
+            elif char == "." and self.depth == 0:
+                if i + 1 >= length:
+                    break  # wait to know if it is a statement terminator
+                if text[i + 1].isspace() or text[i + 1] == "#":
+                    end = i + 1
+            i += 1
+        self.position = i - end
+        return end
+
+
+def iter_turtle_stream(
+    stream: IO, buffer_size: int = DEFAULT_BUFFER_SIZE
+) -> Iterator[_TripleType]:
+    """Incrementally parse a stream of Turtle data.
+    The stream is read chunk by chunk, and each batch of complete statements is fed to rdflib's Turtle parser,
+    which keeps prefixes, base IRI and blank node labels between batches.
+
+    :param stream: Stream of RDF data
+    :param buffer_size: Size of the chunks read from the stream
+    :raises BadSyntax: Raised if the data isn't valid Turtle
+    :yield: RDF triples
+    """
+    sink = _BufferGraph()
+    parser = SinkParser(RDFSink(sink), baseURI=sink.absolutize(""), turtle=True)
+    parser.startDoc()
+    scanner = _TurtleStatementScanner()
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    while True:
+        chunk = stream.read(buffer_size)
+        if not chunk:
+            break
+        pending += decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        end = scanner.find_statements_end(pending)
+        if end > 0:
+            parser.feed(pending[:end])
+            pending = pending[end:]
+            yield from sink.drain()
+    pending += decoder.decode(b"", final=True)
+    parser.feed(pending)
+    parser.endDoc()
+    yield from sink.drain()
@@ -0,0 +1,34 @@
+import re
+from typing import Callable, Hashable, Iterable
+
+# Characters which are not allowed in the partition identifiers derived from file paths
+_INVALID_PARTITION_CHARACTERS = re.compile(r"[^\w.\-]+")
+
+
+def get_source_partition_id(path: str) -> str:
+    """Get the identifier of the output partition which holds the triples of a source file,
+    e.g., "/2024/data.nt.gz" -> "2024_data.nt.gz"
+
+    Args:
+      - path: The path of the source file, in its folder.
+
+    Returns: The partition identifier.
+    """
+    return _INVALID_PARTITION_CHARACTERS.sub("_", path).strip("_")
+
+
+def filter_partition_files(
+    files: Iterable[Hashable],
+    partition_id: str,
+    get_path: Callable[[Hashable], str] = str,
+) -> list[Hashable]:
+    """Get the source files of an output partition
+
+    Args:
+      - files: The identifiers of the source files.
+      - partition_id: The identifier of the output partition.
+      - get_path: A function which gets the path of a source file, given its identifier.
+
+    Returns: The identifiers of the files whose triples belong to the partition.
+    """
+    return [file for file in files if get_source_partition_id(get_path(file)) == partition_id]
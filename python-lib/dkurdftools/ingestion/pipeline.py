@@ -0,0 +1,228 @@
+import multiprocessing
+import queue
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing.synchronize import Event as EventType
+from typing import IO, Callable, ContextManager, Hashable, Iterable, Iterator, Optional
+
+from rdflib.graph import _TripleType
+from rdflib.term import Node
+
+from ..formats.compression import iter_decompressed_streams
+from ..formats.detection import detect_rdf_format
+from ..formats.utils import DEFAULT_BUFFER_SIZE, iter_rdf_quads, iter_rdf_stream
+
+# Number of triples per batch of rows sent to the writer
+DEFAULT_BATCH_SIZE = 10_000
+
+# Maximum number of batches waiting to be written, per worker process
+QUEUED_BATCHES_PER_WORKER = 4
+
+# Time (in seconds) to wait for the messages of the worker processes, once they have completed their tasks
+WORKER_MESSAGES_TIMEOUT = 30
+
+# A batch of triples, as (subject, predicate, object) N3 terms, or of quads, with the graph N3 term
+# (None for the default graph)
+RowBatch = list[tuple[str, ...]]
+
+# A function that opens an input file, given its identifier
+FileOpener = Callable[[Hashable], ContextManager[IO[bytes]]]
+
+
+class FileExtractionError(Exception):
+    """Raised when an input file cannot be extracted"""
+
+
+class FileExtractor:
+    """Parse input files into batches of rows.
+    Compressed files (gzip, bz2, xz, zip) are decompressed on the fly, and the format of each file
+    is resolved from its extension or its first bytes (see detect_rdf_format),
+    unless a format is forced, so each file is parsed with the fastest parser for its format (see iter_rdf_stream).
+    Files can also be parsed into quads, to keep the named graphs of the formats that have some (see iter_rdf_quads).
+    """
+
+    def __init__(
+        self,
+        open_file: FileOpener,
+        get_path: Callable[[Hashable], str] = str,
+        file_format: Optional[str] = None,
+        format_overrides: Optional[dict[str, str]] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        with_graphs: bool = False,
+    ):
+        """
+        :param open_file: Function that opens an input file, given its identifier
+        :param get_path: Function that gets the path of an input file, given its identifier
+        :param file_format: Format of all the input files. If None, it is resolved per file.
+        :param format_overrides: Formats per file extension, see get_format_from_path()
+        :param batch_size: Number of triples per batch
+        :param buffer_size: Size of the chunks read from the files by the streaming parsers
+        :param with_graphs: If True, files are parsed into batches of quads
+        """
+        self.open_file = open_file
+        self.get_path = get_path
+        self.file_format = file_format
+        self.format_overrides = format_overrides
+        self.batch_size = batch_size
+        self.buffer_size = buffer_size
+        self.with_graphs = with_graphs
+
+    def resolve_format(self, path: str, stream: IO[bytes]) -> tuple[Optional[str], IO[bytes]]:
+        """Get the format of an input file, and the stream to read it from"""
+        if self.file_format is not None:
+            return self.file_format, stream
+        return detect_rdf_format(stream, path, self.format_overrides)
+
+    def iter_row_batches(self, file: Hashable) -> Iterator[RowBatch]:
+        """Parse an input file into batches of rows.
+        Compressed files are decompressed on the fly, and each file of a zip archive is parsed separately
+        (see iter_decompressed_streams).
+
+        :param file: Identifier of the input file
+        :yield: Batches of triples (or quads), as N3 terms
+        """
+        with self.open_file(file) as stream:
+            for path, decompressed_stream in iter_decompressed_streams(stream, self.get_path(file)):
+                file_format, decompressed_stream = self.resolve_format(path, decompressed_stream)
+                if self.with_graphs:
+                    yield from self.iter_quad_batches(
+                        iter_rdf_quads(decompressed_stream, file_format, buffer_size=self.buffer_size)
+                    )
+                else:
+                    yield from self.iter_batches(
+                        iter_rdf_stream(decompressed_stream, file_format, buffer_size=self.buffer_size)
+                    )
+
+    def iter_batches(self, triples: Iterable[_TripleType]) -> Iterator[RowBatch]:
+        """Group triples into batches of rows"""
+        batch = []
+        for subject, predicate, obj in triples:
+            batch.append((subject.n3(), predicate.n3(), obj.n3()))
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def iter_quad_batches(self, quads: Iterable[tuple[Node, Node, Node, Optional[Node]]]) -> Iterator[RowBatch]:
+        """Group quads into batches of rows"""
+        batch = []
+        for subject, predicate, obj, graph in quads:
+            batch.append((subject.n3(), predicate.n3(), obj.n3(), None if graph is None else graph.n3()))
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def _iter_files_row_batches(
+    files: Iterable[Hashable], extractor: FileExtractor
+) -> Iterator[tuple[Hashable, RowBatch]]:
+    for file in files:
+        try:
+            for batch in extractor.iter_row_batches(file):
+                yield file, batch
+        except Exception as error:
+            raise FileExtractionError(f"Failed to extract {file}: {error}") from error
+
+
+# State of the worker processes, set by _init_worker
+_worker_extractor: FileExtractor
+_worker_batches: multiprocessing.Queue
+_worker_cancelled: EventType
+
+
+def _init_worker(extractor: FileExtractor, batches: multiprocessing.Queue, cancelled: EventType):
+    global _worker_extractor, _worker_batches, _worker_cancelled
+    _worker_extractor, _worker_batches, _worker_cancelled = extractor, batches, cancelled
+
+
+def _extract_file(file: Hashable):
+    """Parse a file in a worker process, sending its rows to the writer process through the batches queue.
+    The extraction stops early once the writer process cancels it.
+    """
+    try:
+        for batch in _worker_extractor.iter_row_batches(file):
+            if _worker_cancelled.is_set():
+                return
+            _worker_batches.put(("rows", (file, batch)))
+    except Exception:
+        _worker_batches.put(("error", f"Failed to extract {file}:\n{traceback.format_exc()}"))
+    else:
+        _worker_batches.put(("done", None))
+
+
+def _stop_workers(
+    executor: ProcessPoolExecutor, futures: list[Future], batches: multiprocessing.Queue, cancelled: EventType
+):
+    """Stop the worker processes, without waiting for the files being extracted"""
+    cancelled.set()
+    for future in futures:
+        future.cancel()
+    # the workers may be blocked on a full queue, so it is drained until they have all stopped
+    while not all(future.done() for future in futures):
+        try:
+            batches.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    executor.shutdown(wait=True)
+
+
+def extract_files(
+    files: Iterable[Hashable],
+    extractor: FileExtractor,
+    workers: int = 1,
+) -> Iterator[tuple[Hashable, RowBatch]]:
+    """Parse RDF files into batches of rows.
+
+    With several workers, files are parsed in a pool of worker processes, and the batches are sent back
+    through a bounded queue as soon as they are ready, so the output order is unspecified. Worker processes
+    are forked, so the extractor does not need to be picklable (but the file identifiers do).
+    If a worker process dies (e.g., killed when running out of memory), the extraction fails instead of
+    waiting for its files forever.
+
+    :param files: Identifiers of the input files, e.g., (folder, path) tuples
+    :param extractor: Parser of the input files
+    :param workers: Number of worker processes, files are parsed in the current process if 1
+    :raises FileExtractionError: Raised if a file cannot be extracted, or if a worker process dies
+    :yield: Identifier of the source file and batch of its triples (or quads), as N3 terms
+    """
+    if workers <= 1:
+        yield from _iter_files_row_batches(files, extractor)
+        return
+
+    files = list(files)
+    context = multiprocessing.get_context("fork")
+    batches = context.Queue(maxsize=workers * QUEUED_BATCHES_PER_WORKER)
+    cancelled = context.Event()
+    executor = ProcessPoolExecutor(
+        workers, mp_context=context, initializer=_init_worker, initargs=(extractor, batches, cancelled)
+    )
+    futures = [executor.submit(_extract_file, file) for file in files]
+    try:
+        remaining = len(files)
+        idle_seconds_after_completion = 0
+        while remaining:
+            try:
+                kind, payload = batches.get(timeout=1)
+            except queue.Empty:
+                # a dead worker process breaks the pool, which fails all the pending futures
+                failed = next((future for future in futures if future.done() and future.exception()), None)
+                if failed is not None:
+                    raise FileExtractionError(f"A worker process failed: {failed.exception()}") from failed.exception()
+                if all(future.done() for future in futures):
+                    # the last messages of the workers may still be in flight
+                    idle_seconds_after_completion += 1
+                    if idle_seconds_after_completion >= WORKER_MESSAGES_TIMEOUT:
+                        raise FileExtractionError("Worker processes stopped before extracting all the files")
+                continue
+            if kind == "rows":
+                yield payload
+            elif kind == "done":
+                remaining -= 1
+            else:
+                raise FileExtractionError(payload)
+    finally:
+        _stop_workers(executor, futures, batches, cancelled)
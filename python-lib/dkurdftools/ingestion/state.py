@@ -0,0 +1,122 @@
+import hashlib
+import json
+from io import BytesIO
+from typing import IO, TYPE_CHECKING, Callable, Hashable, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from dataiku import Folder
+
+# Path of the extraction state, in the state folder
+STATE_PATH = "/extraction_state.json"
+
+# Path of the extraction state of an output partition, in the state folder
+PARTITION_STATE_PATH = "/partitions/{partition_id}/extraction_state.json"
+
+# Size of the chunks read from the files to hash them
+HASH_BUFFER_SIZE = 1024 * 1024
+
+# The fingerprint of a file: its size and last modification time, and optionally the hash of its content
+Fingerprint = dict
+
+
+class FileChanges(NamedTuple):
+    """The input files, grouped by change since the previous extraction"""
+
+    new: list
+    changed: list
+    removed: list
+    unchanged: list
+
+
+def get_fingerprint(path_details: dict) -> Fingerprint:
+    """Get the fingerprint of a file of a managed folder
+
+    Args:
+      - path_details: Details of the file, from Folder.get_path_details().
+
+    Returns: The fingerprint of the file.
+    """
+    return {"size": path_details.get("size"), "last_modified": path_details.get("lastModified")}
+
+
+def get_state_path(partition_id: Optional[str] = None) -> str:
+    """Get the path of the extraction state of an output dataset, or of one of its partitions,
+    so partitions are extracted incrementally independently of each other"""
+    if partition_id is None:
+        return STATE_PATH
+    return PARTITION_STATE_PATH.format(partition_id=partition_id)
+
+
+def compute_stream_hash(stream: IO[bytes]) -> str:
+    """Compute the SHA-256 hash of the content of a stream"""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(HASH_BUFFER_SIZE), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionState:
+    """The fingerprints of the files extracted by the last run of the extraction recipe,
+    used to only extract the files that changed since then. The state is persisted as JSON in a managed folder.
+    """
+
+    def __init__(self, fingerprints: Optional[dict[Hashable, Fingerprint]] = None):
+        """
+        Args:
+          - fingerprints: The fingerprints of the extracted files, per file identifier (e.g., (folder, path)).
+        """
+        self.fingerprints = dict(fingerprints or {})
+
+    @classmethod
+    def load(cls, folder: "Folder", path: str = STATE_PATH) -> "ExtractionState":
+        """Load the state persisted in a folder, or an empty state if there is none"""
+        if path not in folder.list_paths_in_partition():
+            return cls()
+        with folder.get_download_stream(path) as stream:
+            records = json.load(stream)["files"]
+        return cls({tuple(record.pop("file")): record for record in records})
+
+    def save(self, folder: "Folder", path: str = STATE_PATH):
+        """Persist the state in a folder"""
+        records = [{"file": list(file), **fingerprint} for file, fingerprint in self.fingerprints.items()]
+        folder.upload_stream(path, BytesIO(json.dumps({"files": records}).encode("utf-8")))
+
+    def compare(
+        self,
+        fingerprints: dict[Hashable, Fingerprint],
+        compute_hash: Optional[Callable[[Hashable], str]] = None,
+    ) -> FileChanges:
+        """Find the files that changed since the state was recorded.
+        A file is unchanged if its size and modification time did not change. If a hash function is given,
+        files whose modification time changed are hashed, and they are unchanged if their content did not change
+        (e.g., files copied again). Computed hashes are added to the fingerprints.
+
+        Args:
+          - fingerprints: The current fingerprints of the files.
+          - compute_hash: A function computing the hash of the content of a file, given its identifier.
+
+        Returns: The files, grouped by change.
+        """
+        changes = FileChanges([], [], [], [])
+        for file, fingerprint in fingerprints.items():
+            previous = self.fingerprints.get(file)
+            # unknown sizes or modification times are considered as changed
+            if (
+                previous is not None
+                and None not in fingerprint.values()
+                and all(previous.get(key) == value for key, value in fingerprint.items())
+            ):
+                if previous.get("hash") is not None:
+                    fingerprint.setdefault("hash", previous["hash"])
+                changes.unchanged.append(file)
+                continue
+            if compute_hash is not None:
+                fingerprint["hash"] = compute_hash(file)
+            if previous is None:
+                changes.new.append(file)
+            elif compute_hash is not None and previous.get("hash") == fingerprint["hash"]:
+                changes.unchanged.append(file)
+            else:
+                changes.changed.append(file)
+        changes.removed.extend(file for file in self.fingerprints if file not in fingerprints)
+        return changes
@@ -0,0 +1,189 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+# Default time (in seconds) during which cached results are served without contacting the endpoint
+DEFAULT_CACHE_TTL = 3600
+
+# Default maximum size (in bytes) of the cache directory, the least recently used results are evicted first
+DEFAULT_CACHE_MAX_SIZE = 1024 * 1024 * 1024
+
+DEFAULT_CACHE_DIRECTORY = os.path.join(tempfile.gettempdir(), "dku-rdf-tools-sparql-cache")
+
+_ROWS_SUFFIX = ".jsonl.gz"
+_METADATA_SUFFIX = ".json"
+
+
+class ResultCache:
+    """An on-disk cache of SPARQL query results.
+
+    Each entry holds the rows of a query, as gzip-compressed JSON lines, and a metadata file with
+    the validators sent by the endpoint (ETag, Last-Modified). Entries younger than the TTL are served
+    without contacting the endpoint; older entries are revalidated with a conditional request when
+    the endpoint sent validators. The least recently used entries are evicted when the cache exceeds
+    its maximum size.
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_CACHE_DIRECTORY,
+        ttl: float = DEFAULT_CACHE_TTL,
+        max_size: int = DEFAULT_CACHE_MAX_SIZE,
+    ):
+        """
+        :param directory: Cache directory, created if needed
+        :param ttl: Time (in seconds) during which results are served without contacting the endpoint
+        :param max_size: Maximum size (in bytes) of the cached results
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_size = max_size
+        self._eviction_lock = threading.Lock()
+
+    @staticmethod
+    def get_key(url: str, query: str, *variant: str) -> str:
+        """Get the key of the results of a query
+
+        :param url: SPARQL endpoint URL
+        :param query: Normalized SPARQL query, e.g., from unparse_query()
+        :param variant: Anything else that changes the rows, e.g., the results format
+        :return Cache key
+        """
+        return hashlib.sha256("\0".join((url, query, *variant)).encode("utf-8")).hexdigest()
+
+    def _rows_path(self, key: str) -> Path:
+        return self.directory / f"{key}{_ROWS_SUFFIX}"
+
+    def _metadata_path(self, key: str) -> Path:
+        return self.directory / f"{key}{_METADATA_SUFFIX}"
+
+    def _tmp_path(self, key: str, kind: str) -> Path:
+        # unique per writer, so concurrent writers of the same entry do not interfere
+        return self.directory / f"{key}.{kind}.{os.getpid()}-{threading.get_ident()}.tmp"
+
+    def get_metadata(self, key: str) -> Optional[dict]:
+        """Get the metadata of a cache entry, or None if the entry does not exist"""
+        try:
+            with open(self._metadata_path(key), encoding="utf-8") as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return metadata if self._rows_path(key).exists() else None
+
+    def is_fresh(self, metadata: dict) -> bool:
+        """Check whether a cache entry can be served without contacting the endpoint"""
+        return time.time() - metadata["stored_at"] < self.ttl
+
+    @staticmethod
+    def get_conditional_headers(metadata: Optional[dict]) -> dict:
+        """Get the headers of a conditional request, which revalidates a cache entry"""
+        headers = {}
+        if metadata is not None:
+            if metadata.get("etag"):
+                headers["If-None-Match"] = metadata["etag"]
+            if metadata.get("last_modified"):
+                headers["If-Modified-Since"] = metadata["last_modified"]
+        return headers
+
+    def _write_metadata(self, key: str, metadata: dict):
+        tmp_path = self._tmp_path(key, "metadata")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(metadata, f)
+        os.replace(tmp_path, self._metadata_path(key))
+
+    def refresh(self, key: str, metadata: dict):
+        """Mark a cache entry as fresh, after the endpoint confirmed that it is still valid"""
+        self._write_metadata(key, {**metadata, "stored_at": time.time()})
+
+    def open_rows(self, key: str) -> Optional[Iterator[dict]]:
+        """Open the rows of a cache entry, to read them.
+        Once opened, the rows can be read even if the entry is evicted concurrently.
+
+        :param key: Cache key
+        :return: An iterator over the rows, or None if the entry does not exist (e.g., it was just evicted)
+        """
+        rows_path = self._rows_path(key)
+        try:
+            # the modification time tracks the last use of the entry, for the LRU eviction
+            os.utime(rows_path)
+            f = gzip.open(rows_path, "rt", encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        return self._read_rows(f)
+
+    @staticmethod
+    def _read_rows(f) -> Iterator[dict]:
+        with f:
+            for line in f:
+                yield json.loads(line)
+
+    def iter_rows(self, key: str) -> Iterator[dict]:
+        """Read the rows of a cache entry, which must exist"""
+        rows = self.open_rows(key)
+        if rows is None:
+            raise FileNotFoundError(f"No cache entry for key {key}")
+        yield from rows
+
+    def write_rows(
+        self,
+        key: str,
+        rows: Iterable[dict],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> Iterator[dict]:
+        """Store rows in the cache, as they are yielded.
+        The entry is only stored once all the rows have been read, so partial results are never cached.
+
+        :param key: Cache key
+        :param rows: Rows to store
+        :param etag: ETag header of the response
+        :param last_modified: Last-Modified header of the response
+        :yield: The stored rows
+        """
+        tmp_path = self._tmp_path(key, "rows")
+        try:
+            with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=1) as f:
+                for row in rows:
+                    f.write(json.dumps(row))
+                    f.write("\n")
+                    yield row
+            os.replace(tmp_path, self._rows_path(key))
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        self._write_metadata(key, {"stored_at": time.time(), "etag": etag, "last_modified": last_modified})
+        self.evict()
+
+    def remove(self, key: str):
+        """Remove a cache entry"""
+        for path in (self._metadata_path(key), self._rows_path(key)):
+            path.unlink(missing_ok=True)
+
+    def evict(self):
+        """Remove the least recently used entries, until the cache fits in its maximum size.
+        Expired entries which cannot be revalidated are removed too."""
+        with self._eviction_lock:
+            entries = []
+            for rows_path in self.directory.glob(f"*{_ROWS_SUFFIX}"):
+                try:
+                    stat = rows_path.stat()
+                except OSError:
+                    continue  # removed concurrently
+                entries.append((stat.st_mtime, stat.st_size, rows_path.name[: -len(_ROWS_SUFFIX)]))
+            entries.sort()
+            total_size = sum(size for _, size, _ in entries)
+            for _, size, key in entries:
+                metadata = self.get_metadata(key)
+                revalidable = metadata is not None and (metadata.get("etag") or metadata.get("last_modified"))
+                if total_size > self.max_size or (
+                    metadata is not None and not self.is_fresh(metadata) and not revalidable
+                ):
+                    self.remove(key)
+                    total_size -= size
@@ -1,16 +1,68 @@
-from typing import Iterator, Literal
-from rdflib import Graph
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterator, List, Literal, Optional, Union
 from rdflib.plugins.sparql.sparql import Query
-from rdflib.plugins.sparql.results.jsonresults import parseJsonTerm
+from rdflib.plugins.sparql.results.jsonresults import parseJsonTerm, termToJSON
 import requests
 
+from ..formats.utils import iter_rdf_stream
+from .cache import ResultCache
 from .parsing import (
+    parse_query,
+    parse_query_projection,
     unparse_query,
     is_query_select_type,
     is_query_construct_type,
     add_limit_to_query,
+    add_order_by_to_query,
+    get_query_limit,
     get_select_variables,
+    has_global_modifiers,
 )
+from .partitioning import add_hash_partition_filter, endpoint_slot, list_hash_partitions
+from .results import (
+    RESPONSE_CHUNK_SIZE,
+    iter_csv_results_bindings,
+    iter_json_results_bindings,
+    iter_tsv_results_bindings,
+)
+from .session import DEFAULT_MAX_RETRIES, DEFAULT_TIMEOUT, send_sparql_request
+
+# Media types of the SPARQL SELECT results formats
+SELECT_RESPONSE_MEDIA_TYPES = {
+    "json": "application/sparql-results+json",
+    "tsv": "text/tab-separated-values",
+    "csv": "text/csv",
+}
+
+# Accept header for CONSTRUCT queries: N-Triples can be parsed line by line, so it is preferred,
+# then Turtle and RDF/XML, which can be parsed incrementally too
+CONSTRUCT_ACCEPT_HEADER = (
+    "application/n-triples, text/turtle;q=0.9, application/rdf+xml;q=0.8, application/xml;q=0.7"
+)
+
+# RDF formats of the CONSTRUCT results, per media type
+CONSTRUCT_RESPONSE_FORMATS = {
+    "application/n-triples": "nt",
+    "text/plain": "nt",
+    "text/turtle": "turtle",
+    "application/x-turtle": "turtle",
+    "application/rdf+xml": "xml",
+    "application/xml": "xml",
+    "text/xml": "xml",
+}
+
+# Number of partitions extracted concurrently, when the number of concurrent requests isn't limited
+DEFAULT_PARTITION_WORKERS = 4
+
+# Maximum number of rows buffered when several queries are run concurrently
+PARTITIONED_ROWS_QUEUE_SIZE = 10_000
+
+# Marker of the end of the rows of a query, when several queries are run concurrently
+_QUERY_DONE = object()
 
 
 class UnsupportedSparqlQueryType(Exception):
@@ -44,13 +96,42 @@ def get_read_schema(parsed_query: Query) -> dict:
     """
     query_type = get_and_check_sparql_query_type(parsed_query)
     if query_type == "select":
+        return build_read_schema(get_select_variables(parsed_query))
+    # else, the query is a construct query
+    return build_read_schema(None)
+
+
+def get_query_read_schema(query: str) -> dict:
+    """Get the DSS dataset read schema from a string SPARQL query.
+    The schema is read from the syntax tree of the query when possible, which is cheaper than parsing
+    it into a logical query plan (see parse_query_projection).
+
+    :param query: String SPARQL query
+    :raises UnsupportedSparqlQueryType: Raised if the SPARQL query type isn't supported
+    :return: DSS dataset schema
+    """
+    query_type, variables = parse_query_projection(query)
+    if query_type not in ("select", "construct"):
+        raise UnsupportedSparqlQueryType("Only SELECT and CONSTRUCT query are supported")
+    if query_type == "select" and variables is None:
+        # the variables of SELECT * queries are the variables in scope, known from the query plan
+        return get_read_schema(parse_query(query))
+    return build_read_schema(variables)
+
+
+def build_read_schema(select_variables: Optional[List[str]]) -> dict:
+    """Build the DSS dataset read schema of a SPARQL query
+
+    :param select_variables: Variables of a Select query, or None for a Construct query
+    :return: DSS dataset schema
+    """
+    if select_variables is not None:
         return {
             "columns": [
                 {"name": select_var, "type": "STRING"}
-                for select_var in get_select_variables(parsed_query)
+                for select_var in select_variables
             ]
         }
-    # else, the query is a construct query
     return {
         "columns": [
             {"name": "subject", "type": "STRING"},
@@ -60,55 +141,443 @@ def get_read_schema(parsed_query: Query) -> dict:
     }
 
 
-def generate_rows(
+def get_select_accept_header(select_response_format: Literal["json", "tsv", "csv"]) -> str:
+    """Get the Accept header used to negotiate the format of SELECT results.
+    TSV and CSV are cheaper to parse than JSON, but not supported by all endpoints,
+    so JSON is always accepted as a fallback, with a lower preference.
+
+    :param select_response_format: Preferred results format
+    :return: Accept header value
+    """
+    accept = SELECT_RESPONSE_MEDIA_TYPES[select_response_format]
+    if select_response_format != "json":
+        accept += f", {SELECT_RESPONSE_MEDIA_TYPES['json']};q=0.5"
+    return accept
+
+
+def iter_select_rows(
+    res: requests.Response, select_results_type: Literal["json", "n3"] = "json"
+) -> Iterator[dict]:
+    """Generates rows from the response to a SELECT query, whatever the results format sent by the endpoint
+
+    :param res: HTTP response, opened in streaming mode
+    :param select_results_type: Format of the values in the output rows
+    :yield: Dataset record
+    """
+    content_type = res.headers.get("Content-Type", "")
+    chunks = res.iter_content(chunk_size=RESPONSE_CHUNK_SIZE)
+    if SELECT_RESPONSE_MEDIA_TYPES["tsv"] in content_type:
+        bindings = iter_tsv_results_bindings(chunks)
+    elif SELECT_RESPONSE_MEDIA_TYPES["csv"] in content_type:
+        bindings = iter_csv_results_bindings(chunks)
+    else:
+        # JSON results, which is the default format per the standard
+        for result in iter_json_results_bindings(chunks):
+            yield {
+                key: value
+                if select_results_type == "json"
+                else parseJsonTerm(value).n3()
+                for key, value in result.items()
+            }
+        return
+    for result in bindings:
+        yield {
+            key: termToJSON(None, value) if select_results_type == "json" else value.n3()
+            for key, value in result.items()
+        }
+
+
+def get_construct_response_format(res: requests.Response) -> Optional[str]:
+    """Get the RDF format of the response to a CONSTRUCT query, from its Content-Type
+
+    :param res: HTTP response
+    :return: RDF format, or None if it is unknown (rdflib will then try to guess it)
+    """
+    media_type = res.headers.get("Content-Type", "").split(";")[0].strip().lower()
+    return CONSTRUCT_RESPONSE_FORMATS.get(media_type)
+
+
+def iter_construct_rows(res: requests.Response) -> Iterator[dict]:
+    """Generates rows from the response to a CONSTRUCT query.
+    The RDF data is parsed as it is received (see iter_rdf_stream)
+
+    :param res: HTTP response, opened in streaming mode
+    :yield: Dataset record
+    """
+    # let urllib3 decompress the raw stream, as requests does for iter_content()
+    res.raw.decode_content = True
+    for s, p, o in iter_rdf_stream(res.raw, get_construct_response_format(res)):
+        yield {"subject": s.n3(), "predicate": p.n3(), "object": o.n3()}
+
+
+def send_query(
+    url: str,
+    parsed_query: Query,
+    accept: str,
+    timeout: Union[float, tuple[float, float], None] = DEFAULT_TIMEOUT,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    headers: Optional[dict] = None,
+) -> requests.Response:
+    """Send a SPARQL query to an endpoint, with the shared session of the endpoint. The response body is streamed.
+
+    :param url: SPARQL endpoint URL
+    :param parsed_query: SPARQL query
+    :param accept: Accept header, used to negotiate the results format
+    :param timeout: (connect, read) timeouts, in seconds
+    :param max_retries: Maximum number of retries of the request
+    :param headers: Additional request headers
+    :return: HTTP response
+    """
+    return send_sparql_request(
+        url, unparse_query(parsed_query), accept, timeout=timeout, max_retries=max_retries, headers=headers
+    )
+
+
+def execute_query(
     url: str,
     parsed_query: Query,
-    records_limit: int = -1,
     select_results_type: Literal["json", "n3"] = "json",
+    select_response_format: Literal["json", "tsv", "csv"] = "json",
+    max_concurrent_requests: int = 0,
+    timeout: Union[float, tuple[float, float], None] = DEFAULT_TIMEOUT,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    cache: Optional[ResultCache] = None,
 ) -> Iterator[dict]:
-    """Generates rows for a DSS dataset from a SPARQL endpoint
+    """Execute a SPARQL query against an endpoint, in a single HTTP request
 
     :param url: SPARQL endpoint URL
     :param parsed_query: SPARQL query
-    :param records_limit: Maximum number of records to output, defaults to -1 (no limit)
     :param select_results_type: Results format for SELECT queries
-    :raises UnsupportedSparqlQueryType: Raised if the SPARQL query type isn't supported
+    :param select_response_format: Preferred format of the results sent by the endpoint for SELECT queries
+    :param max_concurrent_requests: Maximum number of concurrent requests to the endpoint host, 0 for no limit
+    :param timeout: (connect, read) timeouts of the requests, in seconds
+    :param max_retries: Maximum number of retries of a request, on connection errors and temporary failures
+    :param cache: If set, results are served from this cache when possible, and stored in it otherwise
     :yield: Dataset record
     """
     query_type = get_and_check_sparql_query_type(parsed_query)
-    if records_limit > -1:
-        parsed_query = add_limit_to_query(parsed_query, records_limit)
 
     # Add header to ensure the endpoint returns the same data format per query
     # it's logically the default format, per the standard, but we cannot be sure as some implemntation
     # uses a custom output format by default
     if query_type == "construct":
-        accept = "application/xml;charset=utf-8"
+        accept = CONSTRUCT_ACCEPT_HEADER
     else:
-        accept = "application/sparql-results+json"
-    headers = {
-        "Accept": accept,
-        "User-agent": "dataiku/rdf-tools-plugin",
-    }
-    res = requests.get(
-        url, params={"query": unparse_query(parsed_query)}, headers=headers
-    )
-    res.raise_for_status()
+        accept = get_select_accept_header(select_response_format)
 
-    # format the output depending on the query type
-    if query_type == "construct":
-        # construct queries output raw RDF data
-        graph = Graph()
-        graph.parse(data=res.text, format="xml")
-        for s, p, o in graph:
-            yield {"subject": s.n3(), "predicate": p.n3(), "object": o.n3()}
+    headers = {}
+    if cache is not None:
+        # the rows depend on the output format, and on the format of the response, as CSV responses are lossy
+        cache_key = cache.get_key(
+            url,
+            unparse_query(parsed_query),
+            query_type,
+            select_results_type if query_type == "select" else "",
+            select_response_format if query_type == "select" else "",
+        )
+        metadata = cache.get_metadata(cache_key)
+        if metadata is not None and cache.is_fresh(metadata):
+            cached_rows = cache.open_rows(cache_key)
+            if cached_rows is not None:
+                yield from cached_rows
+                return
+            # the entry was evicted since its metadata was read
+            metadata = None
+        # stale results are revalidated by the endpoint, if it sent validators
+        headers = cache.get_conditional_headers(metadata)
+
+    # the request slot is held until the response is fully read
+    with endpoint_slot(url, max_concurrent_requests):
+        res = send_query(url, parsed_query, accept, timeout=timeout, max_retries=max_retries, headers=headers)
+        if res.status_code in (406, 415) and query_type == "select" and select_response_format != "json":
+            # the endpoint refused the results format, fallback to JSON
+            res.close()
+            res = send_query(
+                url,
+                parsed_query,
+                get_select_accept_header("json"),
+                timeout=timeout,
+                max_retries=max_retries,
+                headers=headers,
+            )
+
+        # the response body is streamed, so rows are yielded as soon as they are received
+        with res:
+            if res.status_code == 304 and headers:
+                # the cached results are still valid
+                cache.refresh(cache_key, metadata)
+            else:
+                res.raise_for_status()
+
+                # format the output depending on the query type
+                if query_type == "construct":
+                    # construct queries output raw RDF data
+                    rows = iter_construct_rows(res)
+                else:
+                    rows = iter_select_rows(res, select_results_type)
+                if cache is not None:
+                    rows = cache.write_rows(
+                        cache_key, rows, etag=res.headers.get("ETag"), last_modified=res.headers.get("Last-Modified")
+                    )
+                yield from rows
+                return
+    cached_rows = cache.open_rows(cache_key)
+    if cached_rows is None:
+        # the entry was evicted since it was revalidated, so the query is sent again, without validators
+        cache.remove(cache_key)
+        cached_rows = execute_query(
+            url,
+            parsed_query,
+            select_results_type=select_results_type,
+            select_response_format=select_response_format,
+            max_concurrent_requests=max_concurrent_requests,
+            timeout=timeout,
+            max_retries=max_retries,
+            cache=cache,
+        )
+    yield from cached_rows
+
+
+def generate_paginated_rows(
+    url: str,
+    parsed_query: Query,
+    page_size: int,
+    records_limit: int = -1,
+    order_pages: bool = False,
+    prefetch_pages: int = 0,
+    **kwargs,
+) -> Iterator[dict]:
+    """Generates rows from a SPARQL endpoint, by fetching the results page by page, using LIMIT/OFFSET clauses.
+    The pages stay within the LIMIT/OFFSET of the query itself, if it has one.
+
+    :param url: SPARQL endpoint URL
+    :param parsed_query: SPARQL query
+    :param page_size: Number of solutions per page
+    :param records_limit: Maximum number of records to output, defaults to -1 (no limit)
+    :param order_pages: If True, the solutions are ordered by all variables (unless the query
+        has an ORDER BY clause), so pages are deterministic
+    :param prefetch_pages: Number of pages fetched in advance, in background threads. If 0, pages are fetched
+        sequentially and streamed.
+    :param kwargs: Additional arguments passed to execute_query()
+    :yield: Dataset record
+    """
+    query_type = get_and_check_sparql_query_type(parsed_query)
+    if order_pages:
+        parsed_query = add_order_by_to_query(parsed_query)
+    query_limit = get_query_limit(parsed_query)
+
+    def iter_pages() -> Iterator[tuple[Query, int]]:
+        """Generates the query of each page, with its number of solutions"""
+        offset = 0
+        while query_limit is None or offset < query_limit:
+            length = page_size if query_limit is None else min(page_size, query_limit - offset)
+            if query_type == "select" and records_limit > -1:
+                # one row per solution, so there is no need to fetch more than the records limit
+                length = min(length, records_limit - offset)
+                if length <= 0:
+                    return
+            yield add_limit_to_query(parsed_query, length, offset), length
+            offset += length
+
+    def is_last_page(nb_rows: int, length: int) -> bool:
+        # the number of triples produced by a CONSTRUCT query does not match its number of solutions
+        return nb_rows == 0 if query_type == "construct" else nb_rows < length
+
+    pages = iter_pages()
+    if prefetch_pages <= 0:
+        for page_query, length in pages:
+            nb_rows = 0
+            for row in execute_query(url, page_query, **kwargs):
+                nb_rows += 1
+                yield row
+            if is_last_page(nb_rows, length):
+                return
+        return
+
+    def fetch_page(page_query: Query) -> list[dict]:
+        return list(execute_query(url, page_query, **kwargs))
+
+    with ThreadPoolExecutor(max_workers=prefetch_pages) as executor:
+        futures = deque(
+            (executor.submit(fetch_page, page_query), length)
+            for page_query, length in islice(pages, prefetch_pages)
+        )
+        try:
+            while futures:
+                future, length = futures.popleft()
+                rows = future.result()
+                yield from rows
+                if is_last_page(len(rows), length):
+                    return
+                for page_query, next_length in islice(pages, 1):
+                    futures.append((executor.submit(fetch_page, page_query), next_length))
+        finally:
+            for future, _ in futures:
+                future.cancel()
+
+
+def generate_query_rows(
+    url: str,
+    parsed_query: Query,
+    records_limit: int = -1,
+    page_size: int = 0,
+    order_pages: bool = False,
+    prefetch_pages: int = 0,
+    **kwargs,
+) -> Iterator[dict]:
+    """Generates rows from a SPARQL endpoint, in a single request or page by page.
+    The number of rows may exceed records_limit for CONSTRUCT queries, whose solutions produce several triples.
+
+    :param url: SPARQL endpoint URL
+    :param parsed_query: SPARQL query
+    :param records_limit: Maximum number of solutions to fetch, defaults to -1 (no limit)
+    :param page_size: If positive, results are fetched by pages of this number of solutions
+        (see generate_paginated_rows)
+    :param order_pages: If True, pages are made deterministic by ordering the solutions
+    :param prefetch_pages: Number of pages fetched in advance
+    :param kwargs: Additional arguments passed to execute_query()
+    :yield: Dataset record
+    """
+    if page_size > 0:
+        yield from generate_paginated_rows(
+            url,
+            parsed_query,
+            page_size,
+            records_limit=records_limit,
+            order_pages=order_pages,
+            prefetch_pages=prefetch_pages,
+            **kwargs,
+        )
+        return
+    if records_limit > -1:
+        parsed_query = add_limit_to_query(parsed_query, records_limit)
+    yield from execute_query(url, parsed_query, **kwargs)
+
+
+def generate_partitioned_rows(
+    url: str,
+    parsed_queries: List[Query],
+    max_workers: int,
+    **kwargs,
+) -> Iterator[dict]:
+    """Generates rows from several SPARQL queries, e.g., the partitions of a query, run concurrently.
+    Rows are yielded as soon as they are received, so the rows of the queries are interleaved.
+
+    :param url: SPARQL endpoint URL
+    :param parsed_queries: SPARQL queries
+    :param max_workers: Maximum number of queries run concurrently
+    :param kwargs: Additional arguments passed to generate_query_rows()
+    :yield: Dataset record
+    """
+    rows_queue = queue.Queue(maxsize=PARTITIONED_ROWS_QUEUE_SIZE)
+    stop = threading.Event()
+
+    def put(item):
+        # the consumer may stop before the end of the rows, so the producers must not block forever
+        while not stop.is_set():
+            try:
+                rows_queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def produce(parsed_query: Query):
+        try:
+            if stop.is_set():
+                return
+            for row in generate_query_rows(url, parsed_query, **kwargs):
+                if stop.is_set():
+                    return
+                put(row)
+            put(_QUERY_DONE)
+        except Exception as error:
+            put(error)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for parsed_query in parsed_queries:
+            executor.submit(produce, parsed_query)
+        remaining = len(parsed_queries)
+        while remaining:
+            item = rows_queue.get()
+            if item is _QUERY_DONE:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def generate_rows(
+    url: str,
+    parsed_query: Query,
+    records_limit: int = -1,
+    select_results_type: Literal["json", "n3"] = "json",
+    select_response_format: Literal["json", "tsv", "csv"] = "json",
+    page_size: int = 0,
+    order_pages: bool = False,
+    prefetch_pages: int = 0,
+    partition_variable: Optional[str] = None,
+    partition_id: Optional[str] = None,
+    partition_hash_length: int = 1,
+    max_concurrent_requests: int = 0,
+    timeout: Union[float, tuple[float, float], None] = DEFAULT_TIMEOUT,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    cache: Optional[ResultCache] = None,
+) -> Iterator[dict]:
+    """Generates rows for a DSS dataset from a SPARQL endpoint
+
+    :param url: SPARQL endpoint URL
+    :param parsed_query: SPARQL query
+    :param records_limit: Maximum number of records to output, defaults to -1 (no limit)
+    :param select_results_type: Results format for SELECT queries
+    :param select_response_format: Preferred format of the results sent by the endpoint for SELECT queries,
+        JSON is used if the endpoint does not support it
+    :param page_size: If positive, results are fetched by pages of this number of solutions
+        (see generate_paginated_rows)
+    :param order_pages: If True, pages are made deterministic by ordering the solutions
+    :param prefetch_pages: Number of pages fetched in advance
+    :param partition_variable: Variable used to partition the solutions by hash (see add_hash_partition_filter)
+    :param partition_id: Partition to extract. If None, and the query has a partition variable,
+        all the partitions are extracted concurrently, unless the query has LIMIT/OFFSET, DISTINCT or aggregates
+        (see has_global_modifiers), which would be applied within each partition, so it is sent as is.
+    :param partition_hash_length: Number of hash characters of the partition ids
+    :param max_concurrent_requests: Maximum number of concurrent requests to the endpoint, 0 for no limit
+    :param timeout: (connect, read) timeouts of the requests, in seconds
+    :param max_retries: Maximum number of retries of a request, on connection errors and temporary failures
+    :param cache: If set, the results of each request are cached (see ResultCache)
+    :raises UnsupportedSparqlQueryType: Raised if the SPARQL query type isn't supported
+    :yield: Dataset record
+    """
+    get_and_check_sparql_query_type(parsed_query)
+    query_kwargs = {
+        "records_limit": records_limit,
+        "select_results_type": select_results_type,
+        "select_response_format": select_response_format,
+        "page_size": page_size,
+        "order_pages": order_pages,
+        "prefetch_pages": prefetch_pages,
+        "max_concurrent_requests": max_concurrent_requests,
+        "timeout": timeout,
+        "max_retries": max_retries,
+        "cache": cache,
+    }
+    if partition_variable and partition_id:
+        parsed_query = add_hash_partition_filter(parsed_query, partition_variable, partition_id)
+        rows = generate_query_rows(url, parsed_query, **query_kwargs)
+    elif partition_variable and max_concurrent_requests != 1 and not has_global_modifiers(parsed_query):
+        parsed_queries = [
+            add_hash_partition_filter(parsed_query, partition_variable, hash_prefix)
+            for hash_prefix in list_hash_partitions(partition_hash_length)
+        ]
+        max_workers = max_concurrent_requests if max_concurrent_requests > 0 else DEFAULT_PARTITION_WORKERS
+        rows = generate_partitioned_rows(url, parsed_queries, max_workers, **query_kwargs)
     else:
-        # sparql queries output rows of bindings
-        sparql_results = res.json()
-        for result in sparql_results.get("results", {}).get("bindings", []):
-            yield {
-                key: value
-                if select_results_type == "json"
-                else parseJsonTerm(value).n3()
-                for key, value in result.items()
-            }
+        rows = generate_query_rows(url, parsed_query, **query_kwargs)
+    # CONSTRUCT queries may produce more triples than solutions, so the output is truncated too
+    if records_limit > -1:
+        rows = islice(rows, records_limit)
+    yield from rows
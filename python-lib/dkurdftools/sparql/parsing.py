@@ -1,13 +1,24 @@
-from typing import List
+from functools import lru_cache
+from typing import List, Optional, Tuple
 
 from rdflib.plugins.sparql.algebra import translateQuery
 from rdflib.plugins.sparql.parser import parseQuery
 from rdflib.plugins.sparql.algebra import translateAlgebra
+from rdflib.plugins.sparql.parserutils import CompValue
 from rdflib.plugins.sparql.sparql import Query
 
+# Solution modifiers that can wrap the projection of a query
+_MODIFIERS = ("Slice", "Distinct", "Reduced")
 
+# Number of query plans memoized by parse_query, per process
+PARSED_QUERY_CACHE_SIZE = 128
+
+
+@lru_cache(maxsize=PARSED_QUERY_CACHE_SIZE)
 def parse_query(query: str) -> Query:
-    """Parse a string SPARQL query into a logical query plan
+    """Parse a string SPARQL query into a logical query plan.
+    Plans are memoized, so they are shared by all the callers and must not be modified in place
+    (the functions of this module return new plans).
 
     :param query: String SPARQL query
     :return SPARQL logical query plan
@@ -15,13 +26,102 @@ def parse_query(query: str) -> Query:
     return translateQuery(parseQuery(query))
 
 
+@lru_cache(maxsize=PARSED_QUERY_CACHE_SIZE)
+def parse_query_projection(query: str) -> Tuple[str, Optional[List[str]]]:
+    """Get the type and the projected variables of a string SPARQL query, from its syntax tree only.
+    This is cheaper than parse_query(), as the query isn't translated into a logical query plan.
+
+    :param query: String SPARQL query
+    :return The query type ("select", "construct", "ask" or "describe"), and the projected variables
+        of a Select query, or None if they can only be known from the query plan (SELECT *)
+    """
+    syntax_tree = parseQuery(query)[1]
+    query_type = syntax_tree.name[: -len("Query")].lower()
+    # CompValue.get() returns the key of missing values, so keys are checked explicitly
+    if query_type != "select" or "projection" not in syntax_tree:
+        return query_type, None
+    return query_type, [
+        str(item["var"] if "var" in item else item["evar"]) for item in syntax_tree["projection"]
+    ]
+
+
+def _get_projection(pattern: CompValue) -> CompValue:
+    """Get the projection of a query, below its solution modifiers"""
+    while pattern.name in _MODIFIERS:
+        pattern = pattern.p
+    return pattern
+
+
+def _find_where_clause(query: str) -> int:
+    """Find the brace that opens the WHERE clause of a query translated by translateAlgebra(),
+    i.e., the first one outside of the expressions of the projection and of string literals
+    """
+    depth = 0
+    position = 0
+    while position < len(query):
+        character = query[position]
+        if character in "\"'":
+            # skip string literals, which are long strings if their quote is tripled
+            quote = character * 3 if query.startswith(character * 3, position) else character
+            position += len(quote)
+            while not query.startswith(quote, position):
+                position += 2 if query[position] == "\\" else 1
+            position += len(quote)
+            continue
+        if character == "(":
+            depth += 1
+        elif character == ")":
+            depth -= 1
+        elif character == "{" and depth == 0:
+            return position
+        position += 1
+    raise ValueError(f"No WHERE clause in query: {query}")
+
+
+def _unparse_dataset_clause(algebra: CompValue) -> str:
+    """Turn the FROM and FROM NAMED clauses of a query into a string, as translateAlgebra() drops them"""
+    clauses = []
+    for clause in algebra.get("datasetClause") or []:
+        if "default" in clause:
+            clauses.append(f"FROM {clause['default'].n3()} ")
+        else:
+            clauses.append(f"FROM NAMED {clause['named'].n3()} ")
+    return "".join(clauses)
+
+
 def unparse_query(parsed_query: Query) -> str:
     """Turn a logical SPARQL query plan into a string SPARQL query
 
     :param parsed_query: SPARQL logical query plan
     :return String SPARQL query
     """
-    return translateAlgebra(parsed_query)
+    algebra = parsed_query.algebra
+    if not is_query_construct_type(parsed_query):
+        query = translateAlgebra(parsed_query)
+        dataset_clause = _unparse_dataset_clause(algebra)
+        if not dataset_clause:
+            return query
+        where_position = _find_where_clause(query)
+        return f"{query[:where_position]} {dataset_clause}{query[where_position:]}"
+    # rdflib only translates SELECT queries, so the WHERE clause of a CONSTRUCT query
+    # is translated as a SELECT query, and its projection replaced by the template
+    select_query = Query(
+        parsed_query.prologue,
+        CompValue(
+            "SelectQuery",
+            p=algebra.p,
+            PV=_get_projection(algebra.p).PV,
+            datasetClause=algebra.datasetClause,
+        ),
+    )
+    where_clause = translateAlgebra(select_query)
+    # a CONSTRUCT WHERE query has no template, it is the basic graph pattern of the WHERE clause
+    template_triples = algebra.template or _get_projection(algebra.p).p.get("triples", [])
+    template = "".join(f"{s.n3()} {p.n3()} {o.n3()} ." for s, p, o in template_triples)
+    where_position = _find_where_clause(where_clause)
+    return (
+        f"CONSTRUCT {{{template}}} {_unparse_dataset_clause(algebra)}WHERE {where_clause[where_position:]}"
+    )
 
 
 def is_query_select_type(parsed_query: Query) -> bool:
@@ -42,10 +142,120 @@ def is_query_construct_type(parsed_query: Query) -> bool:
     return parsed_query.algebra.name.lower() == "constructquery"
 
 
-def add_limit_to_query(parsed_query: Query, limit: int) -> Query:
-    # TODO update AST with a LIMIT clause
-    return parsed_query
+def _with_algebra_pattern(parsed_query: Query, pattern: CompValue) -> Query:
+    """Copy a SPARQL logical query plan, with a new root pattern"""
+    algebra = parsed_query.algebra
+    return Query(parsed_query.prologue, CompValue(algebra.name, **{**algebra, "p": pattern}))
+
+
+def add_limit_to_query(parsed_query: Query, limit: int, offset: int = 0) -> Query:
+    """Restrict a SPARQL logical query plan to a window of its solutions (LIMIT/OFFSET).
+    If the query already has a LIMIT/OFFSET clause, the window is applied to the results of that clause,
+    i.e., the query never returns solutions outside of its own LIMIT.
+
+    :param parsed_query: SPARQL logical query plan
+    :param limit: Maximum number of solutions
+    :param offset: Number of solutions to skip
+    :return New SPARQL logical query plan
+    """
+    pattern = parsed_query.algebra.p
+    if pattern.name == "Slice":
+        start = pattern.start + offset
+        length = limit
+        if pattern.length is not None:
+            length = max(0, min(limit, pattern.length - offset))
+        pattern = pattern.p
+    else:
+        start, length = offset, limit
+    return _with_algebra_pattern(
+        parsed_query, CompValue("Slice", p=pattern, start=start, length=length)
+    )
+
+
+def get_query_limit(parsed_query: Query) -> Optional[int]:
+    """Get the LIMIT of a SPARQL logical query plan
+
+    :param parsed_query: SPARQL logical query plan
+    :return The limit, or None if the query has no LIMIT clause
+    """
+    pattern = parsed_query.algebra.p
+    return pattern.length if pattern.name == "Slice" else None
+
+
+def _copy_modifiers(parsed_query: Query) -> tuple[CompValue, CompValue]:
+    """Copy the chain of solution modifiers of a SPARQL logical query plan, down to its projection,
+    so the projection can be updated in place without altering the original plan.
+
+    :param parsed_query: SPARQL logical query plan
+    :return The copied root pattern and projection
+    """
+    pattern = project = CompValue(parsed_query.algebra.p.name, **parsed_query.algebra.p)
+    while project.name in _MODIFIERS:
+        project["p"] = CompValue(project.p.name, **project.p)
+        project = project.p
+    return pattern, project
+
+
+def add_order_by_to_query(parsed_query: Query) -> Query:
+    """Make the order of the solutions of a SPARQL logical query plan deterministic,
+    by ordering them by all projected variables, if the query has no ORDER BY clause.
+    This ensures that pages fetched with LIMIT/OFFSET do not overlap.
+
+    :param parsed_query: SPARQL logical query plan
+    :return New SPARQL logical query plan
+    """
+    pattern, project = _copy_modifiers(parsed_query)
+    if project.name == "Project" and project.p.name != "OrderBy":
+        project["p"] = CompValue(
+            "OrderBy",
+            p=project.p,
+            expr=[CompValue("OrderCondition", expr=var, order=None) for var in project.PV],
+        )
+    return _with_algebra_pattern(parsed_query, pattern)
+
+
+def has_global_modifiers(parsed_query: Query) -> bool:
+    """Check whether a SPARQL logical query plan has modifiers applied to all its solutions at once:
+    LIMIT/OFFSET, DISTINCT/REDUCED or aggregates (GROUP BY). The results of such a query are not
+    the union of the results of the query over disjoint subsets of its solutions (e.g., hash partitions).
+
+    :param parsed_query: SPARQL logical query plan
+    :return True if the query has global modifiers
+    """
+    # the modifiers of the query sit on top of its WHERE clause (subqueries are below a ToMultiSet)
+    pattern = parsed_query.algebra.p
+    while isinstance(pattern, CompValue) and pattern.name != "ToMultiSet":
+        if pattern.name in _MODIFIERS or pattern.name == "AggregateJoin":
+            return True
+        pattern = pattern.get("p")
+    return False
 
 
 def get_select_variables(parsed_query: Query) -> List[str]:
     return [str(var) for var in parsed_query.algebra.PV]
+
+
+def parse_expression(expression: str) -> CompValue:
+    """Parse a string SPARQL expression, e.g., the condition of a FILTER
+
+    :param expression: SPARQL expression
+    :return Logical expression
+    """
+    return parse_query(f"SELECT * WHERE {{ FILTER({expression}) }}").algebra.p.p.expr
+
+
+def add_filter_to_query(parsed_query: Query, expression: str) -> Query:
+    """Filter the solutions of a SPARQL logical query plan.
+    The filter is applied to the solutions before their projection and ordering,
+    so the expression can use any variable of the projection.
+
+    :param parsed_query: SPARQL logical query plan
+    :param expression: SPARQL expression of the filter
+    :return New SPARQL logical query plan
+    """
+    pattern, parent = _copy_modifiers(parsed_query)
+    if parent.p.name == "OrderBy":
+        parent["p"] = CompValue(parent.p.name, **parent.p)
+        parent = parent.p
+    parent["p"] = CompValue("Filter", expr=parse_expression(expression), p=parent.p)
+    return _with_algebra_pattern(parsed_query, pattern)
@@ -0,0 +1,86 @@
+import threading
+from contextlib import contextmanager
+from itertools import product
+from typing import Iterator, List
+from urllib.parse import urlparse
+
+from rdflib.plugins.sparql.sparql import Query
+
+from .parsing import add_filter_to_query
+
+# Name of the partitioning dimension of SPARQL datasets
+HASH_PARTITION_DIMENSION = "hash"
+
+_HEX_DIGITS = "0123456789abcdef"
+
+# Concurrency limits, per endpoint host and limit, shared by all the queries of the process
+_endpoint_semaphores: dict[tuple[str, int], threading.BoundedSemaphore] = {}
+_endpoint_semaphores_lock = threading.Lock()
+
+
+class InvalidPartitionId(ValueError):
+    """Raised when a partition id does not belong to the partitioning scheme"""
+
+
+def list_hash_partitions(hash_length: int = 1) -> List[str]:
+    """List the partitions of the hash partitioning scheme: the prefixes of the hexadecimal
+    MD5 hashes of the values, so there are 16 partitions per hash character.
+
+    :param hash_length: Number of hash characters in a partition id
+    :return Partition ids
+    """
+    return ["".join(digits) for digits in product(_HEX_DIGITS, repeat=hash_length)]
+
+
+def get_partitioning() -> dict:
+    """Get the DSS partitioning of a SPARQL dataset partitioned by hash
+
+    :return DSS partitioning
+    """
+    return {"dimensions": [{"name": HASH_PARTITION_DIMENSION, "type": "value"}]}
+
+
+def add_hash_partition_filter(parsed_query: Query, variable: str, partition_id: str) -> Query:
+    """Restrict a SPARQL query to a partition of its solutions: the solutions where the MD5 hash
+    of the value of a variable starts with the partition id.
+    Values without a hash (unbound variables and blank nodes) belong to the "0...0" partition,
+    so the partitions are disjoint and cover all the solutions.
+
+    Note that LIMIT/OFFSET clauses and aggregates of the query are applied within each partition.
+
+    :param parsed_query: SPARQL logical query plan
+    :param variable: Name of the partitioning variable
+    :param partition_id: Hash prefix, see list_hash_partitions()
+    :raises InvalidPartitionId: Raised if the partition id isn't a hash prefix
+    :return New SPARQL logical query plan
+    """
+    partition_id = partition_id.lower()
+    if not partition_id or any(char not in _HEX_DIGITS for char in partition_id):
+        raise InvalidPartitionId(f"Invalid partition id: {partition_id}")
+    variable = variable.lstrip("?$")
+    default_hash = "0" * len(partition_id)
+    return add_filter_to_query(
+        parsed_query,
+        f'STRSTARTS(COALESCE(MD5(STR(?{variable})), "{default_hash}"), "{partition_id}")',
+    )
+
+
+@contextmanager
+def endpoint_slot(url: str, max_concurrent_requests: int = 0) -> Iterator[None]:
+    """Wait for one of the request slots of an endpoint, to bound the number of concurrent requests
+    sent to a host by the process. The requests sharing the same limit share the same slots,
+    so queries configured with different limits are bounded independently.
+
+    :param url: SPARQL endpoint URL
+    :param max_concurrent_requests: Maximum number of concurrent requests, 0 for no limit
+    """
+    if max_concurrent_requests <= 0:
+        yield
+        return
+    host = urlparse(url).netloc
+    with _endpoint_semaphores_lock:
+        semaphore = _endpoint_semaphores.setdefault(
+            (host, max_concurrent_requests), threading.BoundedSemaphore(max_concurrent_requests)
+        )
+    with semaphore:
+        yield
@@ -0,0 +1,184 @@
+import codecs
+import csv
+import json
+import re
+from typing import Any, Iterable, Iterator, Union
+
+from rdflib import BNode, Literal, URIRef
+from rdflib.term import Node
+from rdflib.util import from_n3
+
+from ..formats.utils import iter_chunk_lines
+
+# Size (in bytes) of the chunks read from HTTP responses
+RESPONSE_CHUNK_SIZE = 64 * 1024
+
+# CSV results do not distinguish IRIs from literals, so values that are IRIs of common schemes are read as IRIs
+# (other values with a colon, e.g., "Title:Subtitle", are much more likely to be literals)
+_IRI = re.compile(r"^(?:https?|ftp|file|mailto|urn|tag):[^\s<>\"{}|^`\\]*$", re.IGNORECASE)
+
+
+class _JsonStreamReader:
+    """A pull reader over a JSON document received by chunks.
+    Containers are traversed token by token, while leaf values (and small containers)
+    are decoded with json.JSONDecoder.raw_decode, so only the value being read is held in memory.
+    """
+
+    def __init__(self, chunks: Iterable[Union[str, bytes]]):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.json_decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Read the next chunk into the buffer, discarding the data already consumed.
+
+        Returns: False if the end of the document was reached, True otherwise.
+        """
+        if self.eof:
+            return False
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.eof = True
+            data = self.decoder.decode(b"", final=True)
+        else:
+            data = self.decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        self.buffer = self.buffer[self.position :] + data
+        self.position = 0
+        return True
+
+    def peek(self) -> str:
+        """Get the next non-whitespace character, without consuming it ("" at the end of the document)"""
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position].isspace():
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str):
+        """Consume the next non-whitespace character, which must be char"""
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Invalid JSON document: expected '{char}', found '{found}'")
+        self.position += 1
+
+    def read_value(self) -> Any:
+        """Decode the next JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.buffer, self.position)
+                # a number may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+    def iter_object_keys(self) -> Iterator[str]:
+        """Iterate over the keys of the object starting at the current position.
+        The value of each key must be consumed by the caller before the next iteration."""
+        self.expect("{")
+        while True:
+            char = self.peek()
+            if char == "}":
+                self.position += 1
+                return
+            if char == ",":
+                self.position += 1
+                continue
+            key = self.read_value()
+            self.expect(":")
+            yield key
+
+    def iter_array_items(self) -> Iterator[None]:
+        """Iterate over the items of the array starting at the current position.
+        Each item must be consumed by the caller before the next iteration."""
+        self.expect("[")
+        while True:
+            char = self.peek()
+            if char == "]":
+                self.position += 1
+                return
+            if char == ",":
+                self.position += 1
+                continue
+            if char == "":
+                raise ValueError("Invalid JSON document: unterminated array")
+            yield
+
+
+def iter_json_results_bindings(chunks: Iterable[Union[str, bytes]]) -> Iterator[dict]:
+    """Incrementally parse SPARQL SELECT results in JSON format (application/sparql-results+json).
+    Bindings are decoded one at a time, as the document is received, so memory usage
+    does not depend on the number of results.
+
+    :param chunks: Chunks of the JSON document, e.g., from requests.Response.iter_content()
+    :yield: Solution bindings, as {variable: JSON RDF term}
+    """
+    reader = _JsonStreamReader(chunks)
+    for key in reader.iter_object_keys():
+        if key != "results":
+            reader.read_value()
+            continue
+        for results_key in reader.iter_object_keys():
+            if results_key != "bindings":
+                reader.read_value()
+                continue
+            for _ in reader.iter_array_items():
+                yield reader.read_value()
+
+
+def iter_tsv_results_bindings(chunks: Iterable[Union[str, bytes]]) -> Iterator[dict[str, Node]]:
+    """Incrementally parse SPARQL SELECT results in TSV format (text/tab-separated-values).
+    Each line holds one solution, with RDF terms encoded in Turtle syntax.
+
+    :param chunks: Chunks of the TSV document, e.g., from requests.Response.iter_content()
+    :yield: Solution bindings, as {variable: RDF term}. Unbound variables are omitted.
+    """
+    lines = iter_chunk_lines(chunks)
+    header = next(lines, "")
+    variables = [variable.lstrip("?$") for variable in header.split("\t")]
+    for line in lines:
+        yield {
+            variable: from_n3(value)
+            for variable, value in zip(variables, line.split("\t"))
+            if value != ""
+        }
+
+
+def parse_csv_term(value: str) -> Node:
+    """Parse an RDF term from SPARQL CSV results, where terms lose their type information:
+    blank nodes are prefixed with "_:", IRIs are detected as absolute IRIs of common schemes
+    (http, https, ftp, file, mailto, urn and tag), and anything else is a plain literal.
+    Typed or language-tagged literals are therefore read as plain literals, and IRIs of other schemes as literals.
+    """
+    if value.startswith("_:"):
+        return BNode(value[2:])
+    if _IRI.match(value):
+        return URIRef(value)
+    return Literal(value)
+
+
+def iter_csv_results_bindings(chunks: Iterable[Union[str, bytes]]) -> Iterator[dict[str, Node]]:
+    """Incrementally parse SPARQL SELECT results in CSV format (text/csv).
+    CSV results are lossy: language tags and datatypes are lost, see parse_csv_term().
+
+    :param chunks: Chunks of the CSV document, e.g., from requests.Response.iter_content()
+    :yield: Solution bindings, as {variable: RDF term}. Unbound variables are omitted.
+    """
+    # quoted values may span several lines, so csv.reader needs the line terminators
+    rows = csv.reader(iter_chunk_lines(chunks, keepends=True))
+    variables = next(rows, [])
+    for row in rows:
+        yield {
+            variable: parse_csv_term(value)
+            for variable, value in zip(variables, row)
+            if value != ""
+        }
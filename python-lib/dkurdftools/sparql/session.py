@@ -0,0 +1,114 @@
+import importlib.util
+import threading
+from typing import Optional, Union
+from urllib.parse import urlencode, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+USER_AGENT = "dataiku/rdf-tools-plugin"
+
+# Default (connect, read) timeouts, in seconds. The read timeout applies between two received chunks,
+# not to the whole response, so it does not limit the duration of long extractions.
+DEFAULT_TIMEOUT = (10, 300)
+
+# Default number of retries of a request, on connection errors and on the RETRY_STATUSES responses
+DEFAULT_MAX_RETRIES = 3
+
+# Base delay of the exponential backoff between retries (in seconds), and its maximum
+RETRY_BACKOFF_FACTOR = 1
+RETRY_BACKOFF_MAX = 60
+
+# Responses of busy or temporarily unavailable endpoints
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Number of pooled connections per endpoint host
+POOL_SIZE = 16
+
+# Queries whose GET URL would be longer than this are sent as POST requests,
+# as many servers and proxies reject URLs longer than 8 KB
+MAX_GET_URL_LENGTH = 4096
+
+# urllib3 only decodes Brotli responses if a Brotli package is installed
+ACCEPT_ENCODING = (
+    "gzip, deflate, br"
+    if importlib.util.find_spec("brotli") or importlib.util.find_spec("brotlicffi")
+    else "gzip, deflate"
+)
+
+# Sessions, per endpoint host and number of retries, shared by all the queries of the process
+_sessions: dict[tuple[str, int], requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def create_session(max_retries: int = DEFAULT_MAX_RETRIES) -> requests.Session:
+    """Create an HTTP session with a pool of keep-alive connections, which retries failed requests
+    with an exponential backoff, honoring the Retry-After header of the responses.
+
+    :param max_retries: Maximum number of retries of a request
+    :return HTTP session
+    """
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        backoff_max=RETRY_BACKOFF_MAX,
+        status_forcelist=RETRY_STATUSES,
+        # SPARQL queries sent with POST are read-only, so they can be retried too
+        allowed_methods=frozenset({"GET", "POST"}),
+        respect_retry_after_header=True,
+        # the last response is returned, so its status is checked by the caller
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"User-agent": USER_AGENT, "Accept-Encoding": ACCEPT_ENCODING})
+    return session
+
+
+def get_session(url: str, max_retries: int = DEFAULT_MAX_RETRIES) -> requests.Session:
+    """Get the shared HTTP session of an endpoint
+
+    :param url: SPARQL endpoint URL
+    :param max_retries: Maximum number of retries of a request
+    :return HTTP session
+    """
+    key = (urlparse(url).netloc, max_retries)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = create_session(max_retries)
+        return session
+
+
+def send_sparql_request(
+    url: str,
+    query: str,
+    accept: str,
+    timeout: Union[float, tuple[float, float], None] = DEFAULT_TIMEOUT,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    session: Optional[requests.Session] = None,
+    headers: Optional[dict] = None,
+) -> requests.Response:
+    """Send a SPARQL query to an endpoint, with the SPARQL protocol. The response body is streamed.
+    The query is sent in the URL of a GET request, or in the form-encoded body of a POST request
+    if the URL would be too long.
+
+    :param url: SPARQL endpoint URL
+    :param query: SPARQL query
+    :param accept: Accept header, used to negotiate the results format
+    :param timeout: (connect, read) timeouts, in seconds
+    :param max_retries: Maximum number of retries of the request
+    :param session: HTTP session, defaults to the shared session of the endpoint
+    :param headers: Additional request headers, e.g., for conditional requests
+    :return: HTTP response
+    """
+    if session is None:
+        session = get_session(url, max_retries)
+    headers = {**(headers or {}), "Accept": accept}
+    params = {"query": query}
+    if len(url) + len(urlencode(params)) + 1 > MAX_GET_URL_LENGTH:
+        return session.post(url, data=params, headers=headers, timeout=timeout, stream=True)
+    return session.get(url, params=params, headers=headers, timeout=timeout, stream=True)
@@ -0,0 +1,244 @@
+from typing import Callable, Iterator, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+from rdflib.graph import ConjunctiveGraph
+from rdflib.plugins.sparql import CUSTOM_EVALS
+from rdflib.plugins.sparql.parserutils import CompValue
+from rdflib.plugins.sparql.sparql import FrozenBindings, QueryContext
+from rdflib.term import BNode, Node, Variable
+
+from .dss_store import DataikuDatasetStore
+from .triple_index import GRAPH, TripleIndex
+
+# Name of the BGP evaluation function, in rdflib custom evaluation functions
+CUSTOM_EVAL_NAME = "dku_dataset_bgp"
+
+# A triple pattern, where each position is either a variable (SPARQL blank nodes are variables too)
+# or the id of a term in the index
+EncodedPattern = tuple[Union[Variable, BNode, int], ...]
+
+
+def is_variable(term) -> bool:
+    return isinstance(term, (Variable, BNode))
+
+
+def get_pattern_variables(pattern: EncodedPattern) -> list[str]:
+    """Get the variables of a triple pattern, as the names of their solution columns (N3 form)"""
+    return list(dict.fromkeys(term.n3() for term in pattern if is_variable(term)))
+
+
+def encode_bgp(
+    index: TripleIndex,
+    triples: Sequence[tuple[Node, Node, Node]],
+    free: Optional[Sequence[tuple[bool, ...]]] = None,
+) -> Optional[list[EncodedPattern]]:
+    """Replace the terms of a basic graph pattern by their ids in an index
+
+    Args:
+      - index: The index of the queried triples.
+      - triples: The triple patterns of the BGP.
+      - free: Whether each term of the triple patterns is a free variable. By default, variables and blank nodes
+        are free, but the terms bound by the query context are constants, even blank nodes of the data.
+
+    Returns: The encoded triple patterns, or None if a term is absent from the index,
+        in which case the BGP has no solutions.
+    """
+    if free is None:
+        free = [tuple(is_variable(term) for term in triple) for triple in triples]
+    constants = [term for triple, flags in zip(triples, free) for term, flag in zip(triple, flags) if not flag]
+    codes = index.lookup([term.n3() for term in constants])
+    if (codes < 0).any():
+        return None
+    codes = iter(codes)
+    return [
+        tuple(term if flag else int(next(codes)) for term, flag in zip(triple, flags))
+        for triple, flags in zip(triples, free)
+    ]
+
+
+def _get_constant_pattern(pattern: EncodedPattern, graph: Optional[int] = None) -> tuple[Optional[int], ...]:
+    return tuple(None if is_variable(term) else term for term in pattern) + (graph,)
+
+
+def order_patterns(patterns: Sequence[EncodedPattern], cardinalities: Sequence[int]) -> list[int]:
+    """Order the joins of triple patterns greedily: the most selective pattern comes first, then the most
+    selective pattern sharing a variable with the patterns already joined, so cartesian products are avoided
+    whenever the BGP is connected.
+
+    Args:
+      - patterns: The encoded triple patterns.
+      - cardinalities: The estimated number of triples matching each pattern.
+
+    Returns: The positions of the patterns, in join order.
+    """
+    remaining = list(range(len(patterns)))
+    order = []
+    joined_variables = set()
+    while remaining:
+        connected = [i for i in remaining if joined_variables.intersection(get_pattern_variables(patterns[i]))]
+        best = min(connected or remaining, key=lambda i: cardinalities[i])
+        remaining.remove(best)
+        order.append(best)
+        joined_variables.update(get_pattern_variables(patterns[best]))
+    return order
+
+
+def scan_pattern(
+    index: TripleIndex,
+    pattern: EncodedPattern,
+    restrictions: Optional[dict[str, np.ndarray]] = None,
+    graph: Optional[int] = None,
+) -> pd.DataFrame:
+    """Find the solutions of a triple pattern
+
+    Args:
+      - index: The index of the queried triples.
+      - pattern: The encoded triple pattern.
+      - restrictions: Candidate ids of some variables, e.g., the values bound by the previous joins,
+        so only the triples which can join are kept (semi-join).
+      - graph: The id of the graph the pattern is matched in, in an index of quads (None for the union
+        of all graphs, where each distinct triple is matched once).
+
+    Returns: A dataframe with one column of term ids per variable.
+    """
+    rows = index.match_codes(_get_constant_pattern(pattern, graph))
+    positions: dict[str, list[int]] = {}
+    for position, term in enumerate(pattern):
+        if is_variable(term):
+            positions.setdefault(term.n3(), []).append(position)
+    for variable, variable_positions in positions.items():
+        if restrictions is not None and variable in restrictions:
+            rows = rows[np.isin(index.codes[rows, variable_positions[0]], restrictions[variable])]
+    codes = index.codes[rows]
+    if graph is None and index.has_graphs:
+        # over the union of the graphs, a triple held by several graphs is a single solution
+        codes = np.unique(codes, axis=0)
+    # a variable repeated in a pattern, e.g., (?x, p, ?x), binds the same term at each position
+    for variable_positions in positions.values():
+        for position in variable_positions[1:]:
+            codes = codes[codes[:, variable_positions[0]] == codes[:, position]]
+    return pd.DataFrame(
+        {variable: codes[:, variable_positions[0]] for variable, variable_positions in positions.items()},
+        index=pd.RangeIndex(len(codes)),
+    )
+
+
+def evaluate_bgp(
+    index: TripleIndex, patterns: Sequence[EncodedPattern], graph: Optional[int] = None
+) -> pd.DataFrame:
+    """Evaluate a basic graph pattern over an index.
+    Patterns are joined in the order given by order_patterns(), using the index statistics. Each pattern is
+    matched with the index, restricted to the terms bound by the previous joins, and joined with a
+    vectorized hash join, so no work is done per solution in Python.
+
+    Args:
+      - index: The index of the queried triples.
+      - patterns: The encoded triple patterns of the BGP.
+      - graph: The id of the graph the BGP is matched in, in an index of quads (None for all graphs).
+
+    Returns: A dataframe with one column of term ids per variable, named after the variables (N3 form).
+    """
+    variables = list(dict.fromkeys(variable for pattern in patterns for variable in get_pattern_variables(pattern)))
+    # patterns without variables only check whether triples exist
+    ground_patterns = [pattern for pattern in patterns if not get_pattern_variables(pattern)]
+    patterns = [pattern for pattern in patterns if get_pattern_variables(pattern)]
+    if any(len(index.match_codes(_get_constant_pattern(pattern, graph))) == 0 for pattern in ground_patterns):
+        return pd.DataFrame(np.empty((0, len(variables)), dtype=np.int64), columns=variables)
+
+    cardinalities = [index.estimate_cardinality(_get_constant_pattern(pattern, graph)) for pattern in patterns]
+    solutions = pd.DataFrame(index=pd.RangeIndex(1))  # a single solution, which binds no variables
+    for i in order_patterns(patterns, cardinalities):
+        shared = [variable for variable in get_pattern_variables(patterns[i]) if variable in solutions.columns]
+        restrictions = {variable: solutions[variable].unique() for variable in shared}
+        matches = scan_pattern(index, patterns[i], restrictions, graph)
+        if shared:
+            solutions = solutions.merge(matches, on=shared, how="inner")
+        else:
+            solutions = solutions.merge(matches, how="cross")
+        if solutions.empty:
+            break
+    return solutions.reindex(columns=variables, fill_value=-1).astype(np.int64)
+
+
+def decode_solutions(
+    index: TripleIndex, solutions: pd.DataFrame, decode_term: Callable[[str], Node]
+) -> list[np.ndarray]:
+    """Decode the term ids of solutions into RDF terms, column by column.
+    Each distinct id is only decoded once per column."""
+    terms = index.terms.to_numpy()
+    columns = []
+    for variable in solutions.columns:
+        codes, inverse = np.unique(solutions[variable].to_numpy(), return_inverse=True)
+        decoded = np.empty(len(codes), dtype=object)
+        decoded[:] = [decode_term(term) for term in terms[codes]]
+        columns.append(decoded[inverse.reshape(-1)])
+    return columns
+
+
+def _get_graph_code(ctx: QueryContext, store: DataikuDatasetStore, index: TripleIndex) -> Optional[int]:
+    # the graph queried by rdflib, as in ConjunctiveGraph.triples()
+    context = ctx.graph
+    if isinstance(context, ConjunctiveGraph) and not context.default_union:
+        context = context.default_context
+    graph = store.get_graph_pattern(context)
+    return None if graph is None else int(index.lookup([graph], GRAPH)[0])
+
+
+def _iter_bgp_solutions(
+    ctx: QueryContext,
+    store: DataikuDatasetStore,
+    triples: list[tuple[Node, Node, Node]],
+    free: list[tuple[bool, ...]],
+) -> Iterator[FrozenBindings]:
+    index = store.get_index()
+    patterns = encode_bgp(index, triples, free)
+    graph = _get_graph_code(ctx, store, index)
+    if patterns is None or (graph is not None and graph < 0):
+        return
+    solutions = evaluate_bgp(index, patterns, graph)
+    variables = {term.n3(): term for pattern in patterns for term in pattern if is_variable(term)}
+    keys = [variables[variable] for variable in solutions.columns]
+    columns = decode_solutions(index, solutions, store.decode_term)
+    # the solutions extend the bindings of the context, e.g., of the left side of a join
+    bindings = dict(ctx.solution())
+    rows = zip(*columns) if columns else ((),) * len(solutions)
+    for values in rows:
+        yield FrozenBindings(ctx, {**bindings, **dict(zip(keys, values))})
+
+
+def evaluate_dataset_bgp(ctx: QueryContext, part: CompValue) -> Iterator[FrozenBindings]:
+    """Evaluate the basic graph patterns of SPARQL queries over DSS dataset stores natively (see evaluate_bgp()),
+    instead of with the nested-loop evaluator of rdflib, which matches each triple pattern once per partial solution.
+    It is an rdflib custom evaluation function (see rdflib.plugins.sparql.CUSTOM_EVALS), which leaves the other
+    parts of the query, and the queries over other stores, to rdflib.
+
+    Args:
+      - ctx: The query execution context.
+      - part: The part of the query algebra to evaluate.
+
+    Returns: An iterator over the solutions of the BGP.
+    """
+    if part.name != "BGP" or ctx.graph is None or not isinstance(ctx.graph.store, DataikuDatasetStore):
+        raise NotImplementedError()
+    # variables bound by the context, e.g., by the left side of a join, are constants of the BGP,
+    # so they are told apart before substitution, as they can be bound to blank nodes of the data
+    free = [tuple(is_variable(term) and ctx[term] is None for term in triple) for triple in part.triples]
+    triples = [
+        tuple(ctx[term] if is_variable(term) and not flag else term for term, flag in zip(triple, flags))
+        for triple, flags in zip(part.triples, free)
+    ]
+    if any(not isinstance(term, Node) for triple in triples for term in triple):
+        # property paths are evaluated by rdflib
+        raise NotImplementedError()
+    return _iter_bgp_solutions(ctx, ctx.graph.store, triples, free)
+
+
+def enable_native_bgp_evaluation():
+    """Evaluate the basic graph patterns of the SPARQL queries over DSS dataset stores natively"""
+    CUSTOM_EVALS[CUSTOM_EVAL_NAME] = evaluate_dataset_bgp
+
+
+def disable_native_bgp_evaluation():
+    """Evaluate the SPARQL queries over DSS dataset stores with rdflib only"""
+    CUSTOM_EVALS.pop(CUSTOM_EVAL_NAME, None)
@@ -0,0 +1,137 @@
+import os
+import tempfile
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .triple_index import DEFAULT_GRAPH
+
+# Maximum number of fingerprints kept in memory (8 bytes each), before they are spilled to disk
+MAX_MEMORY_FINGERPRINTS = 16 * 1024 * 1024
+
+
+def get_triple_fingerprints(
+    subjects: Sequence[str],
+    predicates: Sequence[str],
+    objects: Sequence[str],
+    graphs: Optional[Sequence[Optional[str]]] = None,
+) -> np.ndarray:
+    """Compute 64-bit fingerprints of triples (or quads), as N3 terms.
+    The graph of the default graph is None or DEFAULT_GRAPH, which have the same fingerprint.
+    """
+    columns = {"subject": subjects, "predicate": predicates, "object": objects}
+    if graphs is not None:
+        columns["graph"] = [DEFAULT_GRAPH if graph is None else graph for graph in graphs]
+    df = pd.DataFrame({name: np.asarray(values, dtype=object) for name, values in columns.items()})
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+class FingerprintSet:
+    """A set of 64-bit fingerprints, with bounded memory.
+
+    Fingerprints are kept in sorted runs, and a run is merged with the previous one once it is as large
+    (as in a log-structured merge tree), so adding n fingerprints costs O(n log n) overall and a lookup
+    searches O(log n) runs. Once the runs hold more than max_memory_fingerprints, they are merged and
+    spilled to a temporary file, which is searched through a memory map, so only the pages read are loaded.
+    """
+
+    def __init__(self, max_memory_fingerprints: int = MAX_MEMORY_FINGERPRINTS, spill_directory: Optional[str] = None):
+        """
+        Args:
+          - max_memory_fingerprints: Maximum number of fingerprints kept in memory.
+          - spill_directory: Directory of the spilled fingerprints (the default temporary directory if None).
+        """
+        self.max_memory_fingerprints = max_memory_fingerprints
+        self.spill_directory = spill_directory
+        self.runs: list[np.ndarray] = []
+        self.spilled_runs: list[np.ndarray] = []
+        self.temporary_directory: Optional[tempfile.TemporaryDirectory] = None
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def memory_size(self) -> int:
+        return sum(len(run) for run in self.runs)
+
+    def contains(self, fingerprints: np.ndarray) -> np.ndarray:
+        """Check which fingerprints are in the set, as a boolean mask"""
+        found = np.zeros(len(fingerprints), dtype=bool)
+        for run in self.spilled_runs + self.runs:
+            positions = np.minimum(np.searchsorted(run, fingerprints), len(run) - 1)
+            found |= run[positions] == fingerprints
+        return found
+
+    def add(self, fingerprints: np.ndarray):
+        """Add distinct fingerprints, which are not in the set yet (see contains())"""
+        if len(fingerprints) == 0:
+            return
+        run = np.sort(fingerprints)
+        while self.runs and len(self.runs[-1]) <= len(run):
+            run = np.sort(np.concatenate([self.runs.pop(), run]))
+        self.runs.append(run)
+        self.size += len(fingerprints)
+        if self.memory_size > self.max_memory_fingerprints:
+            self.spill()
+
+    def spill(self):
+        """Merge the runs held in memory into a single run, stored in a temporary file"""
+        if self.temporary_directory is None:
+            self.temporary_directory = tempfile.TemporaryDirectory(dir=self.spill_directory)
+        path = os.path.join(self.temporary_directory.name, f"fingerprints_{len(self.spilled_runs)}.npy")
+        np.save(path, np.sort(np.concatenate(self.runs)))
+        self.spilled_runs.append(np.load(path, mmap_mode="r"))
+        self.runs = []
+
+    def close(self):
+        """Delete the spilled fingerprints"""
+        self.spilled_runs = []
+        if self.temporary_directory is not None:
+            self.temporary_directory.cleanup()
+            self.temporary_directory = None
+
+
+class TripleDeduplicator:
+    """Drop the triples (or quads) which were already seen, e.g., the triples of overlapping files.
+
+    Triples are compared by their 64-bit fingerprint (see get_triple_fingerprints()), so the memory used
+    does not depend on the size of their terms. Distinct triples have the same fingerprint with a probability
+    of about n² / 2^65 for n triples, in which case one of them is wrongly dropped.
+    """
+
+    def __init__(self, fingerprints: Optional[FingerprintSet] = None):
+        """
+        Args:
+          - fingerprints: The set holding the fingerprints of the triples seen so far.
+        """
+        self.fingerprints = FingerprintSet() if fingerprints is None else fingerprints
+        # number of dropped triples
+        self.duplicates = 0
+
+    def filter(
+        self,
+        subjects: Sequence[str],
+        predicates: Sequence[str],
+        objects: Sequence[str],
+        graphs: Optional[Sequence[Optional[str]]] = None,
+    ) -> np.ndarray:
+        """Find the triples of a batch which were not seen before, and record them as seen.
+
+        Args:
+          - subjects, predicates, objects: The N3 terms of the triples.
+          - graphs: The graphs of the triples, for quads (None for the default graph).
+
+        Returns: The (sorted) positions of the triples to keep: the first occurrence of each new triple.
+        """
+        fingerprints = get_triple_fingerprints(subjects, predicates, objects, graphs)
+        distinct_fingerprints, first_positions = np.unique(fingerprints, return_index=True)
+        new = ~self.fingerprints.contains(distinct_fingerprints)
+        self.fingerprints.add(distinct_fingerprints[new])
+        kept = np.sort(first_positions[new])
+        self.duplicates += len(fingerprints) - len(kept)
+        return kept
+
+    def close(self):
+        self.fingerprints.close()
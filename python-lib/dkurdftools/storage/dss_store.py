@@ -1,26 +1,98 @@
-from typing import Iterator
-from dataiku import Dataset
+import hashlib
+import json
+from functools import lru_cache
+from itertools import islice
+from io import BytesIO
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
 from rdflib.store import Store, TripleAddedEvent
-from rdflib.graph import _TripleType
+from rdflib.graph import DATASET_DEFAULT_GRAPH_ID, ConjunctiveGraph, Graph, _QuadType, _TripleType
 from rdflib.util import from_n3
+import numpy as np
 import pandas as pd
 
+from .deduplication import TripleDeduplicator
+from .statistics import StatisticsCollector, TripleStatistics
+from .term_dictionary import TermDictionary
+from .triple_index import DEFAULT_GRAPH, GRAPH, TripleIndex
+
+if TYPE_CHECKING:
+    from dataiku import Dataset, Folder
+
 # Match any node in a triple pattern
 ANY: None = None
 
+# Columns of the terms dataset, in the dictionary-encoded layout
+TERM_ID_COLUMN = "id"
+TERM_COLUMN = "term"
+
+# Number of existing triples fingerprinted at once, when deduplicating triples appended to a dataset
+DEDUPLICATION_LOAD_CHUNK_SIZE = 100_000
+
+
+def get_dataset_version(dataset: "Dataset") -> Optional[str]:
+    """Get a stamp of the version of the content of a DSS dataset, which changes whenever it is written:
+    a hash of the paths, sizes and modification times of its files.
+
+    Args:
+      - dataset: The DSS dataset.
+
+    Returns: The stamp, or None if the dataset has no files (e.g., a SQL dataset).
+    """
+    try:
+        files_info = dataset.get_files_info()
+    except Exception:  # the error raised for datasets without files depends on the dataset type
+        return None
+    paths = files_info.get("globalPaths")
+    if paths is None:
+        return None
+    records = sorted((path.get("path"), path.get("size"), path.get("lastModified")) for path in paths)
+    return hashlib.sha256(json.dumps(records).encode("utf-8")).hexdigest()
+
 
 class DataikuDatasetStore(Store):
     """An rdflib gaph store that uses a DSS Dataset for storage.
     It follows a triplestore approach, which three columns "subject", "predicate" and "object".
+
+    Reads go through an index over the dataset content (see TripleIndex), which can be persisted
+    in a managed folder, alongside the dataset. The statistics of the triples (see TripleStatistics)
+    are collected as they are written, and persisted in the same folder. Both are stamped with the version
+    of the dataset (see get_dataset_version()), and are only loaded if the dataset did not change since then,
+    e.g., if it was not rebuilt by another recipe. The version of datasets without files (e.g., SQL datasets)
+    is unknown, so their index and statistics are not persisted.
+
+    If a terms dataset is given, the store uses a dictionary-encoded layout: the terms dataset holds
+    the (id, N3 term) dictionary, and the triples dataset only holds the integer ids of the terms.
+
+    If a source column is set, each triple is written along with the name of its source (e.g., the file
+    it was extracted from), so downstream recipes can filter or partition the triples by source.
+
+    If a graph column is set, the store holds quads: each triple is written along with the name of its graph
+    (N3 term, empty for the default graph), and the store is context-aware, so it can back an rdflib Dataset
+    or ConjunctiveGraph. Graphs are indexed, so the patterns matched in a graph only read its triples.
+    The default graph is identified by DATASET_DEFAULT_GRAPH_ID, as in rdflib Datasets.
+
+    If deduplication is enabled, the triples (or quads) already written are dropped, e.g., the triples
+    of overlapping files, using a bounded-memory set of their fingerprints (see TripleDeduplicator).
+    When appending, the triples already in the dataset are dropped too. Sources do not tell triples apart:
+    a triple is written with the source it was first added with.
     """
 
     def __init__(
         self,
-        dss_dataset: Dataset,
+        dss_dataset: "Dataset",
         subject_column_name: str = "subject",
         predicate_column_name: str = "predicate",
         object_column_name: str = "object",
         autocommit_add_threshold: int = 5000,
+        index_folder: Optional["Folder"] = None,
+        index_path: str = "/triples_index.npz",
+        statistics_path: str = "/triples_statistics.json",
+        terms_dataset: Optional["Dataset"] = None,
+        decode_cache_size: int = 100_000,
+        append: bool = False,
+        source_column_name: Optional[str] = None,
+        graph_column_name: Optional[str] = None,
+        deduplicate: bool = False,
         configuration=None,
         identifier=None,
     ):
@@ -30,13 +102,52 @@ class DataikuDatasetStore(Store):
         self.predicate_column_name = predicate_column_name
         self.object_column_name = object_column_name
         self.autocommit_add_threshold = autocommit_add_threshold
+        self.index_folder = index_folder
+        self.index_path = index_path
+        self.index: Optional[TripleIndex] = None
+        self.statistics_path = statistics_path
+        self.statistics: Optional[TripleStatistics] = None
+        # statistics of the triples being written, unless they are appended to existing ones
+        self.statistics_collector: Optional[StatisticsCollector] = None
+        self.terms_dataset = terms_dataset
+        # if set, triples are appended to the dataset content (and terms to the terms dataset)
+        self.append = append
+        self.source_column_name = source_column_name
+        self.graph_column_name = graph_column_name
+        # in quad mode, graphs exist as long as they hold triples, see add_graph()
+        self.context_aware = self.graph_aware = graph_column_name is not None
+        self.graphs: dict[str, Graph] = {}
+        self.deduplicate = deduplicate
+        # fingerprints of the written triples, while the dataset is written
+        self.deduplicator: Optional[TripleDeduplicator] = None
+        # number of duplicate triples dropped
+        self.duplicates = 0
+        # dictionary used to encode the written terms, in the dictionary-encoded layout
+        self.term_dictionary = TermDictionary()
+        # URI-heavy graphs repeat the same terms a lot, so decoded terms are cached
+        self.decode_term = lru_cache(maxsize=decode_cache_size)(from_n3)
 
-        # prepare the inner dataframe used to hold data waiting to be commited
-        self.staging_df = pd.DataFrame(columns=self.dataframe_columns)
+        # append-only columnar buffer holding the N3 terms waiting to be commited,
+        # it is only turned into a dataframe when flushed to the dataset
+        self.staging_subjects: list[str] = []
+        self.staging_predicates: list[str] = []
+        self.staging_objects: list[str] = []
+        self.staging_sources: list[Optional[str]] = []
+        self.staging_graphs: list[Optional[str]] = []
+        # the dataset writer is opened on first commit, and kept open until the store is closed,
+        # as opening a new writer would overwrite the previously written data
+        self.writer = None
+        self.terms_writer = None
 
     def __len__(self, context=None):
-        # TODO
-        return 0
+        graph = self.get_graph_pattern(context)
+        if graph is not None:
+            return len(self.get_index().match((ANY, ANY, ANY, graph)))
+        statistics = self.get_statistics()
+        # in quad mode, a triple held by several graphs is counted once in their union
+        if statistics.distinct_triples is not None:
+            return statistics.distinct_triples
+        return statistics.triples
 
     @property
     def dataframe_columns(self):
@@ -46,61 +157,476 @@ class DataikuDatasetStore(Store):
             self.object_column_name,
         ]
 
+    @property
+    def index_columns(self):
+        """Columns read to build the index: the triple columns, and the graph column in quad mode"""
+        if self.graph_column_name is None:
+            return self.dataframe_columns
+        return self.dataframe_columns + [self.graph_column_name]
+
+    @property
+    def dictionary_encoded(self) -> bool:
+        return self.terms_dataset is not None
+
     def write_schema(self):
-        self.dss_dataset.write_schema(
-            [{"name": name, "type": "string"} for name in self.dataframe_columns]
-        )
+        column_type = "bigint" if self.dictionary_encoded else "string"
+        schema = [{"name": name, "type": column_type} for name in self.dataframe_columns]
+        if self.source_column_name is not None:
+            # sources are not encoded, as they are few and mostly used for filtering
+            schema.append({"name": self.source_column_name, "type": "string"})
+        if self.graph_column_name is not None:
+            # graph names are not encoded either, so the column can be used as a partitioning column
+            schema.append({"name": self.graph_column_name, "type": "string"})
+        self.dss_dataset.write_schema(schema)
+        if self.dictionary_encoded:
+            self.terms_dataset.write_schema(
+                [
+                    {"name": TERM_ID_COLUMN, "type": "bigint"},
+                    {"name": TERM_COLUMN, "type": "string"},
+                ]
+            )
+
+    def get_index(self) -> TripleIndex:
+        """Get the index over the dataset content.
+        It is built on first read, by reading the dataset once, using the iter_dataframes() method
+        (in case the dataset is too large). If an index folder is set, the index is persisted in it,
+        so other stores over the same dataset can load it instead of reading the whole dataset again.
+        """
+        if self.index is not None:
+            return self.index
+        # the version is read before the dataset, so an index of a dataset written meanwhile is never trusted
+        version = self.get_version()
+        if (
+            version is not None
+            and self.index_folder is not None
+            and self.index_path in self.index_folder.list_paths_in_partition()
+        ):
+            with self.index_folder.get_download_stream(self.index_path) as stream:
+                index = TripleIndex.load(stream)
+            if index.version == version:
+                self.index = index
+                return self.index
+        if self.dictionary_encoded:
+            self.index = TripleIndex.from_encoded_dataframes(
+                self.terms_dataset.iter_dataframes(columns=[TERM_ID_COLUMN, TERM_COLUMN]),
+                self.dss_dataset.iter_dataframes(columns=self.index_columns),
+                with_graphs=self.context_aware,
+            )
+        else:
+            self.index = TripleIndex.from_dataframes(
+                self.dss_dataset.iter_dataframes(columns=self.index_columns),
+                with_graphs=self.context_aware,
+            )
+        self.index.version = version
+        if self.index_folder is not None and version is not None:
+            buffer = BytesIO()
+            self.index.save(buffer)
+            buffer.seek(0)
+            self.index_folder.upload_stream(self.index_path, buffer)
+        return self.index
+
+    def invalidate_index(self):
+        """Drop the index, which will be rebuilt on next read"""
+        self.index = None
+        if self.index_folder is not None and self.index_path in self.index_folder.list_paths_in_partition():
+            self.index_folder.delete_path(self.index_path)
+
+    def get_statistics(self) -> TripleStatistics:
+        """Get the statistics of the dataset content.
+        They are collected when the store writes the dataset, and persisted in the index folder if set.
+        Otherwise (e.g., the dataset was written by another recipe, or appended to), they are computed
+        from the index (see get_index()).
+        """
+        if self.statistics is not None:
+            return self.statistics
+        version = self.get_version()
+        if (
+            version is not None
+            and self.index_folder is not None
+            and self.statistics_path in self.index_folder.list_paths_in_partition()
+        ):
+            with self.index_folder.get_download_stream(self.statistics_path) as stream:
+                statistics = TripleStatistics.load(stream)
+            if statistics.version == version:
+                self.statistics = statistics
+                return self.statistics
+        index = self.get_index()
+        self.save_statistics(TripleStatistics.from_index(index)._replace(version=index.version))
+        return self.statistics
+
+    def get_version(self) -> Optional[str]:
+        """Get a stamp of the version of the dataset content (and of the terms dataset, if any),
+        or None if it is unknown"""
+        versions = [get_dataset_version(self.dss_dataset)]
+        if self.dictionary_encoded:
+            versions.append(get_dataset_version(self.terms_dataset))
+        return None if None in versions else ":".join(versions)
+
+    def save_statistics(self, statistics: TripleStatistics):
+        """Set the statistics of the dataset content, and persist them in the index folder if set
+        (and if the version of the dataset is known)"""
+        self.statistics = statistics
+        if self.index_folder is not None and statistics.version is not None:
+            buffer = BytesIO()
+            statistics.save(buffer)
+            buffer.seek(0)
+            self.index_folder.upload_stream(self.statistics_path, buffer)
+
+    def invalidate_statistics(self):
+        """Drop the statistics, which will be collected or computed again"""
+        self.statistics = None
+        if self.index_folder is not None and self.statistics_path in self.index_folder.list_paths_in_partition():
+            self.index_folder.delete_path(self.statistics_path)
+
+    def get_graph_name(self, context) -> Optional[str]:
+        """Get the name of the graph of a context, as written in the graph column (None for the default graph)"""
+        identifier = getattr(context, "identifier", context)
+        if identifier is None or identifier == DATASET_DEFAULT_GRAPH_ID:
+            return None
+        return identifier.n3()
+
+    def get_graph_pattern(self, context) -> Optional[str]:
+        """Get the graph matched by the patterns searched in a context, in quad mode.
+
+        Args:
+          - context: The graph searched, or None (or a ConjunctiveGraph, i.e., the union graph) to search all graphs.
+
+        Returns: The graph name (DEFAULT_GRAPH for the default graph), or None to match all graphs.
+        """
+        if not self.context_aware or context is None or isinstance(context, ConjunctiveGraph):
+            return None
+        graph_name = self.get_graph_name(context)
+        return DEFAULT_GRAPH if graph_name is None else graph_name
+
+    def get_context(self, graph_name: str) -> Graph:
+        """Get the graph of a context, given its name in the index"""
+        if graph_name not in self.graphs:
+            identifier = DATASET_DEFAULT_GRAPH_ID if graph_name == DEFAULT_GRAPH else self.decode_term(graph_name)
+            self.graphs[graph_name] = Graph(store=self, identifier=identifier)
+        return self.graphs[graph_name]
+
+    def contexts(self, triple=None) -> Iterator[Graph]:
+        """Iterate over the graphs of the store, in quad mode, or over the graphs holding a triple"""
+        if not self.context_aware:
+            return
+        index = self.get_index()
+        if triple is None:
+            graph_names = index.graph_terms[np.unique(index.graphs)]
+        else:
+            graph_names = np.unique(index.decode_graphs(index.match(tuple(term.n3() for term in triple))))
+        for graph_name in graph_names:
+            yield self.get_context(graph_name)
+
+    def add_graph(self, graph):
+        pass  # no effect, as graphs only exist through their triples
+
+    def remove_graph(self, graph):
+        raise TypeError("The store is append only!")
 
-    def triples(self, triple_pattern, context) -> Iterator[tuple[_TripleType, None]]:
+    def triples(self, triple_pattern, context) -> Iterator[tuple[_TripleType, Iterator[Optional[Graph]]]]:
         """Search for a triple pattern in a DSS dataset.
-        Triple matching is done by reading the dataset to Pandas dataframes using the iter_dataframes() method
-        (in case the dataset is too large), and then using the DataFrame.query() method on each chunk to do
-        the actual triple matching.
+        Triple matching is done using the dataset index (see get_index()): the matching rows are found
+        with a binary search on the most selective bound term, and the other bound terms are then checked
+        with vectorized masks. Only the matching rows are decoded into RDF terms, through an LRU cache.
 
         Args:
           - triple_pattern: The triple pattern (s, p, o) to search.
+          - context: The query execution context. In quad mode, only the triples of its graph are searched,
+            unless it is a ConjunctiveGraph (see get_graph_pattern()).
+
+        Returns: An iterator that produces RDF triples matching the input triple pattern, with their graph
+            in quad mode.
+        """
+        index = self.get_index()
+        pattern = tuple(None if term == ANY else term.n3() for term in triple_pattern)
+        graph = self.get_graph_pattern(context)
+        rows = index.match(pattern + (graph,))
+        yield from self.decode_rows(index, rows, union=graph is None)
+
+    def triples_choices(self, triple, context=None) -> Iterator[tuple[_TripleType, Iterator[Optional[Graph]]]]:
+        """Search for a triple pattern with a list of candidate terms in a position, e.g., (s, [p1, p2], None).
+        All the candidates are matched at once, with a single search in the dataset index
+        (see TripleIndex.match_choices()), instead of one search per candidate.
+
+        Args:
+          - triple: The triple pattern (s, p, o), where a position can be a list of candidate terms
+            (an empty list matches any term).
           - context: The query execution context.
 
         Returns: An iterator that produces RDF triples matching the input triple pattern.
         """
-        subject, predicate, obj = triple_pattern
-        for chunk_df in self.dss_dataset.iter_dataframes(
-            columns=self.dataframe_columns
-        ):
-            # use a dataframe query to do the triple pattern matching
-            queries = []
-            if subject != ANY:
-                queries.append(f"{self.subject_column_name} == '{subject.n3()}'")
-            if predicate != ANY:
-                queries.append(f"{self.predicate_column_name} == '{predicate.n3()}'")
-            if obj != ANY:
-                queries.append(f"{self.object_column_name} == '{obj.n3()}'")
-
-            for _, row in chunk_df.query(" and ".join(queries)).iterrows():
-                row_subject = from_n3(row[self.subject_column_name])
-                row_predicate = from_n3(row[self.predicate_column_name])
-                row_object = from_n3(row[self.object_column_name])
-
-                yield (row_subject, row_predicate, row_object), None
-        return
+        index = self.get_index()
+        graph = self.get_graph_pattern(context)
+        rows = index.match_choices(
+            tuple(
+                [term.n3() for term in choice]
+                if isinstance(choice, list)
+                else None if choice == ANY else [choice.n3()]
+                for choice in triple
+            )
+            + (None if graph is None else [graph],)
+        )
+        yield from self.decode_rows(index, rows, union=graph is None)
+
+    def decode_rows(
+        self, index: TripleIndex, rows, union: bool = False
+    ) -> Iterator[tuple[_TripleType, Iterator[Optional[Graph]]]]:
+        """Decode rows of the index into RDF triples, with their graph in quad mode.
+        Over the union of the graphs, a triple held by several graphs is decoded once, with all its graphs.
+        """
+        if union and index.has_graphs:
+            rows, offsets = index.group_triples(rows)
+            graph_names = index.decode_graphs(rows)
+            triples = index.decode(rows[offsets[:-1]])
+            for (row_subject, row_predicate, row_object), start, end in zip(triples, offsets[:-1], offsets[1:]):
+                yield (
+                    self.decode_term(row_subject),
+                    self.decode_term(row_predicate),
+                    self.decode_term(row_object),
+                ), iter([self.get_context(graph_name) for graph_name in graph_names[start:end]])
+            return
+        graph_names = index.decode_graphs(rows) if index.has_graphs else [None] * len(rows)
+        for (row_subject, row_predicate, row_object), graph_name in zip(index.decode(rows), graph_names):
+            yield (
+                self.decode_term(row_subject),
+                self.decode_term(row_predicate),
+                self.decode_term(row_object),
+            ), None if graph_name is None else iter((self.get_context(graph_name),))
 
     def create(self, configuration):
         pass  # no effect, as the DSS dataset is already created
 
     def add(self, triple, context=None, quoted=False):
-        self.staging_df[len(self.staging_df)] = [
-            triple[0].n3(),
-            triple[1].n3(),
-            triple[2].n3(),
-        ]
+        subject, predicate, obj = triple
+        self.staging_subjects.append(subject.n3())
+        self.staging_predicates.append(predicate.n3())
+        self.staging_objects.append(obj.n3())
+        self.staging_sources.append(None)
+        self.staging_graphs.append(self.get_graph_name(context))
         self.dispatcher.dispatch(TripleAddedEvent(triple=triple, context=context))
-        if self.staging_df.shape[0] >= self.autocommit_add_threshold:
+        if len(self.staging_subjects) >= self.autocommit_add_threshold:
             self.commit()
 
+    def addN(self, quads: Iterable[_QuadType]):
+        """Add a batch of quads to the store.
+        Quads are staged by chunks filling the staging buffer up to the autocommit threshold: the terms
+        of a chunk are appended to the buffer in bulk, and the buffer is flushed once it is full.
+        TripleAddedEvents are only created if handlers subscribed to them.
+
+        Args:
+          - quads: The quads (s, p, o, context) to add.
+        """
+        quads = iter(quads)
+        while True:
+            chunk = list(islice(quads, max(self.autocommit_add_threshold - self.staging_size, 1)))
+            if not chunk:
+                return
+            self.staging_subjects.extend([subject.n3() for subject, _, _, _ in chunk])
+            self.staging_predicates.extend([predicate.n3() for _, predicate, _, _ in chunk])
+            self.staging_objects.extend([obj.n3() for _, _, obj, _ in chunk])
+            self.staging_sources.extend([None] * len(chunk))
+            self.staging_graphs.extend([self.get_graph_name(context) for _, _, _, context in chunk])
+            if self.dispatcher.get_map():
+                for subject, predicate, obj, context in chunk:
+                    self.dispatcher.dispatch(
+                        TripleAddedEvent(triple=(subject, predicate, obj), context=context)
+                    )
+            if self.staging_size >= self.autocommit_add_threshold:
+                self.commit()
+
+    def add_n3_triples(self, triples: Iterable[tuple[str, str, str]], source: Optional[str] = None):
+        """Add a batch of triples, as N3 terms, to the store, e.g., triples parsed in another process.
+        Terms are not parsed back into RDF terms, so no TripleAddedEvent is dispatched.
+
+        Args:
+          - triples: The triples, as (subject, predicate, object) N3 terms.
+          - source: The name of the source of the triples, written in the source column if any.
+        """
+        for subject, predicate, obj in triples:
+            self.staging_subjects.append(subject)
+            self.staging_predicates.append(predicate)
+            self.staging_objects.append(obj)
+            self.staging_sources.append(source)
+            self.staging_graphs.append(None)
+            if len(self.staging_subjects) >= self.autocommit_add_threshold:
+                self.commit()
+
+    def add_n3_quads(self, quads: Iterable[tuple[str, str, str, Optional[str]]], source: Optional[str] = None):
+        """Add a batch of quads, as N3 terms, to the store, e.g., quads parsed in another process.
+        Terms are not parsed back into RDF terms, so no TripleAddedEvent is dispatched.
+
+        Args:
+          - quads: The quads, as (subject, predicate, object, graph) N3 terms, with None for the default graph.
+          - source: The name of the source of the quads, written in the source column if any.
+        """
+        for subject, predicate, obj, graph in quads:
+            self.staging_subjects.append(subject)
+            self.staging_predicates.append(predicate)
+            self.staging_objects.append(obj)
+            self.staging_sources.append(source)
+            self.staging_graphs.append(graph)
+            if len(self.staging_subjects) >= self.autocommit_add_threshold:
+                self.commit()
+
+    @property
+    def staging_size(self) -> int:
+        return len(self.staging_subjects)
+
+    def staging_dataframe(self) -> pd.DataFrame:
+        """Build a dataframe from the content of the staging buffer"""
+        return self.add_extra_columns(
+            pd.DataFrame(
+                {
+                    self.subject_column_name: self.staging_subjects,
+                    self.predicate_column_name: self.staging_predicates,
+                    self.object_column_name: self.staging_objects,
+                },
+                columns=self.dataframe_columns,
+            )
+        )
+
+    def add_extra_columns(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Add the sources and the graphs of the staged triples to a dataframe, if the store has such columns"""
+        if self.source_column_name is not None:
+            df[self.source_column_name] = self.staging_sources
+        if self.graph_column_name is not None:
+            df[self.graph_column_name] = self.staging_graphs
+        return df
+
+    def encode_staging_dataframe(self) -> pd.DataFrame:
+        """Build a dataframe of term ids from the content of the staging buffer,
+        and write the new terms to the terms dataset"""
+        first_new_term_id = len(self.term_dictionary)
+        codes = self.term_dictionary.encode(
+            np.array(
+                [self.staging_subjects, self.staging_predicates, self.staging_objects],
+                dtype=object,
+            )
+        )
+        self.terms_writer.write_dataframe(
+            pd.DataFrame(
+                {
+                    TERM_ID_COLUMN: np.arange(first_new_term_id, len(self.term_dictionary)),
+                    TERM_COLUMN: self.term_dictionary.terms[first_new_term_id:],
+                }
+            )
+        )
+        return self.add_extra_columns(pd.DataFrame(dict(zip(self.dataframe_columns, codes))))
+
+    def open_writer(self, dataset: "Dataset"):
+        """Open a writer on a dataset, which overwrites its content unless the store appends to it"""
+        # the write mode of a dataset is not part of the public API of the dataiku package: get_writer() sends
+        # the "appendMode" flag of the spec_item, which holds the "Append instead of overwrite" setting
+        # of the recipe output. It is always set from the store, so the recipe setting cannot disagree with it
+        # (e.g., new term ids would be assigned from scratch while the terms dataset is appended to).
+        dataset.spec_item["appendMode"] = self.append
+        return dataset.get_writer()
+
+    def load_term_dictionary(self) -> TermDictionary:
+        """Get the dictionary used to encode the written terms.
+        When the terms dataset is overwritten, ids are assigned from scratch, otherwise the existing
+        dictionary is loaded, so appended triples share the ids of the existing terms.
+        """
+        if not self.append:
+            return TermDictionary()
+        terms = np.empty(0, dtype=object)
+        for df in self.terms_dataset.iter_dataframes(columns=[TERM_ID_COLUMN, TERM_COLUMN]):
+            chunk = df.to_numpy()
+            ids = chunk[:, 0].astype(np.int64)
+            if len(ids) and ids.max() >= len(terms):
+                terms = np.concatenate([terms, np.empty(ids.max() + 1 - len(terms), dtype=object)])
+            terms[ids] = chunk[:, 1]
+        return TermDictionary(terms)
+
+    def load_deduplicator(self) -> TripleDeduplicator:
+        """Get the deduplicator of the written triples.
+        When the dataset is appended to, the fingerprints of its content are loaded, by reading it
+        with the iter_dataframes() method (in case the dataset is too large), so only the fingerprints are
+        kept in memory. In the dictionary-encoded layout, ids are decoded with the term dictionary,
+        which must be loaded first.
+        """
+        deduplicator = TripleDeduplicator()
+        if not self.append:
+            return deduplicator
+        terms = np.asarray(self.term_dictionary.terms, dtype=object) if self.dictionary_encoded else None
+        for df in self.dss_dataset.iter_dataframes(
+            columns=self.index_columns, chunksize=DEDUPLICATION_LOAD_CHUNK_SIZE
+        ):
+            subjects, predicates, objects = (df[column].to_numpy() for column in self.dataframe_columns)
+            if terms is not None:
+                subjects, predicates, objects = (terms[ids.astype(np.int64)] for ids in (subjects, predicates, objects))
+            graphs = None
+            if self.graph_column_name is not None:
+                graphs = df[self.graph_column_name].fillna(DEFAULT_GRAPH).to_numpy(dtype=object)
+            deduplicator.filter(subjects, predicates, objects, graphs)
+        return deduplicator
+
+    def drop_staging_duplicates(self):
+        """Drop the staged triples which were already written, or staged twice"""
+        kept = self.deduplicator.filter(
+            self.staging_subjects,
+            self.staging_predicates,
+            self.staging_objects,
+            self.staging_graphs if self.graph_column_name is not None else None,
+        )
+        if len(kept) < self.staging_size:
+            self.duplicates += self.staging_size - len(kept)
+            self.staging_subjects = [self.staging_subjects[i] for i in kept]
+            self.staging_predicates = [self.staging_predicates[i] for i in kept]
+            self.staging_objects = [self.staging_objects[i] for i in kept]
+            self.staging_sources = [self.staging_sources[i] for i in kept]
+            self.staging_graphs = [self.staging_graphs[i] for i in kept]
+
     def commit(self):
-        # write the staging dataframe to the output dataset, then clear it
-        self.dss_dataset.write_dataframe(self.staging_df)
-        self.staging_df = self.staging_df[:0]
+        # write the staging buffer to the output dataset, then clear it
+        if self.staging_size == 0:
+            return
+        if self.writer is None:
+            if self.dictionary_encoded:
+                self.term_dictionary = self.load_term_dictionary()
+            if self.deduplicate:
+                self.deduplicator = self.load_deduplicator()
+            # the dataset content is about to change, so the index and the statistics are outdated
+            self.invalidate_index()
+            self.invalidate_statistics()
+            # statistics of distinct terms cannot be updated from the ones of the existing content
+            self.statistics_collector = None if self.append else StatisticsCollector(self.context_aware)
+            self.writer = self.open_writer(self.dss_dataset)
+            if self.dictionary_encoded:
+                self.terms_writer = self.open_writer(self.terms_dataset)
+        if self.deduplicator is not None:
+            self.drop_staging_duplicates()
+            if self.staging_size == 0:
+                return
+        if self.dictionary_encoded:
+            self.writer.write_dataframe(self.encode_staging_dataframe())
+        else:
+            self.writer.write_dataframe(self.staging_dataframe())
+        if self.statistics_collector is not None:
+            self.statistics_collector.update(self.staging_subjects, self.staging_predicates, self.staging_objects)
+        self.staging_subjects = []
+        self.staging_predicates = []
+        self.staging_objects = []
+        self.staging_sources = []
+        self.staging_graphs = []
+
+    def close(self, commit_pending_transaction=False):
+        if commit_pending_transaction:
+            self.commit()
+        if self.terms_writer is not None:
+            self.terms_writer.close()
+            self.terms_writer = None
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            self.invalidate_index()
+            if self.statistics_collector is not None:
+                # the statistics describe the dataset as it was just written
+                self.save_statistics(self.statistics_collector.get_statistics()._replace(version=self.get_version()))
+                self.statistics_collector = None
+            if self.deduplicator is not None:
+                self.deduplicator.close()
+                self.deduplicator = None
 
     def remove(self, _, context):
         raise TypeError("The store is append only!")
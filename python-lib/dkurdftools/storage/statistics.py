@@ -0,0 +1,158 @@
+import json
+from typing import IO, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .deduplication import get_triple_fingerprints
+from .triple_index import OBJECT, PREDICATE, SUBJECT, TripleIndex
+
+# Minimum number of buffered hashes merged into a set of distinct hashes
+MIN_MERGED_HASHES = 100_000
+
+
+class PredicateStatistics(NamedTuple):
+    """Statistics of the triples of a predicate"""
+
+    triples: int
+    distinct_subjects: int
+    distinct_objects: int
+
+
+class TripleStatistics(NamedTuple):
+    """Statistics of a table of triples, e.g., to estimate the cardinality of triple patterns"""
+
+    triples: int
+    distinct_subjects: int
+    distinct_objects: int
+    # statistics per predicate (N3 term)
+    predicates: dict[str, PredicateStatistics]
+    # stamp of the version of the dataset, to check that persisted statistics are up to date
+    version: Optional[str] = None
+    # number of distinct triples of a table of quads, where a triple has one row per graph holding it
+    distinct_triples: Optional[int] = None
+
+    @classmethod
+    def from_index(cls, index: TripleIndex) -> "TripleStatistics":
+        """Compute the statistics of the triples of an index"""
+        codes = index.codes
+        predicates = {}
+        if len(codes):
+            # group the distinct (predicate, subject) and (predicate, object) pairs by predicate
+            triples = np.bincount(codes[:, PREDICATE])
+            subjects = np.bincount(np.unique(codes[:, [PREDICATE, SUBJECT]], axis=0)[:, 0])
+            objects = np.bincount(np.unique(codes[:, [PREDICATE, OBJECT]], axis=0)[:, 0])
+            for code in np.flatnonzero(triples):
+                predicates[index.terms[code]] = PredicateStatistics(
+                    int(triples[code]), int(subjects[code]), int(objects[code])
+                )
+        return cls(
+            len(codes),
+            len(np.unique(codes[:, SUBJECT])),
+            len(np.unique(codes[:, OBJECT])),
+            predicates,
+            distinct_triples=len(np.unique(codes, axis=0)) if index.has_graphs else None,
+        )
+
+    def save(self, stream: IO[bytes]):
+        """Serialize the statistics as JSON"""
+        data = {**self._asdict(), "predicates": {p: s._asdict() for p, s in self.predicates.items()}}
+        stream.write(json.dumps(data).encode("utf-8"))
+
+    @classmethod
+    def load(cls, stream: IO[bytes]) -> "TripleStatistics":
+        """Load statistics serialized with TripleStatistics.save"""
+        data = json.load(stream)
+        predicates = {p: PredicateStatistics(**s) for p, s in data.pop("predicates").items()}
+        return cls(**data, predicates=predicates)
+
+
+class _HashSet:
+    """A set of 64-bit hashes, stored as a sorted array.
+    Added hashes are buffered, and merged once the buffer is as large as the set, so adding n hashes
+    costs O(n log n) overall instead of one sort of the whole set per addition.
+    """
+
+    def __init__(self):
+        self.values = np.empty(0, dtype=np.uint64)
+        self.pending: list[np.ndarray] = []
+        self.pending_size = 0
+
+    def __len__(self) -> int:
+        self.merge()
+        return len(self.values)
+
+    def add(self, hashes: np.ndarray):
+        self.pending.append(hashes)
+        self.pending_size += len(hashes)
+        if self.pending_size >= max(len(self.values), MIN_MERGED_HASHES):
+            self.merge()
+
+    def merge(self):
+        if self.pending:
+            self.values = np.unique(np.concatenate([self.values, *self.pending]))
+            self.pending = []
+            self.pending_size = 0
+
+
+class StatisticsCollector:
+    """Collect the statistics of triples as they are written, so they are known without reading them back.
+
+    Distinct terms are counted from 64-bit hashes of their N3 form, which are kept in memory
+    (8 bytes per distinct subject, object, and (predicate, subject) and (predicate, object) pair,
+    and per distinct triple for quads).
+    """
+
+    def __init__(self, with_graphs: bool = False):
+        """
+        Args:
+          - with_graphs: Whether the triples are quads, whose distinct triples are counted.
+        """
+        self.triples = 0
+        # hashes of the distinct triples, for quads
+        self.distinct_triples = _HashSet() if with_graphs else None
+        self.predicate_triples: dict[str, int] = {}
+        self.subjects = _HashSet()
+        self.objects = _HashSet()
+        # hashes of the distinct subjects and objects of each predicate
+        self.predicate_subjects: dict[str, _HashSet] = {}
+        self.predicate_objects: dict[str, _HashSet] = {}
+
+    @staticmethod
+    def _hash(terms: Sequence[str]) -> np.ndarray:
+        return pd.util.hash_array(np.asarray(terms, dtype=object))
+
+    def update(self, subjects: Sequence[str], predicates: Sequence[str], objects: Sequence[str]):
+        """Add a batch of triples, as N3 terms, to the statistics"""
+        self.triples += len(predicates)
+        if self.distinct_triples is not None:
+            self.distinct_triples.add(get_triple_fingerprints(subjects, predicates, objects))
+        subject_hashes = self._hash(subjects)
+        object_hashes = self._hash(objects)
+        self.subjects.add(subject_hashes)
+        self.objects.add(object_hashes)
+        predicate_codes, predicate_terms = pd.factorize(np.asarray(predicates, dtype=object))
+        for code, predicate in enumerate(predicate_terms):
+            mask = predicate_codes == code
+            if predicate not in self.predicate_triples:
+                self.predicate_triples[predicate] = 0
+                self.predicate_subjects[predicate] = _HashSet()
+                self.predicate_objects[predicate] = _HashSet()
+            self.predicate_triples[predicate] += int(mask.sum())
+            self.predicate_subjects[predicate].add(subject_hashes[mask])
+            self.predicate_objects[predicate].add(object_hashes[mask])
+
+    def get_statistics(self) -> TripleStatistics:
+        """Get the statistics of the triples collected so far"""
+        return TripleStatistics(
+            self.triples,
+            len(self.subjects),
+            len(self.objects),
+            {
+                predicate: PredicateStatistics(
+                    triples, len(self.predicate_subjects[predicate]), len(self.predicate_objects[predicate])
+                )
+                for predicate, triples in self.predicate_triples.items()
+            },
+            distinct_triples=None if self.distinct_triples is None else len(self.distinct_triples),
+        )
@@ -0,0 +1,42 @@
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+
+class TermDictionary:
+    """A dictionary that maps RDF terms (stored as N3 strings) to integer ids.
+    Ids are assigned incrementally, in order of first appearance, so the dictionary
+    can be written as an append-only (id, term) table.
+    """
+
+    def __init__(self, terms: Sequence[str] = ()):
+        """
+        Args:
+          - terms: Initial terms, where the id of a term is its position.
+        """
+        self.terms: list[str] = list(terms)
+        self.ids: dict[str, int] = {term: term_id for term_id, term in enumerate(self.terms)}
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def encode(self, values: np.ndarray) -> np.ndarray:
+        """Get the ids of N3 terms, adding new terms to the dictionary.
+        Values are deduplicated first, so the python-level work is proportional
+        to the number of distinct terms rather than to the number of values.
+
+        Args:
+          - values: An array of N3 terms, of any shape.
+
+        Returns: An int64 array of ids, with the same shape as the input.
+        """
+        local_codes, uniques = pd.factorize(values.ravel())
+        mapping = np.empty(len(uniques), dtype=np.int64)
+        for i, term in enumerate(uniques):
+            term_id = self.ids.get(term)
+            if term_id is None:
+                term_id = self.ids[term] = len(self.terms)
+                self.terms.append(term)
+            mapping[i] = term_id
+        return mapping[local_codes].reshape(values.shape)
@@ -0,0 +1,289 @@
+from io import BytesIO
+from typing import IO, Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .term_dictionary import TermDictionary
+
+# position of each term in a triple, and of the graph in a quad
+SUBJECT, PREDICATE, OBJECT, GRAPH = 0, 1, 2, 3
+
+# Identifier of the default graph in the graphs dictionary, whose quads have no graph in the dataset
+DEFAULT_GRAPH = ""
+
+
+class TripleIndex:
+    """An in-memory index over a table of RDF triples, stored as N3 strings.
+
+    Terms are dictionary-encoded: each distinct N3 term gets an integer id, shared by the subject,
+    predicate and object positions, and triples are stored as a (n, 3) array of ids.
+    For each position, a sorted permutation of the triples (S, P and O orders) is built lazily,
+    so that a triple pattern lookup is a binary search in the most selective order,
+    followed by vectorized masks on the other bound positions.
+
+    The index can also hold the graph of each triple (i.e., quads), encoded with a separate dictionary
+    of graph names. The graph is then a fourth position of the patterns, with its own G order,
+    so the triples of a graph are found without scanning the others.
+    """
+
+    def __init__(
+        self,
+        terms: Iterable[str],
+        codes: np.ndarray,
+        graph_terms: Optional[Iterable[str]] = None,
+        graphs: Optional[np.ndarray] = None,
+    ):
+        """
+        Args:
+          - terms: The distinct N3 terms, where the id of a term is its position.
+          - codes: A (n, 3) array with the term ids of each triple.
+          - graph_terms: The distinct graph names (N3 terms, or DEFAULT_GRAPH), for an index of quads.
+          - graphs: The id of the graph of each triple, for an index of quads.
+        """
+        self.terms = pd.Index(terms, dtype=object)
+        self.codes = codes.reshape(-1, 3).astype(np.int64, copy=False)
+        self.graph_terms = None if graph_terms is None else pd.Index(graph_terms, dtype=object)
+        self.graphs = None if graphs is None else graphs.astype(np.int64, copy=False)
+        # sorted permutations of the triples, per position
+        self._orders: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+        # stamp of the version of the indexed dataset, to check that a persisted index is up to date
+        self.version: Optional[str] = None
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    @property
+    def has_graphs(self) -> bool:
+        return self.graphs is not None
+
+    @staticmethod
+    def _encode_graphs(graph_dictionary: TermDictionary, graphs: pd.Series) -> np.ndarray:
+        # triples of the default graph have no graph name in the dataset
+        return graph_dictionary.encode(graphs.fillna(DEFAULT_GRAPH).to_numpy(dtype=object))
+
+    @classmethod
+    def from_dataframes(cls, dataframes: Iterable[pd.DataFrame], with_graphs: bool = False) -> "TripleIndex":
+        """Build an index from chunks of triples.
+        Each chunk is encoded separately, so only the term dictionary and the encoded triples are kept in memory.
+
+        Args:
+          - dataframes: Dataframes with three columns of N3 terms, in (subject, predicate, object) order,
+            and a fourth column with the graph names if with_graphs is set.
+          - with_graphs: Whether the dataframes hold quads.
+
+        Returns: The index of the triples.
+        """
+        dictionary = TermDictionary()
+        graph_dictionary = TermDictionary()
+        code_chunks = [np.empty((0, 3), dtype=np.int64)]
+        graph_chunks = [np.empty(0, dtype=np.int64)]
+        for df in dataframes:
+            code_chunks.append(dictionary.encode(df.iloc[:, :3].to_numpy(dtype=object)))
+            if with_graphs:
+                graph_chunks.append(cls._encode_graphs(graph_dictionary, df.iloc[:, 3]))
+        if not with_graphs:
+            return cls(dictionary.terms, np.concatenate(code_chunks))
+        return cls(dictionary.terms, np.concatenate(code_chunks), graph_dictionary.terms, np.concatenate(graph_chunks))
+
+    @classmethod
+    def from_encoded_dataframes(
+        cls,
+        term_dataframes: Iterable[pd.DataFrame],
+        code_dataframes: Iterable[pd.DataFrame],
+        with_graphs: bool = False,
+    ) -> "TripleIndex":
+        """Build an index from a dictionary-encoded table of triples.
+
+        Args:
+          - term_dataframes: Dataframes with two columns, the term ids and the N3 terms.
+          - code_dataframes: Dataframes with three columns of term ids, in (subject, predicate, object) order,
+            and a fourth column with the graph names (which are not encoded) if with_graphs is set.
+          - with_graphs: Whether the dataframes hold quads.
+
+        Returns: The index of the triples.
+        """
+        term_chunks = [df.to_numpy() for df in term_dataframes]
+        terms = np.empty(sum(len(chunk) for chunk in term_chunks), dtype=object)
+        for chunk in term_chunks:
+            terms[chunk[:, 0].astype(np.int64)] = chunk[:, 1]
+        graph_dictionary = TermDictionary()
+        codes = [np.empty((0, 3), dtype=np.int64)]
+        graphs = [np.empty(0, dtype=np.int64)]
+        for df in code_dataframes:
+            codes.append(df.iloc[:, :3].to_numpy(dtype=np.int64))
+            if with_graphs:
+                graphs.append(cls._encode_graphs(graph_dictionary, df.iloc[:, 3]))
+        if not with_graphs:
+            return cls(terms, np.concatenate(codes))
+        return cls(terms, np.concatenate(codes), graph_dictionary.terms, np.concatenate(graphs))
+
+    def lookup(self, terms: Iterable[str], position: int = SUBJECT) -> np.ndarray:
+        """Get the ids of N3 terms (or of graph names, for the GRAPH position), with -1 for terms absent from the index"""
+        dictionary = self.graph_terms if position == GRAPH else self.terms
+        return dictionary.get_indexer(list(terms))
+
+    def _column(self, position: int) -> np.ndarray:
+        return self.graphs if position == GRAPH else self.codes[:, position]
+
+    def _order(self, position: int) -> tuple[np.ndarray, np.ndarray]:
+        if position not in self._orders:
+            column = self._column(position)
+            order = np.argsort(column, kind="stable")
+            self._orders[position] = (order, column[order])
+        return self._orders[position]
+
+    def _seek(self, position: int, code: int) -> np.ndarray:
+        order, sorted_codes = self._order(position)
+        start, end = np.searchsorted(sorted_codes, [code, code + 1])
+        return order[start:end]
+
+    def _seek_many(self, position: int, codes: np.ndarray) -> np.ndarray:
+        order, sorted_codes = self._order(position)
+        starts = np.searchsorted(sorted_codes, codes)
+        lengths = np.searchsorted(sorted_codes, codes + 1) - starts
+        # gather the ranges of all the codes at once: each row is the start of its range plus its offset in it
+        range_starts = np.repeat(starts, lengths)
+        offsets = np.arange(len(range_starts)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return order[range_starts + offsets]
+
+    def match(self, pattern: tuple[Optional[str], ...]) -> np.ndarray:
+        """Find the triples matching a triple pattern
+
+        Args:
+          - pattern: The triple pattern, as (subject, predicate, object) N3 terms, with None for unbound positions.
+            In an index of quads, the pattern can have a fourth (graph) position.
+
+        Returns: The (sorted) row numbers of the matching triples.
+        """
+        bound = [(position, term) for position, term in enumerate(pattern[:3]) if term is not None]
+        codes = iter(self.lookup(term for _, term in bound))
+        encoded = [None if term is None else next(codes) for term in pattern[:3]]
+        if len(pattern) > GRAPH and pattern[GRAPH] is not None:
+            encoded.append(self.lookup([pattern[GRAPH]], GRAPH)[0])
+        return self.match_codes(tuple(encoded))
+
+    def match_codes(self, pattern: tuple[Optional[int], ...]) -> np.ndarray:
+        """Find the triples matching a triple pattern of term ids (see lookup())
+
+        Args:
+          - pattern: The triple pattern, as (subject, predicate, object) ids, with None for unbound positions.
+            In an index of quads, the pattern can have a fourth (graph) position.
+
+        Returns: The (sorted) row numbers of the matching triples.
+        """
+        bound = [(position, code) for position, code in enumerate(pattern) if code is not None]
+        if not bound:
+            return np.arange(len(self))
+        if any(code < 0 for _, code in bound):
+            return np.empty(0, dtype=np.int64)
+        # seek in the most selective order, then filter on the other bound positions
+        candidates = [self._seek(position, code) for position, code in bound]
+        best = min(range(len(candidates)), key=lambda i: len(candidates[i]))
+        rows = candidates[best]
+        for i, (position, code) in enumerate(bound):
+            if i != best:
+                rows = rows[self._column(position)[rows] == code]
+        return np.sort(rows)
+
+    def match_choices(self, pattern: tuple[Optional[Sequence[str]], ...]) -> np.ndarray:
+        """Find the triples matching a triple pattern with candidate terms, e.g., (s, [p1, p2], None).
+        The candidates of the most selective position are sought in its order, and the other bound positions
+        are then checked with vectorized membership masks, so the index is searched once for all the candidates.
+
+        Args:
+          - pattern: The candidate N3 terms of each position, with None (or no candidates) for unbound positions.
+            In an index of quads, the pattern can have a fourth (graph) position.
+
+        Returns: The (sorted) row numbers of the matching triples.
+        """
+        bound = []
+        for position, terms in enumerate(pattern):
+            if terms:
+                codes = self.lookup(terms, position)
+                bound.append((position, np.unique(codes[codes >= 0])))
+        if not bound:
+            return np.arange(len(self))
+        candidates = [self._seek_many(position, codes) for position, codes in bound]
+        best = min(range(len(candidates)), key=lambda i: len(candidates[i]))
+        rows = candidates[best]
+        for i, (position, codes) in enumerate(bound):
+            if i != best:
+                rows = rows[np.isin(self._column(position)[rows], codes)]
+        return np.sort(rows)
+
+    def estimate_cardinality(self, pattern: tuple[Optional[int], ...]) -> int:
+        """Estimate the number of triples matching a triple pattern of term ids, without matching it.
+        The estimate is the number of triples matching its most selective bound position, which is exact
+        for patterns with a single bound position, and an upper bound otherwise.
+        """
+        bound = [(position, code) for position, code in enumerate(pattern) if code is not None]
+        if any(code < 0 for _, code in bound):
+            return 0
+        return min((len(self._seek(position, code)) for position, code in bound), default=len(self))
+
+    def decode(self, rows: np.ndarray) -> np.ndarray:
+        """Get the N3 terms of triples, as a (len(rows), 3) array"""
+        return self.terms.to_numpy()[self.codes[rows]]
+
+    def decode_graphs(self, rows: np.ndarray) -> np.ndarray:
+        """Get the graph names of triples, in an index of quads"""
+        return self.graph_terms.to_numpy()[self.graphs[rows]]
+
+    def group_triples(self, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Group rows by triple, as a triple of an index of quads has one row per graph holding it
+
+        Args:
+          - rows: The row numbers of triples, e.g., as found by match().
+
+        Returns: The rows, reordered so the rows of a triple are contiguous (triples are in order of first
+            appearance), and the offsets of the rows of each distinct triple, followed by the number of rows.
+        """
+        if len(rows) == 0:
+            return rows, np.zeros(1, dtype=np.int64)
+        _, first_positions, inverse = np.unique(self.codes[rows], axis=0, return_index=True, return_inverse=True)
+        # renumber the distinct triples in order of first appearance, then sort the rows by triple
+        ranks = np.empty(len(first_positions), dtype=np.int64)
+        ranks[np.argsort(first_positions, kind="stable")] = np.arange(len(first_positions))
+        triple_numbers = ranks[inverse.reshape(-1)]
+        order = np.argsort(triple_numbers, kind="stable")
+        offsets = np.searchsorted(triple_numbers[order], np.arange(len(first_positions) + 1))
+        return rows[order], offsets
+
+    @staticmethod
+    def _pack_strings(strings: Iterable[str]) -> tuple[np.ndarray, np.ndarray]:
+        # strings are stored as a single UTF-8 blob, and the offsets of each string in it
+        encoded = [string.encode("utf-8") for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter((len(string) for string in encoded), dtype=np.int64), out=offsets[1:])
+        return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+    @staticmethod
+    def _unpack_strings(blob: np.ndarray, offsets: np.ndarray) -> list[str]:
+        data = blob.tobytes()
+        return [data[start:end].decode("utf-8") for start, end in zip(offsets[:-1], offsets[1:])]
+
+    def save(self, stream: IO[bytes]):
+        """Serialize the index as a compressed numpy archive (no pickling, no optional dependency)"""
+        terms, offsets = self._pack_strings(self.terms)
+        arrays = {"codes": self.codes, "terms": terms, "offsets": offsets}
+        if self.has_graphs:
+            graph_terms, graph_offsets = self._pack_strings(self.graph_terms)
+            arrays.update(graphs=self.graphs, graph_terms=graph_terms, graph_offsets=graph_offsets)
+        if self.version is not None:
+            arrays["version"] = np.array(self.version)
+        np.savez_compressed(stream, **arrays)
+
+    @classmethod
+    def load(cls, stream: IO[bytes]) -> "TripleIndex":
+        """Load an index serialized with TripleIndex.save"""
+        with np.load(BytesIO(stream.read())) as archive:
+            terms = cls._unpack_strings(archive["terms"], archive["offsets"])
+            if "graphs" not in archive:
+                index = cls(terms, archive["codes"])
+            else:
+                graph_terms = cls._unpack_strings(archive["graph_terms"], archive["graph_offsets"])
+                index = cls(terms, archive["codes"], graph_terms, archive["graphs"])
+            if "version" in archive:
+                index.version = str(archive["version"])
+        return index
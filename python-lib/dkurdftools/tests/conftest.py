@@ -0,0 +1,27 @@
+from io import BytesIO
+
+import pytest
+
+
+class FakeFolder:
+    """In-memory replacement of a dataiku managed Folder"""
+
+    def __init__(self):
+        self.files = {}
+
+    def list_paths_in_partition(self, partition=""):
+        return list(self.files)
+
+    def get_download_stream(self, path):
+        return BytesIO(self.files[path])
+
+    def upload_stream(self, path, f):
+        self.files[path] = f.read()
+
+    def delete_path(self, path):
+        del self.files[path]
+
+
+@pytest.fixture()
+def fake_folder():
+    yield FakeFolder()
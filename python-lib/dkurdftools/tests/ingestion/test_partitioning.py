@@ -0,0 +1,17 @@
+from ...ingestion.partitioning import filter_partition_files, get_source_partition_id
+
+
+def test_get_source_partition_id():
+    assert get_source_partition_id("/data.nt") == "data.nt"
+    assert get_source_partition_id("/2024/01/data dump.nt.gz") == "2024_01_data_dump.nt.gz"
+    assert get_source_partition_id("/a|b.ttl") == "a_b.ttl"
+
+
+def test_filter_partition_files():
+    files = [("folder", "/2024/data.nt"), ("folder", "/2025/data.nt"), ("other", "/2024/data.nt")]
+
+    assert filter_partition_files(files, "2024_data.nt", get_path=lambda file: file[1]) == [
+        ("folder", "/2024/data.nt"),
+        ("other", "/2024/data.nt"),
+    ]
+    assert filter_partition_files(files, "missing", get_path=lambda file: file[1]) == []
@@ -0,0 +1,104 @@
+import gzip
+import os
+import zipfile
+from io import BytesIO
+
+import pytest
+
+from ...ingestion.pipeline import FileExtractionError, FileExtractor, extract_files
+
+FILES = {
+    f"file{i}.ttl": "\n".join(
+        f'<http://example.org/s{i}-{j}> <http://example.org/p> "value {j}" .' for j in range(25)
+    ).encode("utf-8")
+    for i in range(6)
+}
+
+
+def open_file(path):
+    return BytesIO(FILES[path])
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_extract_files(workers):
+    batches = list(extract_files(FILES, FileExtractor(open_file, batch_size=10), workers=workers))
+
+    # files are batched separately
+    assert sorted(len(batch) for _, batch in batches) == sorted([10, 10, 5] * len(FILES))
+    assert {file: sum(len(batch) for source, batch in batches if source == file) for file in FILES} == {
+        file: 25 for file in FILES
+    }
+    rows = [row for _, batch in batches for row in batch]
+    assert len(rows) == 25 * len(FILES)
+    assert ("<http://example.org/s3-7>", "<http://example.org/p>", '"value 7"') in rows
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_extract_files_invalid_file(workers):
+    def open_invalid_file(path):
+        return BytesIO(b"not RDF" if path == "file2.ttl" else FILES[path])
+
+    with pytest.raises(FileExtractionError, match="file2.ttl"):
+        list(extract_files(FILES, FileExtractor(open_invalid_file), workers=workers))
+
+
+
+def test_extract_files_dead_worker():
+    def open_file_or_die(path):
+        if path == "file2.ttl":
+            os._exit(1)  # as if the worker process was killed, e.g., when running out of memory
+        return BytesIO(FILES[path])
+
+    with pytest.raises(FileExtractionError, match="worker process"):
+        list(extract_files(FILES, FileExtractor(open_file_or_die), workers=3))
+
+
+def test_extract_files_stops_workers():
+    extractor = FileExtractor(open_file, batch_size=1)
+    batches = extract_files(FILES, extractor, workers=2)
+    next(batches)
+    # the workers are blocked on the full queue, and stopped when the extraction is closed
+    batches.close()
+def test_file_extractor_resolves_formats():
+    files = {
+        "data.nt": b'<http://example.org/s> <http://example.org/p> "nt" .\n',
+        "data.unknown": b'<http://example.org/s> <http://example.org/p> "sniffed" <http://example.org/g> .\n',
+        "data.custom": b'@prefix ex: <http://example.org/> .\nex:s ex:p "override" .\n',
+    }
+    extractor = FileExtractor(lambda path: BytesIO(files[path]), format_overrides={"custom": "turtle"})
+
+    assert extractor.resolve_format("data.nt", BytesIO())[0] == "nt"
+    assert extractor.resolve_format("data.unknown", BytesIO(files["data.unknown"]))[0] == "nquads"
+    assert extractor.resolve_format("data.custom", BytesIO())[0] == "turtle"
+    rows = [row for _, batch in extract_files(files, extractor) for row in batch]
+    assert [row[2] for row in rows] == ['"nt"', '"sniffed"', '"override"']
+
+
+def test_file_extractor_decompresses_files():
+    archive = BytesIO()
+    with zipfile.ZipFile(archive, "w") as zip_file:
+        zip_file.writestr("a.nt", FILES["file1.ttl"])
+        zip_file.writestr("b.ttl", FILES["file2.ttl"])
+    files = {
+        "file0.nt.gz": gzip.compress(FILES["file0.ttl"]),
+        "archive.zip": archive.getvalue(),
+    }
+    extractor = FileExtractor(lambda path: BytesIO(files[path]))
+
+    rows = [row for _, batch in extract_files(files, extractor) for row in batch]
+    assert len(rows) == 3 * 25
+    assert {row[0].split("-")[0] for row in rows} == {f"<http://example.org/s{i}" for i in range(3)}
+
+
+def test_file_extractor_with_graphs():
+    files = {
+        "data.nq": b'<http://example.org/s> <http://example.org/p> "named" <http://example.org/g> .\n',
+        "data.ttl": b'<http://example.org/s> <http://example.org/p> "default" .\n',
+    }
+    extractor = FileExtractor(lambda path: BytesIO(files[path]), with_graphs=True)
+
+    rows = [row for _, batch in extract_files(files, extractor) for row in batch]
+    assert rows == [
+        ("<http://example.org/s>", "<http://example.org/p>", '"named"', "<http://example.org/g>"),
+        ("<http://example.org/s>", "<http://example.org/p>", '"default"', None),
+    ]
@@ -0,0 +1,82 @@
+import hashlib
+from io import BytesIO
+
+from ...ingestion.state import ExtractionState, compute_stream_hash, get_fingerprint, get_state_path
+
+
+def test_get_fingerprint():
+    assert get_fingerprint({"fullPath": "/a.nt", "size": 12, "lastModified": 1000}) == {
+        "size": 12,
+        "last_modified": 1000,
+    }
+
+
+def test_compute_stream_hash():
+    assert compute_stream_hash(BytesIO(b"content")) == hashlib.sha256(b"content").hexdigest()
+
+
+def test_compare():
+    state = ExtractionState(
+        {
+            ("f", "/a.nt"): {"size": 1, "last_modified": 10},
+            ("f", "/b.nt"): {"size": 2, "last_modified": 20},
+            ("f", "/c.nt"): {"size": 3, "last_modified": 30},
+        }
+    )
+    changes = state.compare(
+        {
+            ("f", "/a.nt"): {"size": 1, "last_modified": 10},
+            ("f", "/b.nt"): {"size": 2, "last_modified": 21},
+            ("f", "/d.nt"): {"size": 4, "last_modified": 40},
+            ("f", "/e.nt"): {"size": None, "last_modified": None},
+        }
+    )
+    assert changes.unchanged == [("f", "/a.nt")]
+    assert changes.changed == [("f", "/b.nt")]
+    assert changes.new == [("f", "/d.nt"), ("f", "/e.nt")]
+    assert changes.removed == [("f", "/c.nt")]
+
+
+def test_compare_hashes():
+    state = ExtractionState(
+        {
+            ("f", "/a.nt"): {"size": 1, "last_modified": 10, "hash": "a"},
+            ("f", "/b.nt"): {"size": 2, "last_modified": 20, "hash": "b"},
+            ("f", "/c.nt"): {"size": 3, "last_modified": 30, "hash": "c"},
+        }
+    )
+    fingerprints = {
+        ("f", "/a.nt"): {"size": 1, "last_modified": 10},
+        # copied again, with the same content
+        ("f", "/b.nt"): {"size": 2, "last_modified": 21},
+        ("f", "/c.nt"): {"size": 3, "last_modified": 31},
+    }
+    hashed = []
+
+    def compute_hash(file):
+        hashed.append(file)
+        return {"/b.nt": "b", "/c.nt": "changed"}[file[1]]
+
+    changes = state.compare(fingerprints, compute_hash=compute_hash)
+    # files whose size and modification time did not change are not hashed
+    assert hashed == [("f", "/b.nt"), ("f", "/c.nt")]
+    assert changes.unchanged == [("f", "/a.nt"), ("f", "/b.nt")]
+    assert changes.changed == [("f", "/c.nt")]
+    assert [fingerprint["hash"] for fingerprint in fingerprints.values()] == ["a", "b", "changed"]
+
+
+def test_save_load(fake_folder):
+    assert ExtractionState.load(fake_folder).fingerprints == {}
+
+    fingerprints = {("f", "/a.nt"): {"size": 1, "last_modified": 10, "hash": "a"}}
+    ExtractionState(fingerprints).save(fake_folder)
+    assert ExtractionState.load(fake_folder).fingerprints == fingerprints
+
+
+def test_save_load_partitions(fake_folder):
+    ExtractionState({("f", "/a.nt"): {"size": 1, "last_modified": 10}}).save(fake_folder, get_state_path("a.nt"))
+    ExtractionState({("f", "/b.nt"): {"size": 2, "last_modified": 20}}).save(fake_folder, get_state_path("b.nt"))
+
+    # partitions are recorded independently of each other
+    assert list(ExtractionState.load(fake_folder, get_state_path("b.nt")).fingerprints) == [("f", "/b.nt")]
+    assert ExtractionState.load(fake_folder).fingerprints == {}
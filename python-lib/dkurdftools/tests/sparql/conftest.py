@@ -50,12 +50,18 @@ def sparql_select_query(requests_mock):
     yield url, parsed_query, json_resp
 
 
-@pytest.fixture()
-def sparql_construct_query(requests_mock):
+@pytest.fixture(params=[
+    ("xml", "application/xml"),
+    ("nt", "application/n-triples"),
+    ("turtle", "text/turtle; charset=utf-8"),
+])
+def sparql_construct_query(request, requests_mock):
     """
     Fixture that yields an URL, a parsed SPARQL construct query,
-    and configure an HTTP mock for the execution of that query.
+    and configure an HTTP mock for the execution of that query,
+    which returns results in each of the supported RDF formats.
     """
+    rdf_format, content_type = request.param
 
     url = "https://wikidata.com/sparql"
     parsed_query = parse_query("construct {?s ?p ?o} where {?s ?p ?o}")
@@ -83,11 +89,38 @@ def sparql_construct_query(requests_mock):
             Literal("Life, the Universe and Everything"),
         )
     )
-    xml_resp = g.serialize(format="xml")
     requests_mock.get(
         re.compile(f"{url}*"),
-        text=xml_resp,
-        headers={"Content-type": "application/xml"},
+        text=g.serialize(format=rdf_format),
+        headers={"Content-type": content_type},
+    )
+
+    yield url, parsed_query
+
+
+@pytest.fixture()
+def sparql_select_query_tsv(requests_mock):
+    """
+    Fixture that yields an URL, a parsed SPARQL select query, its TSV response,
+    and configure an HTTP mock for the execution of that query.
+    """
+
+    url = "https://wikidata.com/sparql"
+    parsed_query = parse_query("select ?book ?title where {?book rdfs:label ?title}")
+
+    # mock the HTTP response
+    tsv_resp = "\n".join(
+        [
+            "?book\t?title",
+            '<http://example.org/book/book6>\t"The Hitchhiker\'s Guide to the Galaxy"@en',
+            "<http://example.org/book/book7>\t",
+            "_:b0\t42",
+        ]
+    )
+    requests_mock.get(
+        re.compile(f"{url}*"),
+        text=tsv_resp,
+        headers={"Content-type": "text/tab-separated-values; charset=utf-8"},
     )
 
     yield url, parsed_query
@@ -0,0 +1,153 @@
+import os
+import re
+import time
+
+import pytest
+
+from ...sparql.cache import ResultCache
+from ...sparql.connector import generate_rows
+from ...sparql.parsing import parse_query
+
+ROWS = [{"s": f"<http://example.org/{i}>", "o": f'"{i}"'} for i in range(10)]
+
+
+@pytest.fixture()
+def cache(tmp_path):
+    return ResultCache(str(tmp_path), ttl=3600)
+
+
+def test_result_cache_write_and_read(cache):
+    key = cache.get_key("https://example.org/sparql", "SELECT * {?s ?p ?o}", "json")
+    assert cache.get_metadata(key) is None
+
+    assert list(cache.write_rows(key, iter(ROWS), etag='"v1"')) == ROWS
+    metadata = cache.get_metadata(key)
+    assert metadata["etag"] == '"v1"'
+    assert cache.is_fresh(metadata)
+    assert cache.get_conditional_headers(metadata) == {"If-None-Match": '"v1"'}
+    assert list(cache.iter_rows(key)) == ROWS
+
+
+def test_result_cache_ignores_partial_results(cache):
+    key = cache.get_key("https://example.org/sparql", "SELECT * {?s ?p ?o}", "json")
+    rows = cache.write_rows(key, iter(ROWS))
+    next(rows)
+    rows.close()
+    assert cache.get_metadata(key) is None
+    assert not list(cache.directory.iterdir())
+
+
+def test_result_cache_evicts_least_recently_used(cache):
+    keys = [cache.get_key("https://example.org/sparql", f"SELECT * {{?s ?p {i}}}") for i in range(3)]
+    for i, key in enumerate(keys):
+        list(cache.write_rows(key, iter(ROWS)))
+        os.utime(cache._rows_path(key), (time.time() - 100 + i, time.time() - 100 + i))
+    # use the oldest entry
+    list(cache.iter_rows(keys[0]))
+    entry_size = cache._rows_path(keys[0]).stat().st_size
+
+    cache.max_size = 2 * entry_size
+    cache.evict()
+    assert cache.get_metadata(keys[0]) is not None
+    assert cache.get_metadata(keys[1]) is None
+    assert cache.get_metadata(keys[2]) is not None
+
+
+def test_result_cache_evicts_expired_entries(cache):
+    key = cache.get_key("https://example.org/sparql", "SELECT * {?s ?p ?o}")
+    revalidable_key = cache.get_key("https://example.org/sparql", "SELECT * {?s ?p ?o}", "revalidable")
+    list(cache.write_rows(key, iter(ROWS)))
+    list(cache.write_rows(revalidable_key, iter(ROWS), last_modified="Wed, 21 Oct 2015 07:28:00 GMT"))
+
+    cache.ttl = 0
+    cache.evict()
+    assert cache.get_metadata(key) is None
+    assert cache.get_metadata(revalidable_key) is not None
+
+
+def test_generate_rows_cached(requests_mock, sparql_select_query, cache):
+    url, parsed_query, json_resp = sparql_select_query
+
+    rows = list(generate_rows(url, parsed_query, cache=cache))
+    assert requests_mock.call_count == 1
+    assert list(generate_rows(url, parsed_query, cache=cache)) == rows
+    assert requests_mock.call_count == 1
+
+    # another results format is cached separately
+    list(generate_rows(url, parsed_query, select_results_type="n3", cache=cache))
+    assert requests_mock.call_count == 2
+
+
+def test_generate_rows_cache_revalidation(requests_mock, sparql_select_query, cache):
+    url, parsed_query, json_resp = sparql_select_query
+    cache.ttl = 0
+    requests_mock.get(
+        re.compile(f"{url}*"),
+        [
+            {"json": json_resp, "headers": {"ETag": '"v1"'}},
+            {"status_code": 304},
+        ],
+    )
+
+    rows = list(generate_rows(url, parsed_query, cache=cache))
+    assert len(rows) == 3
+    assert list(generate_rows(url, parsed_query, cache=cache)) == rows
+    assert requests_mock.call_count == 2
+    assert requests_mock.last_request.headers["If-None-Match"] == '"v1"'
+
+
+def test_generate_rows_cache_response_format(requests_mock, sparql_select_query, cache):
+    url, parsed_query, json_resp = sparql_select_query
+
+    list(generate_rows(url, parsed_query, cache=cache))
+    # rows read from a (lossy) CSV response are not served to a JSON configuration, and vice versa
+    requests_mock.get(
+        re.compile(f"{url}*"),
+        text="book,title\r\nhttp://example.org/b,Title\r\n",
+        headers={"Content-Type": "text/csv"},
+    )
+    list(generate_rows(url, parsed_query, select_response_format="csv", cache=cache))
+    assert requests_mock.call_count == 2
+
+
+def test_generate_rows_cache_entry_evicted_concurrently(requests_mock, sparql_select_query, cache, monkeypatch):
+    url, parsed_query, json_resp = sparql_select_query
+    rows = list(generate_rows(url, parsed_query, cache=cache))
+
+    # the entry is evicted between its freshness check and its read
+    is_fresh = cache.is_fresh
+
+    def evict_and_check_freshness(metadata):
+        for path in cache.directory.glob("*.jsonl.gz"):
+            path.unlink()
+        return is_fresh(metadata)
+
+    monkeypatch.setattr(cache, "is_fresh", evict_and_check_freshness)
+    assert list(generate_rows(url, parsed_query, cache=cache)) == rows
+    assert requests_mock.call_count == 2
+
+
+def test_generate_rows_cache_entry_evicted_after_revalidation(requests_mock, sparql_select_query, cache, monkeypatch):
+    url, parsed_query, json_resp = sparql_select_query
+    cache.ttl = 0
+    requests_mock.get(
+        re.compile(f"{url}*"),
+        [
+            {"json": json_resp, "headers": {"ETag": '"v1"'}},
+            {"status_code": 304},
+            {"json": json_resp, "headers": {"ETag": '"v1"'}},
+        ],
+    )
+    rows = list(generate_rows(url, parsed_query, cache=cache))
+
+    # the entry is evicted once the endpoint confirmed it is still valid
+    refresh = cache.refresh
+
+    def refresh_and_evict(key, metadata):
+        refresh(key, metadata)
+        cache.remove(key)
+
+    monkeypatch.setattr(cache, "refresh", refresh_and_evict)
+    assert list(generate_rows(url, parsed_query, cache=cache)) == rows
+    assert requests_mock.call_count == 3
+    assert "If-None-Match" not in requests_mock.last_request.headers
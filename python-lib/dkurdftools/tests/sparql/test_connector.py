@@ -1,10 +1,17 @@
+import json
+import re
+from urllib.parse import parse_qs, urlparse
+
 import pytest
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import RDFS
 
 from ...sparql.parsing import parse_query
 from ...sparql.connector import (
     UnsupportedSparqlQueryType,
     generate_rows,
     get_and_check_sparql_query_type,
+    get_query_read_schema,
     get_read_schema,
 )
 
@@ -75,6 +82,24 @@ def test_get_read_schema(query, expected_columns):
     )
 
 
+@pytest.mark.parametrize(
+    "query",
+    [
+        "select ?s where {?s ?p ?o}",
+        "select ?o ?s (count(?p) as ?c) where {?s ?p ?o} group by ?s ?o",
+        "select * where {?s ?p ?o optional {?o ?p2 ?o2}}",
+        "construct {?s ?p ?o} where {?s ?p ?o}",
+    ],
+)
+def test_get_query_read_schema(query):
+    assert get_query_read_schema(query) == get_read_schema(parse_query(query))
+
+
+def test_get_query_read_schema_unsupported_query():
+    with pytest.raises(UnsupportedSparqlQueryType):
+        get_query_read_schema("ask where {?s ?p ?o}")
+
+
 def test_generate_rows_select_query_json_format(sparql_select_query):
     url, parsed_query, json_resp = sparql_select_query
 
@@ -146,5 +171,209 @@ def test_generate_rows_construct_query(sparql_construct_query):
     assert sorted(rows, key=sort_key) == sorted(expected_results, key=sort_key)
 
 
+def mock_paginated_endpoint(requests_mock, url, nb_solutions):
+    """Mock an endpoint which answers the LIMIT/OFFSET of each query, and return the list of queries it receives"""
+    queries = []
+
+    def callback(request, context):
+        query = parse_qs(urlparse(request.url).query)["query"][0]
+        queries.append(query)
+        limit = re.search(r"LIMIT (\d+)", query)
+        offset = re.search(r"OFFSET (\d+)", query)
+        start = int(offset.group(1)) if offset else 0
+        end = start + int(limit.group(1)) if limit else nb_solutions
+        return {
+            "head": {"vars": ["s"]},
+            "results": {
+                "bindings": [
+                    {"s": {"type": "uri", "value": f"http://example.org/{i}"}}
+                    for i in range(start, min(end, nb_solutions))
+                ]
+            },
+        }
+
+    requests_mock.get(re.compile(f"{url}*"), json=callback)
+    return queries
+
+
 def test_generate_rows_records_limit(requests_mock):
-    pass
+    url = "https://wikidata.com/sparql"
+    queries = mock_paginated_endpoint(requests_mock, url, 10)
+
+    rows = list(generate_rows(url, parse_query("select ?s where {?s ?p ?o}"), records_limit=3))
+    assert len(rows) == 3
+    assert len(queries) == 1
+    assert "LIMIT 3" in queries[0]
+
+
+@pytest.mark.parametrize("prefetch_pages", [0, 2])
+@pytest.mark.parametrize(
+    "query, records_limit, expected_values, expected_nb_queries",
+    [
+        ("select ?s where {?s ?p ?o}", -1, list(range(10)), 4),
+        ("select ?s where {?s ?p ?o}", 7, list(range(7)), 3),
+        ("select ?s where {?s ?p ?o} limit 5", -1, list(range(5)), 2),
+        ("select ?s where {?s ?p ?o} limit 5 offset 4", -1, list(range(4, 9)), 2),
+        ("select ?s where {?s ?p ?o} offset 8", -1, [8, 9], 1),
+    ],
+)
+def test_generate_rows_paginated(requests_mock, query, records_limit, expected_values, expected_nb_queries, prefetch_pages):
+    url = "https://wikidata.com/sparql"
+    queries = mock_paginated_endpoint(requests_mock, url, 10)
+
+    rows = list(
+        generate_rows(
+            url,
+            parse_query(query),
+            records_limit=records_limit,
+            page_size=3,
+            prefetch_pages=prefetch_pages,
+        )
+    )
+    assert [row["s"]["value"] for row in rows] == [f"http://example.org/{i}" for i in expected_values]
+    if not prefetch_pages:
+        # pages fetched in advance may be discarded
+        assert len(queries) == expected_nb_queries
+
+
+def test_generate_rows_paginated_order(requests_mock):
+    url = "https://wikidata.com/sparql"
+    queries = mock_paginated_endpoint(requests_mock, url, 4)
+
+    rows = list(generate_rows(url, parse_query("select ?s where {?s ?p ?o}"), page_size=2, order_pages=True))
+    assert len(rows) == 4
+    assert all("ORDER BY" in query for query in queries)
+
+
+def test_generate_rows_select_query_tsv_response(sparql_select_query_tsv):
+    url, parsed_query = sparql_select_query_tsv
+
+    rows = list(
+        generate_rows(
+            url, parsed_query, select_results_type="n3", select_response_format="tsv"
+        )
+    )
+    assert rows == [
+        {
+            "book": "<http://example.org/book/book6>",
+            "title": '"The Hitchhiker\'s Guide to the Galaxy"@en',
+        },
+        {"book": "<http://example.org/book/book7>"},
+        {"book": "_:b0", "title": '"42"^^<http://www.w3.org/2001/XMLSchema#integer>'},
+    ]
+
+    rows = list(
+        generate_rows(
+            url, parsed_query, select_results_type="json", select_response_format="tsv"
+        )
+    )
+    assert rows[0] == {
+        "book": {"type": "uri", "value": "http://example.org/book/book6"},
+        "title": {
+            "type": "literal",
+            "value": "The Hitchhiker's Guide to the Galaxy",
+            "xml:lang": "en",
+        },
+    }
+    assert rows[1] == {
+        "book": {"type": "uri", "value": "http://example.org/book/book7"}
+    }
+
+
+def test_generate_rows_select_query_fallback_to_json(requests_mock, sparql_select_query):
+    url, parsed_query, json_resp = sparql_select_query
+    requests_mock.get(
+        re.compile(f"{url}*"),
+        [
+            {"status_code": 406},
+            {"json": json_resp},
+        ],
+    )
+
+    rows = list(generate_rows(url, parsed_query, select_response_format="csv"))
+    assert len(rows) == len(json_resp["results"]["bindings"])
+
+    accept_headers = [request.headers["Accept"] for request in requests_mock.request_history]
+    assert accept_headers == [
+        "text/csv, application/sparql-results+json;q=0.5",
+        "application/sparql-results+json",
+    ]
+
+
+def mock_endpoint_over_graph(requests_mock, url, graph):
+    """Mock an endpoint which evaluates the queries it receives over a graph, and return the list of queries"""
+    queries = []
+
+    def callback(request, context):
+        query = parse_qs(urlparse(request.url).query)["query"][0]
+        queries.append(query)
+        return json.loads(graph.query(query).serialize(format="json"))
+
+    requests_mock.get(re.compile(f"{url}*"), json=callback)
+    return queries
+
+
+@pytest.mark.parametrize("max_concurrent_requests", [1, 3])
+def test_generate_rows_partitioned(requests_mock, max_concurrent_requests):
+    url = "https://wikidata.com/sparql"
+    graph = Graph()
+    for i in range(50):
+        graph.add((URIRef(f"http://example.org/{i}"), RDFS.label, Literal(f"label {i}")))
+    queries = mock_endpoint_over_graph(requests_mock, url, graph)
+    parsed_query = parse_query("select ?s ?label where {?s rdfs:label ?label}")
+
+    rows = list(
+        generate_rows(
+            url,
+            parsed_query,
+            select_results_type="n3",
+            partition_variable="s",
+            max_concurrent_requests=max_concurrent_requests,
+        )
+    )
+    assert len(rows) == 50
+    assert len({row["s"] for row in rows}) == 50
+    # one query per partition, unless all the partitions are extracted in a single query
+    assert len(queries) == (1 if max_concurrent_requests == 1 else 16)
+
+    partition_rows = list(
+        generate_rows(url, parsed_query, select_results_type="n3", partition_variable="s", partition_id="a")
+    )
+    assert 0 < len(partition_rows) < 50
+    assert all(row in rows for row in partition_rows)
+
+
+def test_generate_rows_partitioned_records_limit(requests_mock):
+    url = "https://wikidata.com/sparql"
+    graph = Graph()
+    for i in range(50):
+        graph.add((URIRef(f"http://example.org/{i}"), RDFS.label, Literal(f"label {i}")))
+    mock_endpoint_over_graph(requests_mock, url, graph)
+
+    rows = list(
+        generate_rows(
+            url,
+            parse_query("select ?s ?label where {?s rdfs:label ?label}"),
+            records_limit=5,
+            partition_variable="s",
+            max_concurrent_requests=4,
+        )
+    )
+    assert len(rows) == 5
+
+
+@pytest.mark.parametrize("query, expected_nb_rows", [
+    ("select ?s ?label where {?s rdfs:label ?label} limit 5", 5),
+    ("select (count(*) as ?count) where {?s rdfs:label ?label}", 1),
+])
+def test_generate_rows_partitioned_global_modifiers(requests_mock, query, expected_nb_rows):
+    url = "https://wikidata.com/sparql"
+    graph = Graph()
+    for i in range(50):
+        graph.add((URIRef(f"http://example.org/{i}"), RDFS.label, Literal(f"label {i}")))
+    queries = mock_endpoint_over_graph(requests_mock, url, graph)
+
+    rows = list(generate_rows(url, parse_query(query), partition_variable="s", max_concurrent_requests=4))
+    # the LIMIT and aggregates apply to all the solutions, so the query is not split by partition
+    assert len(rows) == expected_nb_rows
+    assert len(queries) == 1
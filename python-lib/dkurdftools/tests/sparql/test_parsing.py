@@ -1,6 +1,17 @@
 import pytest
 
-from ...sparql.parsing import parse_query, is_query_select_type, is_query_construct_type, get_select_variables
+from ...sparql.parsing import (
+    parse_query,
+    is_query_select_type,
+    is_query_construct_type,
+    get_select_variables,
+    add_limit_to_query,
+    add_order_by_to_query,
+    get_query_limit,
+    has_global_modifiers,
+    parse_query_projection,
+    unparse_query,
+)
 
 
 @pytest.mark.parametrize("query, expected_result", [
@@ -25,4 +36,97 @@ def test_is_query_construct_type(query, expected_result):
     ("select ?s ?p ?o2 where {?s ?p ?o. ?s ?p2 ?o2}", ["s", "p", "o2"]),
 ])
 def test_get_select_variables(query, expected_result):
-    assert sorted(get_select_variables(parse_query(query))) == sorted(expected_result)
\ No newline at end of file
+    assert sorted(get_select_variables(parse_query(query))) == sorted(expected_result)
+
+
+@pytest.mark.parametrize("query, limit, offset, expected_slice", [
+    ("select ?s where {?s ?p ?o}", 10, 0, (0, 10)),
+    ("select ?s where {?s ?p ?o}", 10, 20, (20, 10)),
+    ("select ?s where {?s ?p ?o} limit 15", 10, 10, (10, 5)),
+    ("select ?s where {?s ?p ?o} limit 15 offset 5", 10, 10, (15, 5)),
+    ("select ?s where {?s ?p ?o} limit 5", 10, 10, (10, 0)),
+    ("construct {?s ?p ?o} where {?s ?p ?o}", 10, 20, (20, 10)),
+])
+def test_add_limit_to_query(query, limit, offset, expected_slice):
+    parsed_query = add_limit_to_query(parse_query(query), limit, offset)
+    assert (parsed_query.algebra.p.start, parsed_query.algebra.p.length) == expected_slice
+    # the query is still valid once serialized
+    reparsed_query = parse_query(unparse_query(parsed_query))
+    assert get_query_limit(reparsed_query) == expected_slice[1]
+
+
+def test_add_limit_to_query_keeps_original():
+    parsed_query = parse_query("select ?s where {?s ?p ?o} limit 15")
+    add_limit_to_query(parsed_query, 10, 10)
+    assert get_query_limit(parsed_query) == 15
+
+
+@pytest.mark.parametrize("query, expected_variables", [
+    ("select ?s ?o where {?s ?p ?o}", ["s", "o"]),
+    ("select ?s where {?s ?p ?o} order by desc(?s)", ["s"]),
+    ("construct {?s ?p ?o} where {?s ?p ?o}", ["s", "p", "o"]),
+])
+def test_add_order_by_to_query(query, expected_variables):
+    unparsed_query = unparse_query(add_order_by_to_query(parse_query(query)))
+    assert unparsed_query.count("ORDER BY") == 1
+    # the query is still valid once serialized
+    parse_query(unparsed_query)
+    for variable in expected_variables:
+        assert f"?{variable}" in unparsed_query.split("ORDER BY")[1]
+
+
+@pytest.mark.parametrize("query, expected_result", [
+    ("select ?s where {?s ?p ?o}", False),
+    ("select ?s where {?s ?p ?o filter(?o > 1)} order by ?s", False),
+    ("select ?s where {?s ?p ?o} limit 10", True),
+    ("select ?s where {?s ?p ?o} offset 10", True),
+    ("select distinct ?s where {?s ?p ?o}", True),
+    ("select (count(*) as ?c) where {?s ?p ?o}", True),
+    ("select ?s (count(*) as ?c) where {?s ?p ?o} group by ?s having (count(*) > 1)", True),
+    ("construct {?s ?p ?o} where {?s ?p ?o} limit 3", True),
+    # the modifiers of subqueries are applied before the partitioning filter
+    ("select ?s where {{select distinct ?s where {?s ?p ?o} limit 3}}", False),
+])
+def test_has_global_modifiers(query, expected_result):
+    assert has_global_modifiers(parse_query(query)) == expected_result
+
+
+def test_unparse_construct_query():
+    parsed_query = parse_query("construct {?s <http://example.org/p> ?o} where {?s ?p ?o} limit 3")
+    reparsed_query = parse_query(unparse_query(parsed_query))
+    assert is_query_construct_type(reparsed_query)
+    assert get_query_limit(reparsed_query) == 3
+
+
+
+@pytest.mark.parametrize("query", [
+    "construct {?s ?p ?o} from <http://example.org/g1> from named <http://example.org/g2> where {?s ?p ?o}",
+    "select ?s from <http://example.org/g1> from named <http://example.org/g2> where {?s ?p ?o} limit 3",
+    # braces in the expressions of the projection are not taken for the WHERE clause
+    'select ?s (concat("{(", ?o) as ?c) from <http://example.org/g1> where {?s ?p ?o}',
+])
+def test_unparse_query_dataset_clause(query):
+    parsed_query = parse_query(query)
+    reparsed_query = parse_query(unparse_query(parsed_query))
+    assert reparsed_query.algebra.datasetClause == parsed_query.algebra.datasetClause
+    assert unparse_query(reparsed_query) == unparse_query(parsed_query)
+def test_parse_query_is_memoized():
+    query = "select ?s where {?s ?p ?o} limit 15"
+    parsed_query = parse_query(query)
+    assert parse_query(query) is parsed_query
+    # the shared plan is not modified by the rewritings
+    unparsed_query = unparse_query(parsed_query)
+    add_limit_to_query(parsed_query, 10, 10)
+    add_order_by_to_query(parsed_query)
+    assert unparse_query(parse_query(query)) == unparsed_query
+
+
+@pytest.mark.parametrize("query, expected_result", [
+    ("select ?s where {?s ?p ?o}", ("select", ["s"])),
+    ("select ?s (count(?o) as ?c) where {?s ?p ?o} group by ?s", ("select", ["s", "c"])),
+    ("select * where {?s ?p ?o}", ("select", None)),
+    ("construct {?s ?p ?o} where {?s ?p ?o}", ("construct", None)),
+    ("ask where {?s ?p ?o}", ("ask", None)),
+])
+def test_parse_query_projection(query, expected_result):
+    assert parse_query_projection(query) == expected_result
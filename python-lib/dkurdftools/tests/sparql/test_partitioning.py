@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+from rdflib import Graph
+
+from ...sparql.parsing import parse_query, unparse_query
+from ...sparql.partitioning import (
+    InvalidPartitionId,
+    add_hash_partition_filter,
+    endpoint_slot,
+    list_hash_partitions,
+)
+
+DATA = """
+@prefix : <http://example.org/> .
+:a :p 1, 2 .
+:b :p 3 .
+:c :q "x" .
+_:x :p :a .
+:d :p "y"@en .
+"""
+
+
+@pytest.fixture()
+def graph():
+    graph = Graph()
+    graph.parse(data=DATA, format="turtle")
+    return graph
+
+
+def test_list_hash_partitions():
+    assert len(list_hash_partitions(1)) == 16
+    partitions = list_hash_partitions(2)
+    assert len(partitions) == 256
+    assert partitions[0] == "00" and partitions[-1] == "ff"
+
+
+@pytest.mark.parametrize(
+    "query, variable",
+    [
+        ("select ?s ?o where {?s ?p ?o}", "s"),
+        ("select ?s (count(?o) as ?c) where {?s ?p ?o} group by ?s order by ?s", "s"),
+        ("select distinct ?s where {?s ?p ?o} order by ?s limit 100", "?s"),
+        ("select ?y ?s where {?s ?p ?o optional {?o ?x ?y}}", "y"),
+        ("construct {?s ?p ?o} where {?s ?p ?o}", "o"),
+    ],
+)
+def test_hash_partitions_cover_solutions(graph, query, variable):
+    parsed_query = parse_query(query)
+    expected_results = sorted(map(str, graph.query(parsed_query)))
+
+    results = []
+    for partition_id in list_hash_partitions(1):
+        partition_query = unparse_query(add_hash_partition_filter(parsed_query, variable, partition_id))
+        results.extend(map(str, graph.query(partition_query)))
+    assert sorted(results) == expected_results
+
+
+@pytest.mark.parametrize("partition_id", ["", "g", "0x"])
+def test_add_hash_partition_filter_invalid_partition(partition_id):
+    with pytest.raises(InvalidPartitionId):
+        add_hash_partition_filter(parse_query("select ?s where {?s ?p ?o}"), "s", partition_id)
+
+
+def test_endpoint_slot_limits():
+    url = "https://example.org/sparql"
+
+    def use_two_slots():
+        with endpoint_slot(url, 2), endpoint_slot(url, 2):
+            pass
+
+    with endpoint_slot(url, 1):
+        # another limit of the same host gets its own slots, instead of waiting for the ones of the first limit
+        thread = threading.Thread(target=use_two_slots, daemon=True)
+        thread.start()
+        thread.join(timeout=5)
+        assert not thread.is_alive()
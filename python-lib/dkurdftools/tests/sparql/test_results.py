@@ -0,0 +1,101 @@
+import json
+
+import pytest
+from rdflib import BNode, Literal, URIRef
+from rdflib.namespace import XSD
+
+from ...sparql.results import (
+    iter_csv_results_bindings,
+    iter_json_results_bindings,
+    iter_tsv_results_bindings,
+    parse_csv_term,
+)
+
+
+BINDINGS = [
+    {"book": {"type": "uri", "value": "http://example.org/book/book6"}},
+    {
+        "book": {"type": "uri", "value": "http://example.org/book/book7"},
+        "title": {"type": "literal", "value": "A \"quoted\" title with [brackets] and {braces}", "xml:lang": "en"},
+    },
+    {"count": {"type": "literal", "value": "12", "datatype": "http://www.w3.org/2001/XMLSchema#integer"}},
+]
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 17, 1024])
+def test_iter_json_results_bindings(chunk_size):
+    document = json.dumps(
+        {
+            "head": {"vars": ["book", "title", "count"], "link": []},
+            "results": {"distinct": False, "ordered": True, "bindings": BINDINGS},
+        },
+        indent=2,
+    ).encode("utf-8")
+
+    assert list(iter_json_results_bindings(chunked(document, chunk_size))) == BINDINGS
+
+
+def test_iter_json_results_bindings_results_before_head():
+    document = json.dumps({"results": {"bindings": BINDINGS}, "head": {"vars": []}})
+
+    assert list(iter_json_results_bindings(chunked(document, 5))) == BINDINGS
+
+
+def test_iter_json_results_bindings_no_results():
+    assert list(iter_json_results_bindings(['{"head": {"vars": []}, "results": {"bindings": []}}'])) == []
+
+
+def test_iter_json_results_bindings_truncated_document():
+    document = json.dumps({"head": {"vars": []}, "results": {"bindings": BINDINGS}})
+
+    with pytest.raises(ValueError):
+        list(iter_json_results_bindings([document[:-20]]))
+
+
+def test_iter_tsv_results_bindings():
+    document = (
+        "?s\t?o\r\n"
+        "<http://example.org/s>\t\"multi\\nline\"@en\r\n"
+        "_:b1\t\r\n"
+        "<http://example.org/s>\t1.5\r\n"
+    )
+    assert list(iter_tsv_results_bindings(chunked(document, 4))) == [
+        {"s": URIRef("http://example.org/s"), "o": Literal("multi\nline", lang="en")},
+        {"s": BNode("b1")},
+        {"s": URIRef("http://example.org/s"), "o": Literal("1.5", datatype=XSD.decimal)},
+    ]
+
+
+def test_iter_csv_results_bindings():
+    document = 's,o\r\nhttp://example.org/s,"multi\r\nline, with comma"\r\n_:b1,\r\nurn:isbn:123,plain text\r\n'
+    assert list(iter_csv_results_bindings(chunked(document.encode("utf-8"), 3))) == [
+        {"s": URIRef("http://example.org/s"), "o": Literal("multi\r\nline, with comma")},
+        {"s": BNode("b1")},
+        {"s": URIRef("urn:isbn:123"), "o": Literal("plain text")},
+    ]
+
+
+def test_iter_results_bindings_unicode_line_separators():
+    tsv_document = '?s\t?o\n<http://example.org/s>\t"a b\u0085c"\n'
+    assert list(iter_tsv_results_bindings(chunked(tsv_document.encode("utf-8"), 5))) == [
+        {"s": URIRef("http://example.org/s"), "o": Literal("a b\u0085c")},
+    ]
+    csv_document = 's,o\r\nhttp://example.org/s,a b\u0085c\r\n'
+    assert list(iter_csv_results_bindings(chunked(csv_document.encode("utf-8"), 5))) == [
+        {"s": URIRef("http://example.org/s"), "o": Literal("a b\u0085c")},
+    ]
+
+
+@pytest.mark.parametrize("value, expected_term", [
+    ("http://example.org/s", URIRef("http://example.org/s")),
+    ("urn:isbn:123", URIRef("urn:isbn:123")),
+    ("Title:Subtitle", Literal("Title:Subtitle")),
+    ("note:foo", Literal("note:foo")),
+    ("_:b1", BNode("b1")),
+])
+def test_parse_csv_term(value, expected_term):
+    assert parse_csv_term(value) == expected_term
@@ -0,0 +1,76 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+from ...sparql.session import (
+    ACCEPT_ENCODING,
+    MAX_GET_URL_LENGTH,
+    get_session,
+    send_sparql_request,
+)
+
+
+@pytest.fixture()
+def flaky_endpoint():
+    """Fixture that yields the URL of a local endpoint, which fails with a 503 before each successful response,
+    and the list of the queries it received."""
+    queries = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            queries.append(parse_qs(self.path.split("?", 1)[1])["query"][0])
+            if len(queries) % 2:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = b'{"head": {"vars": []}, "results": {"bindings": []}}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/sparql-results+json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/sparql", queries
+    server.shutdown()
+    server.server_close()
+
+
+def test_send_sparql_request_retries(flaky_endpoint):
+    url, queries = flaky_endpoint
+    with send_sparql_request(url, "select * {?s ?p ?o}", "application/sparql-results+json") as res:
+        assert res.status_code == 200
+    assert queries == ["select * {?s ?p ?o}"] * 2
+
+    with send_sparql_request(url, "select * {?s ?p ?o}", "application/sparql-results+json", max_retries=0) as res:
+        assert res.status_code == 503
+
+
+def test_get_session_is_shared_per_host():
+    session = get_session("https://example.org/sparql")
+    assert get_session("https://example.org/other-sparql") is session
+    assert get_session("https://example.com/sparql") is not session
+    assert session.headers["Accept-Encoding"] == ACCEPT_ENCODING
+
+
+def test_send_sparql_request_long_query_uses_post(requests_mock):
+    url = "https://example.org/sparql"
+    requests_mock.get(url, json={})
+    requests_mock.post(url, json={})
+
+    send_sparql_request(url, "select * {?s ?p ?o}", "application/sparql-results+json")
+    assert requests_mock.last_request.method == "GET"
+
+    long_query = "select * {?s ?p ?o} #" + "x" * MAX_GET_URL_LENGTH
+    send_sparql_request(url, long_query, "application/sparql-results+json")
+    assert requests_mock.last_request.method == "POST"
+    assert parse_qs(requests_mock.last_request.text)["query"] == [long_query]
+    assert requests_mock.last_request.headers["Content-Type"] == "application/x-www-form-urlencoded"
@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+
+class FakeDatasetWriter:
+    """In-memory replacement of a dataiku DatasetWriter"""
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.closed = False
+
+    def write_dataframe(self, df):
+        self.dataset.dataframes.append(df)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeDataset:
+    """In-memory replacement of a dataiku Dataset, with the subset of the API used by the store"""
+
+    def __init__(self, dataframes=None):
+        self.dataframes = list(dataframes or [])
+        self.schema = None
+        self.writers = []
+        self.spec_item = {}
+        # bumped on each write, as the modification time of the files of a real dataset
+        self.version = 0
+
+    def write_schema(self, schema):
+        self.schema = schema
+
+    def get_writer(self):
+        if not self.spec_item.get("appendMode", False):
+            self.dataframes = []
+        self.version += 1
+        writer = FakeDatasetWriter(self)
+        self.writers.append(writer)
+        return writer
+
+    def get_files_info(self):
+        return {"globalPaths": [{"path": "/out-s0.csv.gz", "size": 0, "lastModified": self.version}]}
+
+    def iter_dataframes(self, columns=None, chunksize=10000, **kwargs):
+        for df in self.dataframes:
+            yield df[columns] if columns is not None else df
+
+    def get_dataframe(self, columns=None, **kwargs):
+        return pd.concat(list(self.iter_dataframes(columns=columns)), ignore_index=True)
+
+
+@pytest.fixture()
+def fake_dataset():
+    yield FakeDataset()
+
+
+@pytest.fixture()
+def fake_terms_dataset():
+    yield FakeDataset()
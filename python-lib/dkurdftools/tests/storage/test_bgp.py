@@ -0,0 +1,171 @@
+import pandas as pd
+import pytest
+from rdflib import Dataset, Graph, Literal, URIRef, Variable
+from rdflib.util import from_n3
+
+from ...storage.bgp import (
+    disable_native_bgp_evaluation,
+    enable_native_bgp_evaluation,
+    encode_bgp,
+    evaluate_bgp,
+    order_patterns,
+)
+from ...storage.dss_store import DataikuDatasetStore
+from ...storage.triple_index import TripleIndex
+from .conftest import FakeDataset
+
+EX = "http://example.org/"
+
+TRIPLES = [
+    *((f"<{EX}person{i}>", f"<{EX}type>", f"<{EX}Person>") for i in range(20)),
+    *((f"<{EX}person{i}>", f"<{EX}knows>", f"<{EX}person{(i + 1) % 20}>") for i in range(20)),
+    *((f"<{EX}person{i}>", f"<{EX}age>", f'"{20 + i % 5}"') for i in range(20)),
+    (f"<{EX}person3>", f"<{EX}knows>", f"<{EX}person3>"),
+    (f"<{EX}person0>", f"<{EX}name>", '"Alice"'),
+]
+
+QUERIES = [
+    f"SELECT ?s ?o WHERE {{ ?s <{EX}knows> ?o }}",
+    f"SELECT ?a ?c WHERE {{ ?a <{EX}knows> ?b . ?b <{EX}knows> ?c . ?c <{EX}age> \"22\" }}",
+    f"SELECT ?x WHERE {{ ?x <{EX}knows> ?x }}",
+    f"SELECT ?x ?n WHERE {{ ?x <{EX}type> <{EX}Person> OPTIONAL {{ ?x <{EX}name> ?n }} }}",
+    f"SELECT ?x WHERE {{ ?x <{EX}age> ?a FILTER(?a = \"21\") }}",
+    f"SELECT ?x ?y WHERE {{ ?x <{EX}name> ?n . ?y <{EX}name> ?n }}",
+    f"SELECT ?x WHERE {{ <{EX}person0> <{EX}name> \"Alice\" . ?x <{EX}name> ?n }}",
+    f"SELECT ?x WHERE {{ <{EX}person0> <{EX}name> \"Bob\" . ?x <{EX}name> ?n }}",
+    f"SELECT ?x WHERE {{ ?x <{EX}unknown> ?y }}",
+    f"SELECT ?x ?y WHERE {{ ?x <{EX}knows> [ <{EX}knows> ?y ] }}",
+    f"SELECT ?x WHERE {{ ?x <{EX}knows>/<{EX}knows> <{EX}person5> }}",
+]
+
+
+@pytest.fixture()
+def graph():
+    dataset = FakeDataset([pd.DataFrame(TRIPLES, columns=["subject", "predicate", "object"])])
+    yield Graph(store=DataikuDatasetStore(dataset))
+    disable_native_bgp_evaluation()
+
+
+def run_query(graph, query):
+    return sorted(tuple(row) for row in graph.query(query))
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_native_evaluation(graph, query):
+    expected = run_query(graph, query)
+    enable_native_bgp_evaluation()
+    assert run_query(graph, query) == expected
+
+
+def test_order_patterns():
+    index = TripleIndex.from_dataframes([pd.DataFrame(TRIPLES)])
+    x, y, z = Variable("x"), Variable("y"), Variable("z")
+    patterns = encode_bgp(
+        index,
+        [
+            (x, URIRef(f"{EX}type"), URIRef(f"{EX}Person")),
+            (y, URIRef(f"{EX}knows"), z),
+            (x, URIRef(f"{EX}name"), Literal("Alice")),
+            (x, URIRef(f"{EX}knows"), y),
+        ],
+    )
+    cardinalities = [index.estimate_cardinality(tuple(None if isinstance(t, Variable) else t for t in p)) for p in patterns]
+
+    assert cardinalities == [20, 21, 1, 21]
+    # the most selective pattern first, then the connected patterns
+    assert order_patterns(patterns, cardinalities) == [2, 0, 3, 1]
+
+
+def test_evaluate_bgp():
+    index = TripleIndex.from_dataframes([pd.DataFrame(TRIPLES)])
+    x, y = Variable("x"), Variable("y")
+    solutions = evaluate_bgp(
+        index, encode_bgp(index, [(x, URIRef(f"{EX}knows"), y), (y, URIRef(f"{EX}age"), Literal("20"))])
+    )
+
+    assert list(solutions.columns) == ["?x", "?y"]
+    decoded = {tuple(index.terms[solution]) for solution in solutions.to_numpy()}
+    assert decoded == {(f"<{EX}person{i}>", f"<{EX}person{i + 1}>") for i in (4, 9, 14)} | {
+        (f"<{EX}person19>", f"<{EX}person0>")
+    }
+    assert encode_bgp(index, [(x, URIRef(f"{EX}unknown"), y)]) is None
+
+
+QUAD_QUERIES = [
+    f"SELECT ?s ?o WHERE {{ ?s <{EX}knows> ?o }}",
+    f"SELECT ?s ?o WHERE {{ GRAPH <{EX}g1> {{ ?s <{EX}knows> ?o }} }}",
+    f"SELECT ?g ?s WHERE {{ GRAPH ?g {{ ?s <{EX}type> <{EX}Person> . ?s <{EX}age> \"21\" }} }}",
+    f"SELECT ?s WHERE {{ GRAPH <{EX}unknown> {{ ?s ?p ?o }} }}",
+    f"SELECT ?x ?n WHERE {{ ?x <{EX}knows> ?y GRAPH <{EX}g1> {{ ?y <{EX}age> ?n }} }}",
+]
+
+
+@pytest.mark.parametrize("default_union", [True, False])
+@pytest.mark.parametrize("query", QUAD_QUERIES)
+def test_native_evaluation_with_graphs(query, default_union):
+    # the triples are spread over three named graphs and the default graph, by subject
+    graphs = [f"<{EX}g{i % 4}>" if i % 4 else None for i in range(len(TRIPLES))]
+    dataset = FakeDataset(
+        [pd.DataFrame([(*triple, graph) for triple, graph in zip(TRIPLES, graphs)], columns=["s", "p", "o", "g"])]
+    )
+    store = DataikuDatasetStore(
+        dataset, subject_column_name="s", predicate_column_name="p", object_column_name="o", graph_column_name="g"
+    )
+    rdf_dataset = Dataset(store=store, default_union=default_union)
+    try:
+        expected = run_query(rdf_dataset, query)
+        enable_native_bgp_evaluation()
+        assert run_query(rdf_dataset, query) == expected
+    finally:
+        disable_native_bgp_evaluation()
+
+
+
+@pytest.mark.parametrize("native", [True, False])
+@pytest.mark.parametrize("query", QUAD_QUERIES + QUERIES[:3])
+def test_evaluation_with_shared_triples(query, native):
+    # the triples are held by several graphs, and are matched once over their union, as in rdflib datasets
+    quads = [
+        (*triple, graph)
+        for i, triple in enumerate(TRIPLES)
+        for graph in [f"<{EX}g1>", f"<{EX}g2>" if i % 3 == 0 else None, None if i % 2 == 0 else f"<{EX}g3>"]
+    ]
+    dataset = FakeDataset([pd.DataFrame(quads, columns=["s", "p", "o", "g"])])
+    store = DataikuDatasetStore(
+        dataset, subject_column_name="s", predicate_column_name="p", object_column_name="o", graph_column_name="g"
+    )
+    expected_dataset = Dataset(default_union=True)
+    for *triple, graph in quads:
+        context = expected_dataset.default_context if graph is None else expected_dataset.graph(from_n3(graph))
+        context.add(tuple(from_n3(term) for term in triple))
+    expected = run_query(expected_dataset, query)
+    try:
+        if native:
+            enable_native_bgp_evaluation()
+        assert run_query(Dataset(store=store, default_union=True), query) == expected
+    finally:
+        disable_native_bgp_evaluation()
+
+BLANK_NODE_TRIPLES = [
+    (f"<{EX}a>", f"<{EX}p0>", "_:b1"),
+    ("_:b1", f"<{EX}p1>", f"<{EX}z1>"),
+    (f"<{EX}d>", f"<{EX}p1>", f"<{EX}z2>"),
+    (f"<{EX}c>", f"<{EX}p0>", "_:b2"),
+]
+
+
+@pytest.mark.parametrize("query", [
+    f"SELECT ?x ?z WHERE {{ ?x <{EX}p0> ?y OPTIONAL {{ ?y <{EX}p1> ?z }} }}",
+    f"SELECT ?x WHERE {{ ?x <{EX}p0> ?y FILTER EXISTS {{ ?y <{EX}p1> ?z }} }}",
+    f"SELECT ?x ?z WHERE {{ ?x <{EX}p0> ?y {{ SELECT ?y ?z WHERE {{ ?y <{EX}p1> ?z }} }} }}",
+])
+def test_native_evaluation_with_bound_blank_nodes(query):
+    # blank nodes of the data bound by the context are constants, not variables
+    dataset = FakeDataset([pd.DataFrame(BLANK_NODE_TRIPLES, columns=["subject", "predicate", "object"])])
+    graph = Graph(store=DataikuDatasetStore(dataset))
+    try:
+        expected = run_query(graph, query)
+        enable_native_bgp_evaluation()
+        assert run_query(graph, query) == expected
+    finally:
+        disable_native_bgp_evaluation()
@@ -0,0 +1,28 @@
+import numpy as np
+
+from ...storage.deduplication import FingerprintSet, TripleDeduplicator
+
+
+def test_fingerprint_set_spills_to_disk():
+    fingerprints = FingerprintSet(max_memory_fingerprints=100)
+    values = np.random.default_rng(0).permutation(np.arange(1000, dtype=np.uint64) * 7)
+    for batch in np.array_split(values, 30):
+        fingerprints.add(batch)
+
+    assert len(fingerprints) == 1000
+    assert len(fingerprints.spilled_runs) > 1
+    assert fingerprints.memory_size <= 100
+    assert fingerprints.contains(values).all()
+    assert not fingerprints.contains(values + np.uint64(1)).any()
+    fingerprints.close()
+
+
+def test_triple_deduplicator():
+    deduplicator = TripleDeduplicator(FingerprintSet(max_memory_fingerprints=2))
+    kept = deduplicator.filter(["<s1>", "<s2>", "<s1>", "<s3>"], ["<p>"] * 4, ['"o"'] * 4)
+    assert kept.tolist() == [0, 1, 3]
+
+    kept = deduplicator.filter(["<s3>", "<s4>", "<s4>"], ["<p>"] * 3, ['"o"', '"o"', '"other"'])
+    assert kept.tolist() == [1, 2]
+    assert deduplicator.duplicates == 2
+    deduplicator.close()
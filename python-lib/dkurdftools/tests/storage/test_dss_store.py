@@ -0,0 +1,352 @@
+import pytest
+from rdflib import Dataset, Graph, Literal, URIRef
+from rdflib.graph import DATASET_DEFAULT_GRAPH_ID
+from rdflib.store import TripleAddedEvent
+
+from ...storage.dss_store import DataikuDatasetStore
+
+
+EX = "http://example.org/"
+
+
+def make_triple(i):
+    return (URIRef(f"{EX}s{i}"), URIRef(f"{EX}p"), Literal(f"value {i}"))
+
+
+def test_add_autocommit(fake_dataset):
+    store = DataikuDatasetStore(fake_dataset, autocommit_add_threshold=2)
+    for i in range(5):
+        store.add(make_triple(i))
+
+    assert [len(df) for df in fake_dataset.dataframes] == [2, 2]
+    assert store.staging_size == 1
+
+    store.close(commit_pending_transaction=True)
+    assert [len(df) for df in fake_dataset.dataframes] == [2, 2, 1]
+    # a single writer is used, so flushes do not overwrite each other
+    assert len(fake_dataset.writers) == 1
+    assert fake_dataset.writers[0].closed is True
+
+    df = fake_dataset.get_dataframe()
+    assert list(df.columns) == ["subject", "predicate", "object"]
+    assert df.iloc[4].tolist() == [f"<{EX}s4>", f"<{EX}p>", '"value 4"']
+
+
+def test_add_n(fake_dataset):
+    store = DataikuDatasetStore(
+        fake_dataset,
+        subject_column_name="s",
+        predicate_column_name="p",
+        object_column_name="o",
+        autocommit_add_threshold=10,
+    )
+    graph = Graph(store=store)
+    graph.addN((*make_triple(i), graph) for i in range(25))
+    graph.commit()
+
+    assert [len(df) for df in fake_dataset.dataframes] == [10, 10, 5]
+    assert list(fake_dataset.dataframes[0].columns) == ["s", "p", "o"]
+
+
+def test_add_n_events(fake_dataset):
+    store = DataikuDatasetStore(fake_dataset, autocommit_add_threshold=10)
+    events = []
+    store.dispatcher.subscribe(TripleAddedEvent, events.append)
+    store.addN((*make_triple(i), None) for i in range(15))
+
+    assert [event.triple for event in events] == [make_triple(i) for i in range(15)]
+    assert [len(df) for df in fake_dataset.dataframes] == [10]
+    assert store.staging_size == 5
+
+
+def test_triples_choices(fake_dataset):
+    store = DataikuDatasetStore(fake_dataset)
+    graph = Graph(store=store)
+    graph.addN((*make_triple(i), graph) for i in range(5))
+    graph.commit()
+
+    subjects = [URIRef(f"{EX}s1"), URIRef(f"{EX}s3"), URIRef(f"{EX}unknown")]
+    assert sorted(graph.triples_choices((subjects, None, None))) == [make_triple(1), make_triple(3)]
+    objects = [Literal("value 0"), Literal("value 4")]
+    assert sorted(graph.triples_choices((None, URIRef(f"{EX}p"), objects))) == [make_triple(0), make_triple(4)]
+    assert len(list(graph.triples_choices((None, [], None)))) == 5
+
+
+def test_add_n3_triples(fake_dataset):
+    store = DataikuDatasetStore(fake_dataset, autocommit_add_threshold=10)
+    store.add_n3_triples(tuple(term.n3() for term in make_triple(i)) for i in range(25))
+    store.close(commit_pending_transaction=True)
+
+    assert [len(df) for df in fake_dataset.dataframes] == [10, 10, 5]
+    assert fake_dataset.get_dataframe().iloc[4].tolist() == [f"<{EX}s4>", f"<{EX}p>", '"value 4"']
+
+
+def test_commit_empty_buffer(fake_dataset):
+    store = DataikuDatasetStore(fake_dataset)
+    store.commit()
+    store.close()
+
+    assert fake_dataset.dataframes == []
+    assert fake_dataset.writers == []
+
+
+def test_triples(fake_dataset):
+    store = DataikuDatasetStore(fake_dataset, autocommit_add_threshold=2)
+    graph = Graph(store=store)
+    quoted = Literal('it\'s "quoted"')
+    graph.add((URIRef(f"{EX}s0"), URIRef(f"{EX}q"), quoted))
+    for i in range(3):
+        graph.add(make_triple(i))
+    graph.close(commit_pending_transaction=True)
+
+    assert len(list(graph.triples((None, None, None)))) == 4
+    assert list(graph.triples((None, None, quoted))) == [
+        (URIRef(f"{EX}s0"), URIRef(f"{EX}q"), quoted)
+    ]
+    assert set(graph.objects(URIRef(f"{EX}s0"))) == {quoted, Literal("value 0")}
+    assert list(graph.triples((URIRef(f"{EX}s9"), None, None))) == []
+
+    results = graph.query(
+        "SELECT ?o WHERE { ?s <http://example.org/p> ?o . ?s <http://example.org/q> ?q }"
+    )
+    assert [row.o for row in results] == [Literal("value 0")]
+
+
+def test_persisted_index(fake_dataset, fake_folder):
+    store = DataikuDatasetStore(fake_dataset, index_folder=fake_folder)
+    for i in range(3):
+        store.add(make_triple(i))
+    store.close(commit_pending_transaction=True)
+
+    assert len(list(store.triples((None, None, None), None))) == 3
+    assert sorted(fake_folder.files) == ["/triples_index.npz", "/triples_statistics.json"]
+
+    # another store over the same dataset loads the persisted index
+    fake_dataset.dataframes = []
+    other_store = DataikuDatasetStore(fake_dataset, index_folder=fake_folder)
+    assert len(list(other_store.triples((None, None, None), None))) == 3
+
+    # writing to the dataset invalidates the persisted index and statistics
+    other_store.add(make_triple(3))
+    other_store.commit()
+    assert fake_folder.files == {}
+
+
+def test_stale_persisted_index(fake_dataset, fake_folder):
+    store = DataikuDatasetStore(fake_dataset, index_folder=fake_folder)
+    for i in range(3):
+        store.add(make_triple(i))
+    store.close(commit_pending_transaction=True)
+    assert len(store) == 3
+    assert len(list(store.triples((None, None, None), None))) == 3
+
+    # the dataset is rebuilt outside of the store (e.g., by another recipe), so the persisted files are stale
+    writing_store = DataikuDatasetStore(fake_dataset)
+    for i in range(5):
+        writing_store.add(make_triple(i))
+    writing_store.close(commit_pending_transaction=True)
+    other_store = DataikuDatasetStore(fake_dataset, index_folder=fake_folder)
+    assert len(other_store) == 5
+    assert len(list(other_store.triples((None, None, None), None))) == 5
+
+
+def test_unknown_dataset_version(fake_dataset, fake_folder):
+    fake_dataset.get_files_info = lambda: {}
+    store = DataikuDatasetStore(fake_dataset, index_folder=fake_folder)
+    for i in range(3):
+        store.add(make_triple(i))
+    store.close(commit_pending_transaction=True)
+    assert len(list(store.triples((None, None, None), None))) == 3
+    assert len(store) == 3
+    assert fake_folder.files == {}
+
+
+def test_dictionary_encoded_layout(fake_dataset, fake_terms_dataset):
+    store = DataikuDatasetStore(
+        fake_dataset, terms_dataset=fake_terms_dataset, autocommit_add_threshold=2
+    )
+    store.write_schema()
+    graph = Graph(store=store)
+    for i in range(3):
+        graph.add(make_triple(i))
+    graph.close(commit_pending_transaction=True)
+
+    assert fake_dataset.schema[0] == {"name": "subject", "type": "bigint"}
+    triples_df = fake_dataset.get_dataframe()
+    terms_df = fake_terms_dataset.get_dataframe()
+    # the predicate is only written once in the terms dataset
+    assert len(terms_df) == 7
+    assert triples_df["predicate"].nunique() == 1
+    assert dict(zip(terms_df["id"], terms_df["term"]))[triples_df["subject"][2]] == f"<{EX}s2>"
+
+    assert set(graph.triples((None, URIRef(f"{EX}p"), None))) == {
+        make_triple(i) for i in range(3)
+    }
+    assert list(graph.objects(URIRef(f"{EX}s1"))) == [Literal("value 1")]
+
+
+def test_append(fake_dataset, fake_terms_dataset):
+    store = DataikuDatasetStore(fake_dataset, terms_dataset=fake_terms_dataset)
+    for i in range(3):
+        store.add(make_triple(i))
+    store.close(commit_pending_transaction=True)
+
+    # a new store overwrites the dataset content, unless it appends to it
+    store = DataikuDatasetStore(fake_dataset, terms_dataset=fake_terms_dataset, append=True)
+    for i in range(2, 5):
+        store.add(make_triple(i))
+    store.close(commit_pending_transaction=True)
+
+    assert fake_dataset.spec_item["appendMode"] is True
+    assert len(fake_dataset.get_dataframe()) == 6
+    # existing terms keep their ids, only new terms are added to the terms dataset
+    terms_df = fake_terms_dataset.get_dataframe()
+    assert terms_df["term"].is_unique
+    assert list(terms_df["id"]) == list(range(len(terms_df)))
+    assert len(list(store.triples((URIRef(f"{EX}s2"), None, None), None))) == 2
+    assert len(list(store.triples((None, URIRef(f"{EX}p"), None), None))) == 6
+
+    # the store overwrites the content even if the recipe output appends to it
+    store = DataikuDatasetStore(fake_dataset, terms_dataset=fake_terms_dataset)
+    store.add(make_triple(0))
+    store.close(commit_pending_transaction=True)
+
+    assert fake_dataset.spec_item["appendMode"] is False
+    assert len(fake_dataset.get_dataframe()) == 1
+    assert list(fake_terms_dataset.get_dataframe()["id"]) == [0, 1, 2]
+
+
+def test_source_column(fake_dataset, fake_terms_dataset):
+    for terms_dataset in (None, fake_terms_dataset):
+        store = DataikuDatasetStore(
+            fake_dataset, terms_dataset=terms_dataset, source_column_name="source", autocommit_add_threshold=3
+        )
+        store.write_schema()
+        store.add_n3_triples([tuple(term.n3() for term in make_triple(i)) for i in range(2)], source="/a.nt")
+        store.add_n3_triples([tuple(term.n3() for term in make_triple(i)) for i in range(2, 4)], source="/b.nt")
+        store.close(commit_pending_transaction=True)
+
+        assert fake_dataset.schema[-1] == {"name": "source", "type": "string"}
+        df = fake_dataset.get_dataframe()
+        assert list(df.columns) == ["subject", "predicate", "object", "source"]
+        assert list(df["source"]) == ["/a.nt", "/a.nt", "/b.nt", "/b.nt"]
+        # the source column does not change the triples
+        assert len(list(store.triples((None, URIRef(f"{EX}p"), None), None))) == 4
+
+
+def test_quads(fake_dataset, fake_terms_dataset):
+    graph_a, graph_b = URIRef(f"{EX}a"), URIRef(f"{EX}b")
+    for terms_dataset in (None, fake_terms_dataset):
+        store = DataikuDatasetStore(
+            fake_dataset, terms_dataset=terms_dataset, graph_column_name="graph", autocommit_add_threshold=3
+        )
+        store.write_schema()
+        dataset = Dataset(store=store)
+        dataset.addN((*make_triple(i), dataset.graph(graph_a)) for i in range(3))
+        store.add_n3_quads([(*(term.n3() for term in make_triple(i)), graph_b.n3()) for i in range(2, 4)])
+        store.add_n3_triples([tuple(term.n3() for term in make_triple(4))])
+        store.close(commit_pending_transaction=True)
+
+        assert fake_dataset.schema[-1] == {"name": "graph", "type": "string"}
+        df = fake_dataset.get_dataframe()
+        assert list(df["graph"].fillna("")) == [graph_a.n3()] * 3 + [graph_b.n3()] * 2 + [""]
+        assert {context.identifier for context in store.contexts()} == {graph_a, graph_b, DATASET_DEFAULT_GRAPH_ID}
+        assert {context.identifier for context in store.contexts(make_triple(2))} == {graph_a, graph_b}
+        # patterns are matched in the graph of their context, or in all graphs,
+        # where the triple held by both named graphs is counted once
+        assert len(store) == 5
+        assert len(dataset.graph(graph_a)) == 3
+        assert len(list(dataset.graph(graph_b).triples((None, URIRef(f"{EX}p"), None)))) == 2
+        assert len(list(store.triples((None, None, None), dataset.default_context))) == 1
+        assert set(dataset.quads((make_triple(2)[0], None, None, None))) == {
+            (*make_triple(2), graph_a),
+            (*make_triple(2), graph_b),
+        }
+
+
+
+def test_quads_union(fake_dataset):
+    graph_a, graph_b = URIRef(f"{EX}a"), URIRef(f"{EX}b")
+    quads = [
+        (URIRef(f"{EX}s0"), URIRef(f"{EX}p"), URIRef(f"{EX}s1"), graph_a),
+        (URIRef(f"{EX}s0"), URIRef(f"{EX}p"), URIRef(f"{EX}s1"), graph_b),
+        (URIRef(f"{EX}s1"), URIRef(f"{EX}p"), URIRef(f"{EX}s2"), graph_b),
+        (URIRef(f"{EX}s1"), URIRef(f"{EX}p"), URIRef(f"{EX}s2"), None),
+    ]
+    store = DataikuDatasetStore(fake_dataset, graph_column_name="graph")
+    store.add_n3_quads([(s.n3(), p.n3(), o.n3(), None if g is None else g.n3()) for s, p, o, g in quads])
+    store.close(commit_pending_transaction=True)
+    expected = Dataset(default_union=True)
+    for s, p, o, g in quads:
+        expected.add((s, p, o) if g is None else (s, p, o, expected.graph(g)))
+
+    # the default graph is the union of the graphs: a triple held by several graphs is matched once
+    dataset = Dataset(store=store, default_union=True)
+    matches = list(store.triples((URIRef(f"{EX}s0"), None, None), dataset))
+    assert len(matches) == 1
+    assert {context.identifier for context in matches[0][1]} == {graph_a, graph_b}
+    assert len(list(store.triples_choices(([URIRef(f"{EX}s0"), URIRef(f"{EX}s1")], None, None), dataset))) == 2
+    query = f"SELECT * WHERE {{ ?a <{EX}p> ?b . ?b <{EX}p> ?c }}"
+    assert sorted(dataset.query(query)) == sorted(expected.query(query))
+    assert len(dataset.query(query)) == 1
+    assert sorted(dataset.quads((None, None, None, None))) == sorted(expected.quads((None, None, None, None)))
+
+@pytest.mark.parametrize("dictionary_encoded", [False, True])
+def test_deduplicate(fake_dataset, fake_terms_dataset, dictionary_encoded):
+    terms_dataset = fake_terms_dataset if dictionary_encoded else None
+    store = DataikuDatasetStore(fake_dataset, terms_dataset=terms_dataset, deduplicate=True, autocommit_add_threshold=3)
+    store.write_schema()
+    # duplicates within a commit and across commits
+    store.add_n3_triples([tuple(term.n3() for term in make_triple(i % 4)) for i in range(10)])
+    store.close(commit_pending_transaction=True)
+
+    assert store.duplicates == 6
+    assert len(fake_dataset.get_dataframe()) == 4
+    assert len(store) == 4
+
+    # appended triples already in the dataset are dropped too
+    store = DataikuDatasetStore(fake_dataset, terms_dataset=terms_dataset, deduplicate=True, append=True)
+    store.add_n3_triples([tuple(term.n3() for term in make_triple(i)) for i in range(2, 6)])
+    store.close(commit_pending_transaction=True)
+
+    assert store.duplicates == 2
+    assert len(list(store.triples((None, URIRef(f"{EX}p"), None), None))) == 6
+
+
+def test_deduplicate_quads(fake_dataset):
+    store = DataikuDatasetStore(fake_dataset, graph_column_name="graph", deduplicate=True)
+    triple = tuple(term.n3() for term in make_triple(0))
+    store.add_n3_quads([(*triple, None), (*triple, "<http://example.org/g>"), (*triple, None)])
+    store.add_n3_triples([triple])
+    store.close(commit_pending_transaction=True)
+
+    # the same triple in another graph is not a duplicate
+    assert store.duplicates == 2
+    assert list(fake_dataset.get_dataframe()["graph"].fillna("")) == ["", "<http://example.org/g>"]
+
+    # appended quads already in the dataset are dropped too, in the default graph or in a named graph
+    store = DataikuDatasetStore(fake_dataset, graph_column_name="graph", deduplicate=True, append=True)
+    store.add_n3_quads([(*triple, None), (*triple, "<http://example.org/g>"), (*triple, "<http://example.org/h>")])
+    store.close(commit_pending_transaction=True)
+
+    assert store.duplicates == 2
+    assert len(fake_dataset.get_dataframe()) == 3
+
+
+def test_quads_len(fake_dataset):
+    quads = [(*make_triple(i), graph) for i in range(3) for graph in (None, URIRef(f"{EX}a"), URIRef(f"{EX}b"))]
+    quads.append((*make_triple(0), URIRef(f"{EX}c")))
+    store = DataikuDatasetStore(fake_dataset, graph_column_name="graph")
+    store.add_n3_quads([(s.n3(), p.n3(), o.n3(), None if g is None else g.n3()) for s, p, o, g in quads])
+    store.close(commit_pending_transaction=True)
+    expected = Dataset(default_union=True)
+    for s, p, o, g in quads:
+        expected.add((s, p, o) if g is None else (s, p, o, expected.graph(g)))
+
+    # the union of the graphs counts distinct triples, as rdflib datasets do, and each graph its own triples,
+    # with statistics collected while writing, or computed from the index
+    for other_store in (store, DataikuDatasetStore(fake_dataset, graph_column_name="graph")):
+        dataset = Dataset(store=other_store, default_union=True)
+        assert len(dataset) == len(expected) == 3
+        assert len(dataset.graph(URIRef(f"{EX}c"))) == len(expected.graph(URIRef(f"{EX}c"))) == 1
+        assert len(dataset.graph(URIRef(f"{EX}a"))) == 3
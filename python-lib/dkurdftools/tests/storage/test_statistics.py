@@ -0,0 +1,89 @@
+from io import BytesIO
+
+import pandas as pd
+from rdflib import Graph
+
+from ...storage import statistics
+from ...storage.dss_store import DataikuDatasetStore
+from ...storage.statistics import PredicateStatistics, StatisticsCollector, TripleStatistics
+from ...storage.triple_index import TripleIndex
+from .test_dss_store import make_triple
+
+EX = "http://example.org/"
+
+TRIPLES = [
+    *((f"<{EX}s{i}>", f"<{EX}type>", f"<{EX}Thing>") for i in range(10)),
+    *((f"<{EX}s{i}>", f"<{EX}value>", f'"{i % 3}"') for i in range(10)),
+    (f"<{EX}s0>", f"<{EX}value>", '"extra"'),
+]
+
+EXPECTED = TripleStatistics(
+    21,
+    10,
+    5,
+    {
+        f"<{EX}type>": PredicateStatistics(10, 10, 1),
+        f"<{EX}value>": PredicateStatistics(11, 10, 4),
+    },
+)
+
+
+def test_from_index():
+    assert TripleStatistics.from_index(TripleIndex.from_dataframes([pd.DataFrame(TRIPLES)])) == EXPECTED
+    assert TripleStatistics.from_index(TripleIndex.from_dataframes([])) == TripleStatistics(0, 0, 0, {})
+
+
+def test_collector(monkeypatch):
+    # merge the hashes often, to check the sets buffering
+    monkeypatch.setattr(statistics, "MIN_MERGED_HASHES", 2)
+    collector = StatisticsCollector()
+    for start in range(0, len(TRIPLES), 4):
+        collector.update(*zip(*TRIPLES[start : start + 4]))
+
+    assert collector.get_statistics() == EXPECTED
+
+
+
+def test_quad_statistics():
+    # the triples are held by one or two graphs
+    quads = [(*triple, f"<{EX}g{j}>") for i, triple in enumerate(TRIPLES) for j in range(1 + i % 2)]
+    index = TripleIndex.from_dataframes([pd.DataFrame(quads)], with_graphs=True)
+    collector = StatisticsCollector(with_graphs=True)
+    collector.update(*zip(*(quad[:3] for quad in quads)))
+
+    expected = TripleStatistics.from_index(index)
+    assert expected.triples == len(quads)
+    assert expected.distinct_triples == len(TRIPLES)
+    assert collector.get_statistics() == expected
+
+def test_save_load():
+    buffer = BytesIO()
+    EXPECTED.save(buffer)
+    buffer.seek(0)
+
+    assert TripleStatistics.load(buffer) == EXPECTED
+
+
+def test_store_statistics(fake_dataset, fake_folder):
+    store = DataikuDatasetStore(fake_dataset, index_folder=fake_folder, autocommit_add_threshold=2)
+    for i in range(5):
+        store.add(make_triple(i))
+    store.close(commit_pending_transaction=True)
+
+    # the statistics are collected while writing, without building the index
+    assert store.index is None
+    assert len(Graph(store=store)) == 5
+    assert store.get_statistics().predicates[f"<{EX}p>"] == PredicateStatistics(5, 5, 5)
+    assert store.statistics_path in fake_folder.files
+    # other stores over the dataset load the persisted statistics
+    other_store = DataikuDatasetStore(fake_dataset, index_folder=fake_folder)
+    assert len(other_store) == 5
+    assert other_store.index is None
+
+    # appended triples make the statistics computed from the index
+    store = DataikuDatasetStore(fake_dataset, index_folder=fake_folder, append=True)
+    store.add(make_triple(5))
+    store.close(commit_pending_transaction=True)
+    assert store.statistics_path not in fake_folder.files
+    assert len(store) == 6
+    assert store.index is not None
@@ -0,0 +1,15 @@
+import numpy as np
+
+from ...storage.term_dictionary import TermDictionary
+
+
+def test_encode():
+    dictionary = TermDictionary(["<http://ex.org/a>"])
+    codes = dictionary.encode(
+        np.array([["<http://ex.org/b>", "<http://ex.org/a>"], ['"c"', "<http://ex.org/b>"]], dtype=object)
+    )
+
+    assert codes.tolist() == [[1, 0], [2, 1]]
+    assert dictionary.terms == ["<http://ex.org/a>", "<http://ex.org/b>", '"c"']
+    assert dictionary.encode(np.array(['"c"', '"d"'], dtype=object)).tolist() == [2, 3]
+    assert len(dictionary) == 4
@@ -0,0 +1,121 @@
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ...storage.triple_index import DEFAULT_GRAPH, TripleIndex
+
+
+TRIPLES = [
+    ("<http://ex.org/s1>", "<http://ex.org/p1>", '"o1"'),
+    ("<http://ex.org/s1>", "<http://ex.org/p2>", "<http://ex.org/s2>"),
+    ("<http://ex.org/s2>", "<http://ex.org/p1>", '"o1"'),
+    ("<http://ex.org/s2>", "<http://ex.org/p2>", '"it\'s a \\"quoted\\" literal"'),
+    ("<http://ex.org/s3>", "<http://ex.org/p1>", '"o3"'),
+]
+
+
+@pytest.fixture()
+def index():
+    df = pd.DataFrame(TRIPLES, columns=["subject", "predicate", "object"])
+    # build the index from several chunks
+    yield TripleIndex.from_dataframes([df[:2], df[2:4], df[4:]])
+
+
+@pytest.mark.parametrize("pattern, expected_rows", [
+    ((None, None, None), [0, 1, 2, 3, 4]),
+    (("<http://ex.org/s1>", None, None), [0, 1]),
+    ((None, "<http://ex.org/p1>", None), [0, 2, 4]),
+    ((None, None, '"o1"'), [0, 2]),
+    ((None, "<http://ex.org/p1>", '"o1"'), [0, 2]),
+    (("<http://ex.org/s2>", "<http://ex.org/p1>", '"o1"'), [2]),
+    ((None, None, "<http://ex.org/s2>"), [1]),
+    ((None, None, '"it\'s a \\"quoted\\" literal"'), [3]),
+    (("<http://ex.org/s3>", "<http://ex.org/p2>", None), []),
+    (("<http://ex.org/unknown>", None, None), []),
+])
+def test_match(index, pattern, expected_rows):
+    rows = index.match(pattern)
+    assert rows.tolist() == expected_rows
+
+
+@pytest.mark.parametrize("pattern, expected_rows", [
+    ((None, None, None), [0, 1, 2, 3, 4]),
+    ((["<http://ex.org/s1>", "<http://ex.org/s3>"], None, None), [0, 1, 4]),
+    ((["<http://ex.org/s1>", "<http://ex.org/unknown>"], None, None), [0, 1]),
+    ((None, ["<http://ex.org/p1>"], ['"o1"', '"o3"']), [0, 2, 4]),
+    ((["<http://ex.org/s2>", "<http://ex.org/s3>"], ["<http://ex.org/p1>"], None), [2, 4]),
+    ((["<http://ex.org/unknown>"], None, None), []),
+    (([], ["<http://ex.org/p2>"], None), [1, 3]),
+])
+def test_match_choices(index, pattern, expected_rows):
+    rows = index.match_choices(pattern)
+    assert rows.tolist() == expected_rows
+    assert [tuple(triple) for triple in index.decode(rows)] == [TRIPLES[row] for row in expected_rows]
+
+
+def test_empty_index():
+    index = TripleIndex.from_dataframes([])
+    assert len(index) == 0
+    assert index.match((None, None, None)).tolist() == []
+    assert index.match(("<http://ex.org/s1>", None, None)).tolist() == []
+
+
+def test_save_load(index):
+    buffer = BytesIO()
+    index.save(buffer)
+    buffer.seek(0)
+    loaded_index = TripleIndex.load(buffer)
+
+    assert len(loaded_index) == len(index)
+    assert np.array_equal(loaded_index.decode(np.arange(5)), index.decode(np.arange(5)))
+
+
+def test_quads():
+    df = pd.DataFrame(
+        [(*triple, None if i % 2 else "<http://ex.org/g1>") for i, triple in enumerate(TRIPLES)],
+        columns=["subject", "predicate", "object", "graph"],
+    )
+    index = TripleIndex.from_dataframes([df[:3], df[3:]], with_graphs=True)
+
+    assert index.has_graphs
+    assert index.match((None, None, None)).tolist() == [0, 1, 2, 3, 4]
+    assert index.match((None, None, None, "<http://ex.org/g1>")).tolist() == [0, 2, 4]
+    # triples without a graph belong to the default graph
+    assert index.match((None, "<http://ex.org/p2>", None, DEFAULT_GRAPH)).tolist() == [1, 3]
+    assert index.match((None, None, None, "<http://ex.org/unknown>")).tolist() == []
+    assert index.match_choices((None, ["<http://ex.org/p1>"], None, ["<http://ex.org/g1>"])).tolist() == [0, 2, 4]
+    assert index.match_choices((None, ["<http://ex.org/p1>"], None, [DEFAULT_GRAPH])).tolist() == []
+    assert index.decode_graphs(np.array([0, 1])).tolist() == ["<http://ex.org/g1>", DEFAULT_GRAPH]
+
+    buffer = BytesIO()
+    index.save(buffer)
+    buffer.seek(0)
+    loaded_index = TripleIndex.load(buffer)
+
+    assert loaded_index.has_graphs
+    assert loaded_index.match((None, None, None, "<http://ex.org/g1>")).tolist() == [0, 2, 4]
+    assert loaded_index.decode_graphs(np.arange(5)).tolist() == index.decode_graphs(np.arange(5)).tolist()
+
+
+def test_group_triples():
+    df = pd.DataFrame(
+        [
+            (*TRIPLES[i], graph)
+            for i, graph in [(1, "<http://ex.org/g1>"), (0, None), (1, None), (2, None), (0, "<http://ex.org/g2>")]
+        ],
+        columns=["subject", "predicate", "object", "graph"],
+    )
+    index = TripleIndex.from_dataframes([df], with_graphs=True)
+
+    rows, offsets = index.group_triples(np.arange(5))
+    # the rows of each triple are contiguous, in order of first appearance
+    assert rows.tolist() == [0, 2, 1, 4, 3]
+    assert offsets.tolist() == [0, 2, 4, 5]
+    rows, offsets = index.group_triples(np.array([3, 4]))
+    assert rows.tolist() == [3, 4]
+    assert offsets.tolist() == [0, 1, 2]
+    rows, offsets = index.group_triples(np.empty(0, dtype=np.int64))
+    assert rows.tolist() == []
+    assert offsets.tolist() == [0]
@@ -0,0 +1,64 @@
+import bz2
+import gzip
+import lzma
+import zipfile
+from io import BytesIO
+
+import pytest
+
+from ..formats.compression import iter_decompressed_streams, split_compression_extension
+
+DATA = b'<http://example.org/s> <http://example.org/p> "o" .\n' * 100
+
+
+class NonSeekableStream(BytesIO):
+    """A stream that cannot be read randomly, like a remote file"""
+
+    def seekable(self):
+        return False
+
+
+def make_zip(files):
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for path, data in files.items():
+            archive.writestr(path, data)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize(
+    "path, expected_result",
+    [
+        ("data.nt.gz", ("data.nt", "gzip")),
+        ("data.ttl.BZ2", ("data.ttl", "bz2")),
+        ("data.rdf.xz", ("data.rdf", "xz")),
+        ("dump.zip", ("dump", "zip")),
+        ("data.nt", ("data.nt", None)),
+    ],
+)
+def test_split_compression_extension(path, expected_result):
+    assert split_compression_extension(path) == expected_result
+
+
+@pytest.mark.parametrize("compress", [gzip.compress, bz2.compress, lzma.compress, lambda data: data])
+@pytest.mark.parametrize("path", ["", "/folder/data.nt"])
+def test_iter_decompressed_streams(compress, path):
+    streams = list(
+        (member_path, member_stream.read())
+        for member_path, member_stream in iter_decompressed_streams(NonSeekableStream(compress(DATA)), path)
+    )
+    assert streams == [(path, DATA)]
+
+
+@pytest.mark.parametrize("path", ["/folder/dump.zip", "/folder/dump"])
+def test_iter_decompressed_streams_zip(path):
+    archive = make_zip({"a.nt": DATA, "dir/b.ttl": b"@prefix ex: <http://example.org/> .", "dir/": b""})
+
+    streams = [
+        (member_path, member_stream.read())
+        for member_path, member_stream in iter_decompressed_streams(NonSeekableStream(archive), path)
+    ]
+    assert streams == [
+        ("/folder/dump/a.nt", DATA),
+        ("/folder/dump/dir/b.ttl", b"@prefix ex: <http://example.org/> ."),
+    ]
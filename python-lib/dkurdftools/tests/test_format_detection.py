@@ -0,0 +1,70 @@
+from io import BytesIO
+
+import pytest
+
+from ..formats.detection import detect_rdf_format, get_format_from_path, sniff_format
+from ..formats.utils import iter_rdf_stream
+
+
+@pytest.mark.parametrize(
+    "path, overrides, expected_format",
+    [
+        ("/folder/data.nt", None, "nt"),
+        ("/folder/DATA.TTL", None, "turtle"),
+        ("/folder/ontology.owl", None, "xml"),
+        ("/folder/data.nq", None, "nquads"),
+        ("/folder/data.txt", None, None),
+        ("/folder/data.txt", {"txt": "nt"}, "nt"),
+        ("/folder/data.xml", {".xml": "trix"}, "trix"),
+        ("/folder.ttl/data", None, None),
+    ],
+)
+def test_get_format_from_path(path, overrides, expected_format):
+    assert get_format_from_path(path, overrides) == expected_format
+
+
+@pytest.mark.parametrize(
+    "header, expected_format",
+    [
+        (b'<http://example.org/s> <http://example.org/p> "o" .\n# comment\n', "nt"),
+        (b'_:b0 <http://example.org/p> "o"@en <http://example.org/g> .\n', "nquads"),
+        (b"@prefix ex: <http://example.org/> .\nex:s ex:p ex:o .\n", "turtle"),
+        (b"PREFIX ex: <http://example.org/>\nex:s a ex:C .\n", "turtle"),
+        (b'<?xml version="1.0"?>\n<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">', "xml"),
+        (b'\xef\xbb\xbf  {"@context": {}}', "json-ld"),
+        (b'[\n  {"@id": "http://example.org/s"}]', "json-ld"),
+        (b"[]", "json-ld"),
+        # a Turtle document starting with a blank node is not a JSON array
+        (b"[ <http://example.org/p> <http://example.org/o> ] <http://example.org/q> 1 .\n", "turtle"),
+        (b"", None),
+        (b"hello world", None),
+    ],
+)
+def test_sniff_format(header, expected_format):
+    assert sniff_format(header, complete=True) == expected_format
+
+
+def test_sniff_format_ignores_truncated_line():
+    header = b'<http://example.org/s> <http://example.org/p> "o" .\n<http://example.org/s> <http://exa'
+    # the rest of the file may be Turtle
+    assert sniff_format(header) == "turtle"
+    header = b'<http://example.org/s> <http://example.org/p> "o" <http://example.org/g> .\n<http://exa'
+    assert sniff_format(header) == "nquads"
+
+
+def test_detect_rdf_format_turtle_after_ntriples_lines():
+    # Turtle statements after N-Triples lines longer than the sniffed header
+    data = "".join(f'<http://example.org/s{i}> <http://example.org/p> "o" .\n' for i in range(200))
+    data += '<http://example.org/s> <http://example.org/p> "o1" ; <http://example.org/q> "o2" .\n'
+    file_format, stream = detect_rdf_format(BytesIO(data.encode()), "/folder/data")
+    assert file_format == "turtle"
+    assert len(list(iter_rdf_stream(stream, file_format))) == 202
+
+
+def test_detect_rdf_format_replays_header():
+    data = b"".join(
+        f'<http://example.org/s{i}> <http://example.org/p> "o" .\n'.encode() for i in range(500)
+    )
+    file_format, stream = detect_rdf_format(BytesIO(data), "/folder/data", sniff_size=100)
+    assert file_format == "turtle"
+    assert stream.read() == data
@@ -1,9 +1,20 @@
 import pathlib
+from io import BytesIO
 
 import pytest
-from rdflib import Graph
+from rdflib import Graph, Literal, URIRef
+from rdflib.plugins.parsers.ntriples import ParseError
 
-from ..formats.utils import parse_rdf_stream_as_graph
+from ..formats.utils import (
+    iter_ntriples_stream,
+    iter_rdf_quads,
+    iter_rdf_stream,
+    iter_rdfxml_stream,
+    iter_stream_lines,
+    iter_turtle_stream,
+    parse_rdf_stream_as_graph,
+    to_ntriples_line,
+)
 
 
 current_filepath = pathlib.Path(__file__).parent.resolve()
@@ -23,3 +34,151 @@ def test_parse_rdf_stream_as_graph(file_name, rdf_format, expected_nb_triples):
     ref_graph.parse(file_path)
 
     assert graph.isomorphic(ref_graph) is True
+
+
+@pytest.mark.parametrize("buffer_size", [7, 64 * 1024])
+def test_iter_ntriples_stream(buffer_size):
+    file_path = f"{current_filepath}/data/dblp.nt"
+    with open(file_path, "rb") as stream:
+        triples = list(iter_ntriples_stream(stream, buffer_size=buffer_size))
+
+    assert len(triples) == 17
+
+    ref_graph = Graph()
+    ref_graph.parse(file_path)
+
+    assert set(triples) == set(ref_graph)
+
+
+def test_iter_ntriples_stream_with_context():
+    data = (
+        b"<http://ex.org/s> <http://ex.org/p> \"caf\xc3\xa9\"@fr <http://ex.org/g> .\r\n"
+        b"# a comment\n"
+        b"\n"
+        b"_:b1 <http://ex.org/p> _:b1 ."
+    )
+    quads = list(iter_ntriples_stream(BytesIO(data), with_context=True, buffer_size=3))
+
+    assert len(quads) == 2
+    assert quads[0] == (
+        URIRef("http://ex.org/s"),
+        URIRef("http://ex.org/p"),
+        Literal("café", lang="fr"),
+        URIRef("http://ex.org/g"),
+    )
+    subject, _, obj, graph = quads[1]
+    assert subject == obj
+    assert graph is None
+
+
+@pytest.mark.parametrize("buffer_size", [1, 6, 64 * 1024])
+@pytest.mark.parametrize("data, expected_lines", [
+    (b"line1\rline2\rline3", ["line1", "line2", "line3"]),
+    (b"line1\r\nline2\r\n\nline3\n", ["line1", "line2", "", "line3"]),
+    # Unicode line breaks other than CR and LF are not line terminators
+    ("a\u2028b\u0085c\x0bd\x0ce\nf".encode("utf-8"), ["a\u2028b\u0085c\x0bd\x0ce", "f"]),
+])
+def test_iter_stream_lines(data, expected_lines, buffer_size):
+    assert list(iter_stream_lines(BytesIO(data), buffer_size=buffer_size)) == expected_lines
+
+
+def test_iter_ntriples_stream_unicode_line_separators():
+    data = '<http://ex.org/s> <http://ex.org/p> "x\u2028y\u0085z" .\n'.encode("utf-8")
+    triples = list(iter_ntriples_stream(BytesIO(data), buffer_size=5))
+
+    assert triples == [(URIRef("http://ex.org/s"), URIRef("http://ex.org/p"), Literal("x\u2028y\u0085z"))]
+
+
+def test_iter_ntriples_stream_invalid_line():
+    with pytest.raises(ParseError):
+        list(iter_ntriples_stream(BytesIO(b"<http://ex.org/s> <http://ex.org/p> .\n")))
+
+
+TURTLE_DATA = """@prefix ex: <http://example.org/> .
+PREFIX foaf: <http://xmlns.com/foaf/0.1/>
+# a comment with a . and an unbalanced "quote
+ex:book1 ex:title "A title . with a dot", 'single quotes', \"\"\"long " .
+string\"\"\" ;
+  ex:price 3.14, 3 ;
+  ex:authors [ ex:list ( ex:alice ex:bob.smith ) ] .
+ex:alice foaf:name "Alice \\" . Smith"@en .
+_:b1 ex:knows _:b1 .
+"""
+
+
+@pytest.mark.parametrize("buffer_size", [1, 3, 7, 64 * 1024])
+def test_iter_turtle_stream(buffer_size):
+    triples = list(iter_turtle_stream(BytesIO(TURTLE_DATA.encode("utf-8")), buffer_size=buffer_size))
+
+    ref_graph = Graph()
+    ref_graph.parse(data=TURTLE_DATA, format="turtle")
+
+    assert len(triples) == len(ref_graph)
+    graph = Graph()
+    for triple in triples:
+        graph.add(triple)
+    assert graph.isomorphic(ref_graph) is True
+
+
+@pytest.mark.parametrize("buffer_size", [5, 64 * 1024])
+def test_iter_rdfxml_stream(buffer_size):
+    ref_graph = Graph()
+    ref_graph.parse(f"{current_filepath}/data/dave_beckett.ttl")
+    data = ref_graph.serialize(format="xml").encode("utf-8")
+
+    graph = Graph()
+    for triple in iter_rdfxml_stream(BytesIO(data), buffer_size=buffer_size):
+        graph.add(triple)
+
+    assert len(graph) == len(ref_graph)
+    assert graph.isomorphic(ref_graph) is True
+
+
+@pytest.mark.parametrize("file_name, rdf_format, expected_nb_triples", [
+    ("dblp.nt", "nt", 17),
+    ("dave_beckett.ttl", "text/turtle", 4),
+    ("dave_beckett.ttl", "n3", 4),
+])
+def test_iter_rdf_stream(file_name, rdf_format, expected_nb_triples):
+    file_path = f"{current_filepath}/data/{file_name}"
+    graph = Graph()
+    with open(file_path, "rb") as stream:
+        for triple in iter_rdf_stream(stream, rdf_format):
+            graph.add(triple)
+
+    assert len(graph) == expected_nb_triples
+
+
+@pytest.mark.parametrize("rdf_format, data", [
+    ("nquads", b'<http://ex.org/s> <http://ex.org/p> "o1" <http://ex.org/g> .\n<http://ex.org/s> <http://ex.org/p> "o2" .\n'),
+    ("trig", b'<http://ex.org/g> { <http://ex.org/s> <http://ex.org/p> "o1" . }\n<http://ex.org/s> <http://ex.org/p> "o2" .\n'),
+])
+def test_iter_rdf_quads(rdf_format, data):
+    quads = set(iter_rdf_quads(BytesIO(data), rdf_format))
+
+    assert quads == {
+        (URIRef("http://ex.org/s"), URIRef("http://ex.org/p"), Literal("o1"), URIRef("http://ex.org/g")),
+        (URIRef("http://ex.org/s"), URIRef("http://ex.org/p"), Literal("o2"), None),
+    }
+
+
+def test_iter_rdf_quads_without_graphs():
+    with open(f"{current_filepath}/data/dave_beckett.ttl", "rb") as stream:
+        quads = list(iter_rdf_quads(stream, "turtle"))
+
+    assert len(quads) == 4
+    assert all(graph is None for *_, graph in quads)
+
+
+@pytest.mark.parametrize("obj, expected", [
+    (Literal("value"), '"value"'),
+    (Literal('multi\nline "quoted" \\ value\r'), '"multi\\nline \\"quoted\\" \\\\ value\\r"'),
+    (Literal("valeur", lang="fr"), '"valeur"@fr'),
+    (Literal(42), '"42"^^<http://www.w3.org/2001/XMLSchema#integer>'),
+])
+def test_to_ntriples_line(obj, expected):
+    triple = (URIRef("http://example.org/s"), URIRef("http://example.org/p"), obj)
+
+    line = to_ntriples_line(triple)
+    assert line == f"<http://example.org/s> <http://example.org/p> {expected} .\n"
+    assert list(Graph().parse(data=line, format="nt")) == [triple]
@@ -0,0 +1,61 @@
+from io import BytesIO
+
+import pytest
+from rdflib import Graph, Literal, URIRef
+
+pytest.importorskip("dataiku.customformat")
+
+from ..formats.output_formatter import RDFOutputFormatter  # noqa: E402
+
+EX = "http://example.org/"
+
+ROWS = [
+    {"subject": f"<{EX}s{i}>", "predicate": f"<{EX}p>", "object": Literal(f"line {i}\nnext line").n3()}
+    for i in range(5)
+]
+
+
+def write_rows(rows, **kwargs):
+    stream = BytesIO()
+    formatter = RDFOutputFormatter(stream, None, **kwargs)
+    formatter.write_header()
+    for row in rows:
+        formatter.write_row(row)
+    formatter.write_footer()
+    return stream, formatter
+
+
+def test_write_ntriples():
+    stream, _ = write_rows(ROWS, format="nt")
+
+    lines = stream.getvalue().decode("utf-8").splitlines()
+    assert lines[0] == f'<{EX}s0> <{EX}p> "line 0\\nnext line" .'
+    graph = Graph().parse(data=stream.getvalue(), format="nt")
+    assert len(graph) == len(ROWS)
+    assert (URIRef(f"{EX}s3"), URIRef(f"{EX}p"), Literal("line 3\nnext line")) in graph
+
+
+def test_write_ntriples_flushes_buffer():
+    stream = BytesIO()
+    formatter = RDFOutputFormatter(stream, None, format="nt", buffer_size=100)
+    formatter.write_row(ROWS[0])
+    # the buffer is not full yet
+    assert stream.getvalue() == b""
+    formatter.write_row(ROWS[1])
+    assert stream.getvalue().count(b"\n") == 2
+    assert formatter.write_buffer == []
+
+
+@pytest.mark.parametrize("file_format", ["nt", "turtle", "xml"])
+def test_write_footer_without_rows(file_format):
+    stream, _ = write_rows([], format=file_format)
+
+    assert len(Graph().parse(data=stream.getvalue(), format=file_format)) == 0
+
+
+@pytest.mark.parametrize("file_format", ["nt", "turtle"])
+def test_write_deduplicated_rows(file_format):
+    stream, formatter = write_rows(ROWS + ROWS[:2], format=file_format, deduplicate=True)
+
+    assert formatter.deduplicator.duplicates == 2
+    assert len(Graph().parse(data=stream.getvalue(), format=file_format)) == len(ROWS)
@@ -0,0 +1,62 @@
+import pathlib
+
+import pytest
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import RDF
+
+from ..formats.turtle_writer import StreamingTurtleWriter
+
+
+current_filepath = pathlib.Path(__file__).parent.resolve()
+
+EX = "http://example.org/"
+
+
+def serialize(triples, **kwargs):
+    chunks = []
+    writer = StreamingTurtleWriter(chunks.append, **kwargs)
+    for triple in triples:
+        writer.add(triple)
+    writer.close()
+    return "".join(chunks)
+
+
+@pytest.mark.parametrize("sample_size", [1, 1000])
+def test_serialize_grouped_triples(sample_size):
+    triples = [
+        (URIRef(f"{EX}book1"), RDF.type, URIRef(f"{EX}Book")),
+        (URIRef(f"{EX}book1"), URIRef(f"{EX}title"), Literal("Title", lang="en")),
+        (URIRef(f"{EX}book1"), URIRef(f"{EX}author"), URIRef(f"{EX}alice")),
+        (URIRef(f"{EX}book1"), URIRef(f"{EX}author"), URIRef(f"{EX}bob")),
+        (URIRef(f"{EX}book2"), URIRef(f"{EX}pages"), Literal(42)),
+        (URIRef(f"{EX}book2"), URIRef(f"{EX}summary"), Literal('multi\nline "summary"')),
+        (URIRef("urn:isbn:0451450523"), URIRef(f"{EX}title."), Literal("Dot")),
+    ]
+    data = serialize(triples, prefixes={"ex": EX}, sample_size=sample_size)
+
+    assert "@prefix ex: <http://example.org/> ." in data
+    assert "ex:book1 a ex:Book ;" in data
+    assert 'ex:author ex:alice ,\n        ex:bob .' in data
+
+    graph = Graph()
+    graph.parse(data=data, format="turtle")
+    assert len(graph) == len(triples)
+    assert set(graph) == set(triples)
+
+
+def test_serialize_detects_prefixes():
+    ref_graph = Graph()
+    ref_graph.parse(f"{current_filepath}/data/dblp.nt")
+
+    data = serialize(sorted(ref_graph))
+
+    assert "@prefix ns1:" in data
+    graph = Graph()
+    graph.parse(data=data, format="turtle")
+    assert graph.isomorphic(ref_graph) is True
+
+
+def test_serialize_empty():
+    graph = Graph()
+    graph.parse(data=serialize([]), format="turtle")
+    assert len(graph) == 0